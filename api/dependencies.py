@@ -108,4 +108,28 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
\ No newline at end of file
+    return user
+
+async def get_current_admin(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """
+    Get current authenticated user, requiring admin rights
+    
+    Args:
+        current_user: Current authenticated user
+        
+    Returns:
+        Current authenticated admin user
+        
+    Raises:
+        HTTPException: If the user is not listed in ADMIN_USERNAMES
+    """
+    admins = {name.strip() for name in settings.ADMIN_USERNAMES.split(",") if name.strip()}
+    if current_user.username not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    
+    return current_user
\ No newline at end of file
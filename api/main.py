@@ -1,16 +1,16 @@
 """
 Main API application module
 """
-import os
-
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from starlette.middleware.cors import CORSMiddleware
 
 from backend.core.config import settings
-from backend.database import init_db
-from api.routers import auth, ai, news, documents, risk, investments, users
+from backend.lifecycle import start_services, stop_services
+from backend.services.llm_gateway import LLMOverloadedError
+from api.middleware import UploadSizeLimitMiddleware
+from api.routers import auth, ai, news, documents, risk, investments, users, admin
 
 # Initialize FastAPI application
 app = FastAPI(
@@ -22,6 +22,16 @@ app = FastAPI(
     openapi_url="/api/openapi.json"
 )
 
+# Reject oversized uploads before their body is read. Added before CORS, which wraps it,
+# so browsers can read the 413 responses it sends itself
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.MAX_UPLOAD_SIZE + settings.UPLOAD_FORM_OVERHEAD,
+    path_limits={
+        "/api/documents/batch": (settings.MAX_UPLOAD_SIZE + settings.UPLOAD_FORM_OVERHEAD) * settings.DOCUMENT_BATCH_MAX_FILES
+    }
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,6 +49,7 @@ app.include_router(documents.router, prefix="/api")
 app.include_router(risk.router, prefix="/api")
 app.include_router(investments.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 # Exception handlers
 @app.exception_handler(ValidationError)
@@ -49,13 +60,26 @@ async def validation_exception_handler(request: Request, exc: ValidationError):
         content={"detail": exc.errors()},
     )
 
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_exception_handler(request: Request, exc: LLMOverloadedError):
+    """Shed load when the LLM gateway queue is full"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
 # Application startup event
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
-    init_db()
-    # Create upload directory if it doesn't exist
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    """Initialize the database and start background services"""
+    await start_services()
+
+# Application shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist in-process state on shutdown"""
+    await stop_services()
 
 # Health check endpoint
 @app.get("/api/health")
@@ -0,0 +1,79 @@
+"""
+ASGI middleware for the API application
+"""
+import json
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+
+class RequestTooLargeError(HTTPException):
+    """Request body over the upload limit; rendered as 413 by the exception middleware"""
+    
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request too large (max {max_bytes / 1024 / 1024:.1f} MB)"
+        )
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject multipart uploads over the size limit while the body is still arriving
+    
+    Requests that declare a larger Content-Length are answered with 413
+    before any of the body is read. Chunked requests are counted as they
+    are received, and the form parser is stopped as soon as the count goes
+    over, instead of spooling the whole body first.
+    """
+    
+    def __init__(self, app, max_bytes: int, path_limits: Optional[Dict[str, int]] = None):
+        """
+        Initialize the middleware
+        
+        Args:
+            app: ASGI application
+            max_bytes: Largest multipart request body accepted
+            path_limits: Larger or smaller limits for specific paths
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+    
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.path_limits.get(scope.get("path"), self.max_bytes)
+        if scope["type"] != "http" or not max_bytes:
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+        
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            error = RequestTooLargeError(max_bytes)
+            body = json.dumps({"detail": error.detail}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": error.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"connection", b"close")
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise RequestTooLargeError(max_bytes)
+            return message
+        
+        await self.app(scope, limited_receive, send)
\ No newline at end of file
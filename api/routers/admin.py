@@ -0,0 +1,156 @@
+"""
+Admin router for operational visibility
+"""
+import asyncio
+from typing import List, Dict, Any, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from backend.services.ai_service import ai_service
+from backend.services.analysis_cache import analysis_cache
+from backend.services.blob_store import blob_store
+from backend.services.job_queue import job_queue
+from backend.services.llm_metrics import llm_metrics
+from backend.services.pdf_extraction import pdf_extractor
+from backend.services.search_index import search_index
+from backend.services.text_store import text_store
+from backend.services.vector_index import vector_index
+from api.dependencies import get_current_admin
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/llm/calls", response_model=Dict[str, Any])
+async def get_llm_calls(
+    limit: int = Query(100, ge=1, le=1000),
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Get recent LLM calls and per-endpoint latency and token summaries
+    
+    Args:
+        limit: Maximum number of calls to return
+        current_admin: Current authenticated admin user
+    
+    Returns:
+        Recent calls (newest first) and a per-endpoint summary of the call log
+    """
+    return {
+        "summary": llm_metrics.summary(),
+        "calls": llm_metrics.recent_calls(limit)
+    }
+
+@router.get("/llm/usage", response_model=List[Dict[str, Any]])
+async def get_llm_usage(
+    days: int = Query(7, ge=1, le=366),
+    user_id: Optional[int] = None,
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Get the LLM usage ledger aggregated per day, user, endpoint and model
+    
+    Args:
+        days: Number of days to include, counting today
+        user_id: Only include this user's usage
+        current_admin: Current authenticated admin user
+    
+    Returns:
+        Ledger rows with call counts, tokens, average latency and cost
+    """
+    return await llm_metrics.get_usage(days, user_id)
+
+@router.get("/ai", response_model=Dict[str, Any])
+async def get_ai_stats(
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Get AI service statistics
+    
+    Args:
+        current_admin: Current authenticated admin user
+    
+    Returns:
+        Insight cache, prompt registry, request coalescing, LLM gateway and
+        chat memory statistics
+    """
+    return {
+        "insight_cache": ai_service.cache_stats(),
+        "prompts": ai_service.prompt_stats(),
+        "single_flight": ai_service.single_flight_stats(),
+        "gateway": ai_service.gateway_stats(),
+        "chat_memory": ai_service.memory_stats()
+    }
+
+@router.get("/jobs", response_model=Dict[str, Any])
+async def get_job_stats(
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Get background job queue statistics
+    
+    Args:
+        current_admin: Current authenticated admin user
+        
+    Returns:
+        Job counts per state and worker counters
+    """
+    return job_queue.stats()
+
+@router.get("/documents/cache", response_model=Dict[str, Any])
+async def get_document_cache_stats(
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Get document analysis cache statistics
+    
+    Args:
+        current_admin: Current authenticated admin user
+    
+    Returns:
+        Cache size, hit/miss counters and hit rate
+    """
+    return await asyncio.to_thread(analysis_cache.stats)
+
+@router.get("/documents/storage", response_model=Dict[str, Any])
+async def get_document_storage_stats(
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Get upload storage statistics
+    
+    Args:
+        current_admin: Current authenticated admin user
+    
+    Returns:
+        Blob and reference counts, bytes stored, deduplicated uploads and cleanup counters
+    """
+    return await asyncio.to_thread(blob_store.stats)
+
+@router.get("/documents/extraction", response_model=Dict[str, Any])
+async def get_document_extraction_stats(
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Get document text extraction statistics
+    
+    Args:
+        current_admin: Current authenticated admin user
+    
+    Returns:
+        PDF extraction, timeout and page counters, and extracted-text store hits and compression
+    """
+    return {"pdf": pdf_extractor.stats(), "text_store": text_store.stats()}
+
+@router.get("/documents/search", response_model=Dict[str, Any])
+async def get_document_search_stats(
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Get document search index statistics
+    
+    Args:
+        current_admin: Current authenticated admin user
+    
+    Returns:
+        Number of documents in the full-text index, and chunks and queries of the retrieval index
+    """
+    return {"full_text": await asyncio.to_thread(search_index.stats), "vectors": vector_index.stats()}
\ No newline at end of file
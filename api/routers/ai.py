@@ -1,9 +1,11 @@
 """
 AI router for financial advisor functionality
 """
-from typing import List, Dict, Any
+import json
+from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
@@ -49,20 +51,26 @@ async def get_ai_insight(
 
 @router.get("/chat-history", response_model=List[ChatMessage])
 async def get_chat_history(
+    before: Optional[int] = Query(None, description="Return messages older than this message ID"),
+    limit: int = Query(50, ge=1, le=200),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get chat history with AI advisor
+    Get chat history with AI advisor, newest page first
+    
+    Pass the ID of the oldest message received as `before` to load the previous page.
     
     Args:
+        before: Message ID to page back from
+        limit: Maximum number of messages to return
         current_user: Current authenticated user
         db: Database session
         
     Returns:
-        List of chat messages
+        List of chat messages, oldest first
     """
-    history = await ai_service.get_chat_history(current_user.id)
+    history = await ai_service.get_chat_history(current_user.id, before=before, limit=limit)
     return history
 
 @router.post("/chat", response_model=Dict[str, str])
@@ -83,4 +91,47 @@ async def chat_with_ai(
         AI response
     """
     response = await ai_service.chat_with_ai(request.message, user_id=current_user.id)
-    return {"response": response}
\ No newline at end of file
+    return {"response": response}
+
+@router.post("/chat/stream")
+async def stream_chat_with_ai(
+    request: ChatRequest,
+    current_user = Depends(get_current_user)
+):
+    """
+    Chat with AI financial advisor, streaming the response as Server-Sent Events
+    
+    Each token chunk is sent as a `data: {"token": ...}` event, followed by a
+    final `done` event once the response is complete.
+    
+    Args:
+        request: Chat request with message
+        current_user: Current authenticated user
+        
+    Returns:
+        Streaming response with text/event-stream content
+    """
+    chunks = ai_service.stream_chat(request.message, user_id=current_user.id)
+    
+    # Wait for the first chunk before sending headers, so an overloaded
+    # gateway can still be answered with 429 instead of a broken stream
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = None
+    
+    async def event_stream():
+        if first_chunk is not None:
+            yield f"data: {json.dumps({'token': first_chunk})}\n\n"
+            async for chunk in chunks:
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering so tokens flush immediately
+        }
+    )
\ No newline at end of file
@@ -2,17 +2,25 @@
 Documents router for document management and analysis
 """
 import os
-import shutil
+import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from backend.database import get_db
 from backend.models.document import Document
+from backend.models.upload_batch import UploadBatch
+from backend.services.blob_store import blob_store
 from backend.services.document_service import document_service
+from backend.services.job_queue import job_queue
+from backend.services.search_index import search_index
+from backend.services.text_store import text_store
+from backend.services.upload_storage import UploadTooLargeError
+from backend.services.vector_index import vector_index
 from backend.core.config import settings
 from api.dependencies import get_current_user
 
@@ -53,6 +61,162 @@ async def get_documents(
     documents = db.query(Document).filter(Document.user_id == current_user.id).all()
     return documents
 
+@router.get("/search", response_model=Dict[str, Any])
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user = Depends(get_current_user)
+):
+    """
+    Search the user's documents by name, AI summary and extracted text
+    
+    Args:
+        q: Search query; every word must match and the last may be a prefix
+        limit: Maximum number of results
+        offset: Number of results to skip
+        current_user: Current authenticated user
+    
+    Returns:
+        Total match count and a page of results ranked by BM25, with snippets
+    """
+    results = await asyncio.to_thread(search_index.search, current_user.id, q, limit, offset)
+    return {"query": q, "limit": limit, "offset": offset, **results}
+
+@router.post("/batch", response_model=Dict[str, Any])
+async def upload_documents_batch(
+    files: List[UploadFile] = File(...),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload many documents in one request
+    
+    Files are stored concurrently, their documents created in one insert, and
+    analyses queued with a per-user concurrency limit. Files with an
+    unsupported type or over the size limit are reported and skipped.
+    
+    Args:
+        files: Document files
+        current_user: Current authenticated user
+        db: Database session
+    
+    Returns:
+        Batch status, as returned by the batch status endpoint
+    """
+    if len(files) > settings.DOCUMENT_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files (max {settings.DOCUMENT_BATCH_MAX_FILES})"
+        )
+    
+    allowed_extensions = ['.pdf', '.xlsx', '.xls', '.csv', '.tsv']
+    
+    async def store(file: UploadFile) -> Dict[str, Any]:
+        try:
+            file_extension = os.path.splitext(file.filename or "")[1].lower()
+            if file_extension not in allowed_extensions:
+                return {"name": file.filename, "error": f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"}
+            
+            saved = await blob_store.put_upload(file, file_extension)
+            await asyncio.to_thread(blob_store.acquire, saved)
+            return {"file": file, "extension": file_extension, "saved": saved}
+        except UploadTooLargeError as e:
+            return {"name": file.filename, "error": str(e)}
+        except Exception as e:
+            return {"name": file.filename, "error": f"Error saving file: {str(e)}"}
+        finally:
+            file.file.close()
+    
+    # Stream every file into storage concurrently, each in a worker thread
+    stored = await asyncio.gather(*(store(file) for file in files))
+    accepted = [entry for entry in stored if "saved" in entry]
+    rejected = [entry for entry in stored if "error" in entry]
+    
+    # Identical content uploaded before gets its stored analysis
+    cached = {}
+    for content_hash in {entry["saved"].content_hash for entry in accepted}:
+        cached[content_hash] = await document_service.get_cached_analysis(content_hash)
+    
+    # Create the documents in one multi-row insert, then the batch that tracks them
+    rows = [
+        {
+            "name": entry["file"].filename,
+            "path": entry["saved"].path,
+            "type": entry["file"].content_type or entry["extension"][1:],
+            "size": entry["saved"].size,
+            "analysis_status": "pending" if cached[entry["saved"].content_hash] is None else "completed",
+            "analysis": cached[entry["saved"].content_hash],
+            "user_id": current_user.id
+        }
+        for entry in accepted
+    ]
+    # IDs come back in row order, so each pairs with its upload directly
+    document_ids = db.scalars(
+        insert(Document).returning(Document.id, sort_by_parameter_order=True), rows
+    ).all() if rows else []
+    
+    batch = UploadBatch(user_id=current_user.id, document_ids=document_ids, rejected=rejected)
+    db.add(batch)
+    db.commit()
+    db.refresh(batch)
+    
+    # Documents with a cached analysis only need indexing, which may mean extracting their text
+    job_queue.enqueue_many(
+        "index_document",
+        [
+            {"document_id": document_id}
+            for document_id, row in zip(document_ids, rows)
+            if row["analysis"] is not None
+        ],
+        concurrency_key=f"user:{current_user.id}",
+        concurrency_limit=settings.DOCUMENT_ANALYSIS_USER_CONCURRENCY
+    )
+    
+    # Queue the analyses together; at most the user's limit run at once
+    job_queue.enqueue_many(
+        "analyze_document",
+        [
+            {"document_id": document_id, "content_hash": entry["saved"].content_hash}
+            for document_id, row, entry in zip(document_ids, rows, accepted)
+            if row["analysis"] is None
+        ],
+        concurrency_key=f"user:{current_user.id}",
+        concurrency_limit=settings.DOCUMENT_ANALYSIS_USER_CONCURRENCY
+    )
+    
+    return _batch_status(batch, db)
+
+@router.get("/batch/{batch_id}", response_model=Dict[str, Any])
+async def get_batch_status(
+    batch_id: int,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the progress of an upload batch
+    
+    Args:
+        batch_id: Batch ID
+        current_user: Current authenticated user
+        db: Database session
+    
+    Returns:
+        Document counts per analysis status and each document's status and progress
+    """
+    batch = db.query(UploadBatch).filter(
+        UploadBatch.id == batch_id,
+        UploadBatch.user_id == current_user.id
+    ).first()
+    
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found"
+        )
+    
+    return _batch_status(batch, db)
+
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
@@ -119,9 +283,46 @@ async def get_document_analysis(
     
     return document.analysis
 
+@router.get("/{document_id}/progress", response_model=Dict[str, Any])
+async def get_document_progress(
+    document_id: int,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the progress of a document analysis
+    
+    Args:
+        document_id: Document ID
+        current_user: Current authenticated user
+        db: Database session
+    
+    Returns:
+        Analysis status with the finished and total steps while it runs
+    """
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    progress = document_service.progress.get(document_id, {})
+    return {
+        "analysis_status": document.analysis_status,
+        "done": progress.get("done", 0),
+        "total": progress.get("total", 0)
+    }
+
 @router.post("", response_model=DocumentResponse)
 async def upload_document(
     file: UploadFile = File(...),
+    page_start: Optional[int] = Form(None, ge=1),
+    page_end: Optional[int] = Form(None, ge=1),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -130,21 +331,16 @@ async def upload_document(
     
     Args:
         file: Document file
+        page_start: First PDF page to analyze (1-based)
+        page_end: Last PDF page to analyze (inclusive)
         current_user: Current authenticated user
         db: Database session
         
     Returns:
         Uploaded document
     """
-    # Validate file size
-    if file.size > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File too large (max {settings.MAX_UPLOAD_SIZE / 1024 / 1024} MB)"
-        )
-    
     # Validate file type
-    allowed_extensions = ['.pdf', '.xlsx', '.xls']
+    allowed_extensions = ['.pdf', '.xlsx', '.xls', '.csv', '.tsv']
     file_extension = os.path.splitext(file.filename)[1].lower()
     
     if file_extension not in allowed_extensions:
@@ -153,18 +349,23 @@ async def upload_document(
             detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
         )
     
-    # Create upload directory if it doesn't exist
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{timestamp}_{file.filename.replace(' ', '_')}"
-    file_path = os.path.join(settings.UPLOAD_DIR, safe_filename)
+    # Validate page range
+    if page_start is not None and page_end is not None and page_end < page_start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="page_end must not be before page_start"
+        )
     
-    # Save file
+    # Stream the file into content-addressed storage off the event loop, checking its size
+    # and hashing it as it is written; identical content is stored once
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        saved = await blob_store.put_upload(file, file_extension)
+        await asyncio.to_thread(blob_store.acquire, saved)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -173,13 +374,21 @@ async def upload_document(
     finally:
         file.file.close()
     
+    # Identical content uploaded before gets its stored analysis
+    content_hash = saved.content_hash
+    page_range = [page_start or 1, page_end] if page_start is not None or page_end is not None else None
+    cached_analysis = None
+    if page_range is None:
+        cached_analysis = await document_service.get_cached_analysis(content_hash)
+    
     # Create document in database
     document = Document(
         name=file.filename,
-        path=file_path,
+        path=saved.path,
         type=file.content_type or file_extension[1:],
-        size=file.size,
-        analysis_status="pending",
+        size=saved.size,
+        analysis_status="pending" if cached_analysis is None else "completed",
+        analysis=cached_analysis,
         user_id=current_user.id
     )
     
@@ -187,23 +396,26 @@ async def upload_document(
     db.commit()
     db.refresh(document)
     
-    # Start analysis in background
-    # This would typically be done in a background task or queue
-    # but for simplicity, we'll just call it directly here
-    try:
-        # Analyze document
-        analysis = await document_service.analyze_document(file_path, file_extension[1:])
-        
-        # Update document with analysis
-        document.analysis = analysis
-        document.analysis_status = "completed"
-        
-        db.commit()
-        db.refresh(document)
-    except Exception as e:
-        # Update document with failed status
-        document.analysis_status = "failed"
-        db.commit()
+    if cached_analysis is not None:
+        # Indexing may have to extract the text, so it runs in the background too
+        job_queue.enqueue(
+            "index_document",
+            {"document_id": document.id},
+            concurrency_key=f"user:{current_user.id}",
+            concurrency_limit=settings.DOCUMENT_ANALYSIS_USER_CONCURRENCY
+        )
+        return document
+    
+    # Analyze in the background; the status stays pending until a worker finishes
+    payload = {"document_id": document.id, "content_hash": content_hash}
+    if page_range is not None:
+        payload["page_range"] = page_range
+    job_queue.enqueue(
+        "analyze_document",
+        payload,
+        concurrency_key=f"user:{current_user.id}",
+        concurrency_limit=settings.DOCUMENT_ANALYSIS_USER_CONCURRENCY
+    )
     
     return document
 
@@ -232,16 +444,55 @@ async def delete_document(
             detail="Document not found"
         )
     
-    # Delete file
-    try:
-        if os.path.exists(document.path):
-            os.remove(document.path)
-    except Exception as e:
-        # Log error but continue
-        pass
+    # Delete extracted text, the search entry and retrieval chunks
+    await asyncio.to_thread(text_store.delete, document.id)
+    await asyncio.to_thread(search_index.remove, document.id)
+    await asyncio.to_thread(vector_index.remove_document, current_user.id, document.id)
     
     # Delete from database
+    file_path = document.path
     db.delete(document)
     db.commit()
     
-    return
\ No newline at end of file
+    # Drop the file's reference; it is removed once no other document uses it
+    try:
+        await asyncio.to_thread(blob_store.release, file_path)
+    except Exception as e:
+        # Continue; the storage cleanup reconciles reference counts later
+        pass
+    
+    return
+
+def _batch_status(batch: UploadBatch, db: Session) -> Dict[str, Any]:
+    """Summarize the documents of a batch; deleted documents are left out"""
+    documents = {
+        document.id: document
+        for document in db.query(Document).filter(Document.id.in_(batch.document_ids))
+    } if batch.document_ids else {}
+    
+    counts = {"pending": 0, "completed": 0, "failed": 0}
+    results = []
+    for document_id in batch.document_ids:
+        document = documents.get(document_id)
+        if document is None:
+            continue
+        
+        counts[document.analysis_status] = counts.get(document.analysis_status, 0) + 1
+        progress = document_service.progress.get(document_id, {})
+        results.append({
+            "id": document.id,
+            "name": document.name,
+            "analysis_status": document.analysis_status,
+            "done": progress.get("done", 0),
+            "total": progress.get("total", 0)
+        })
+    
+    return {
+        "batch_id": batch.id,
+        "created_at": batch.created_at,
+        "total": len(results),
+        "finished": len(results) - counts["pending"],
+        **counts,
+        "documents": results,
+        "rejected": batch.rejected
+    }
\ No newline at end of file
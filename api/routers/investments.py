@@ -2,7 +2,6 @@
 Investments router for investment management and analysis
 """
 import os
-import shutil
 import tempfile
 from typing import List, Dict, Any
 from datetime import datetime
@@ -13,6 +12,7 @@ from pydantic import BaseModel
 
 from backend.database import get_db
 from backend.services.investment_service import investment_service
+from backend.services.upload_storage import UploadTooLargeError, save_upload
 from backend.core.config import settings
 from api.dependencies import get_current_user
 
@@ -145,10 +145,10 @@ async def import_investments(
     db: Session = Depends(get_db)
 ):
     """
-    Import investments from Excel file
+    Import investments from an Excel, CSV or TSV file
     
     Args:
-        file: Excel file
+        file: Excel, CSV or TSV file
         current_user: Current authenticated user
         db: Database session
         
@@ -156,7 +156,7 @@ async def import_investments(
         Success message
     """
     # Validate file type
-    allowed_extensions = ['.xlsx', '.xls']
+    allowed_extensions = ['.xlsx', '.xls', '.csv', '.tsv']
     file_extension = os.path.splitext(file.filename)[1].lower()
     
     if file_extension not in allowed_extensions:
@@ -165,15 +165,20 @@ async def import_investments(
             detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
         )
     
-    # Save file to temporary location
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
+    fd, temp_path = tempfile.mkstemp(suffix=file_extension)
+    os.close(fd)
+    try:
+        # Stream the file to a temporary location off the event loop
         try:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_path = temp_file.name
+            await save_upload(file, temp_path)
+        except UploadTooLargeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=str(e)
+            )
         finally:
             file.file.close()
     
-    try:
         # Process investments
         investments = await investment_service.import_investment_data(temp_path)
         
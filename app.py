@@ -3,6 +3,7 @@ Main application file for Smart AI Financial Analyzer
 """
 import os
 import datetime
+import tempfile
 from typing import Optional, Dict, Any, List
 
 from fastapi import FastAPI, Request, Depends, Form, HTTPException, Cookie, UploadFile, File
@@ -14,15 +15,19 @@ from sqlalchemy.orm import Session
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from backend.core.config import settings
-from backend.database import get_db, init_db
+from backend.database import get_db
 from backend.filters import setup_jinja_filters
+from backend.lifecycle import start_services, stop_services
 from backend.security import verify_password, get_password_hash
 from backend.models.user import User
 from backend.services.ai_service import ai_service
+from backend.services.blob_store import blob_store
 from backend.services.document_service import document_service
 from backend.services.investment_service import investment_service
+from backend.services.llm_gateway import LLMOverloadedError
 from backend.services.news_service import news_service
 from backend.services.risk_analysis_service import risk_analysis_service
+from backend.services.upload_storage import UploadTooLargeError, save_upload
 
 # Create FastAPI app
 app = FastAPI(
@@ -77,8 +82,14 @@ app.add_middleware(AuthenticationMiddleware)
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the database and other startup tasks"""
-    init_db()
+    """Initialize the database and start the same background services as the API"""
+    await start_services()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background services and flush pending writes on shutdown"""
+    await stop_services()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -373,13 +384,18 @@ async def import_investments(
     """Import investments from a file"""
     user_id = request.session.get("user_id")
     
-    # Save the uploaded file
-    file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
-    
+    # Stream the uploaded file to a temporary location off the event loop
+    fd, file_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename)[1].lower())
+    os.close(fd)
     try:
+        try:
+            await save_upload(file, file_path)
+        except UploadTooLargeError as e:
+            return JSONResponse({
+                "success": False,
+                "message": str(e)
+            }, status_code=413)
+        
         # Import investments from the file
         investments = await investment_service.import_investment_data(file_path)
         
@@ -396,6 +412,10 @@ async def import_investments(
             "success": False,
             "message": f"Error importing investments: {str(e)}"
         }, status_code=400)
+    finally:
+        # Whatever happened, the temporary copy is not needed any more
+        if os.path.exists(file_path):
+            os.remove(file_path)
 
 
 @app.get("/documents", response_class=HTMLResponse)
@@ -479,27 +499,28 @@ async def upload_document(
     """Upload and analyze a document"""
     user_id = request.session.get("user_id")
     
-    # Check file size
-    content = await file.read()
-    file_size = len(content)
+    # Get file extension
+    file_ext = os.path.splitext(file.filename)[1].lower()
     
-    if file_size > settings.MAX_UPLOAD_SIZE:
+    # Stream the uploaded file into content-addressed storage off the event loop, checking its
+    # size and hashing it as it is written. No document row references it here, so storage
+    # cleanup removes it after the grace period.
+    try:
+        saved = await blob_store.put_upload(file, file_ext)
+    except UploadTooLargeError:
         return JSONResponse({
             "success": False,
             "message": f"File is too large. Maximum size is {settings.MAX_UPLOAD_SIZE/1024/1024:.1f}MB"
         }, status_code=400)
+    file_path = saved.path
+    file_size = saved.size
     
-    # Save the uploaded file
-    file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(content)
-    
-    # Get file extension
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    
-    # Analyze the document
+    # Analyze the document, reusing the stored analysis of identical content
     try:
-        analysis = await document_service.analyze_document(file_path, file_ext[1:])
+        analysis = await document_service.get_cached_analysis(saved.content_hash)
+        if analysis is None:
+            analysis = await document_service.analyze_document(file_path, file_ext[1:], user_id=user_id)
+            await document_service.cache_analysis(saved.content_hash, file_size, analysis)
         
         # In a real app, we would save the document and analysis to the database
         # For now, we'll just return the analysis
@@ -520,6 +541,11 @@ async def upload_document(
             "success": True,
             "document": document
         })
+    except LLMOverloadedError as e:
+        return JSONResponse({
+            "success": False,
+            "message": str(e)
+        }, status_code=429, headers={"Retry-After": str(int(e.retry_after))})
     except Exception as e:
         return JSONResponse({
             "success": False,
@@ -537,35 +563,8 @@ async def ai_advisor(request: Request, db: Session = Depends(get_db)):
         request.session.clear()
         return RedirectResponse(url="/login", status_code=303)
     
-    # Get chat history for user
-    # This would normally come from a storage service or database
-    # For now, we'll use some sample data
-    chat_history = [
-        {
-            "id": "1",
-            "content": "How should I allocate my investments for retirement planning?",
-            "role": "user",
-            "timestamp": datetime.datetime.now() - datetime.timedelta(days=1, hours=2)
-        },
-        {
-            "id": "2",
-            "content": "For retirement planning in India, I recommend a balanced approach. Consider allocating:\n\n- 40% to equity mutual funds (focus on index funds and large-cap funds)\n- 30% to debt instruments like PPF, EPF, or government bonds\n- 20% to hybrid funds or balanced advantage funds\n- 10% to gold or international funds for diversification\n\nAlso, maximize your NPS contributions for tax benefits under Section 80CCD(1B). Review your portfolio annually and gradually shift towards debt as you approach retirement age.",
-            "role": "assistant",
-            "timestamp": datetime.datetime.now() - datetime.timedelta(days=1, hours=2)
-        },
-        {
-            "id": "3",
-            "content": "What are the tax implications of short-term investments?",
-            "role": "user",
-            "timestamp": datetime.datetime.now() - datetime.timedelta(hours=5)
-        },
-        {
-            "id": "4",
-            "content": "In India, short-term investments have these tax implications:\n\n1. Equity and equity mutual funds (held < 1 year): 15% STCG tax on profits\n2. Debt mutual funds (held < 3 years): Profits added to your income and taxed at your income tax slab rate\n3. Fixed deposits: Interest is added to your income and taxed at your slab rate\n4. Real estate (held < 2 years): Profits added to your income and taxed at your slab rate\n\nAdditionally, remember that TDS may be applicable on certain interest incomes. Consider tax-saving options like ELSS funds (3-year lock-in) that offer tax deduction under Section 80C while providing equity exposure.",
-            "role": "assistant",
-            "timestamp": datetime.datetime.now() - datetime.timedelta(hours=5)
-        }
-    ]
+    # Get the most recent page of chat history for user
+    chat_history = await ai_service.get_chat_history(user_id)
     
     return templates.TemplateResponse(
         "ai_advisor.html",
@@ -591,13 +590,16 @@ async def chat_with_ai(
         # Get AI response
         response = await ai_service.chat_with_ai(message, user_id=user_id)
         
-        # In a real app, we would save the chat message and response to the database
-        
         return JSONResponse({
             "success": True,
             "response": response,
             "timestamp": datetime.datetime.now().isoformat()
         })
+    except LLMOverloadedError as e:
+        return JSONResponse({
+            "success": False,
+            "message": str(e)
+        }, status_code=429, headers={"Retry-After": str(int(e.retry_after))})
     except Exception as e:
         return JSONResponse({
             "success": False,
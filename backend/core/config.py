@@ -25,6 +25,7 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    ADMIN_USERNAMES: str = os.getenv("ADMIN_USERNAMES", "")  # Comma-separated
     
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./smartfinance.db")
@@ -34,9 +35,95 @@ class Settings(BaseSettings):
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "")
     
+    # LLM backend settings
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "groq")  # groq or stub
+    LLM_MODEL_NAME: str = os.getenv("LLM_MODEL_NAME", "llama2-70b-4096")
+    LLM_STUB_LATENCY: str = os.getenv("LLM_STUB_LATENCY", "lognormal")  # fixed, uniform or lognormal
+    LLM_STUB_LATENCY_MS: float = float(os.getenv("LLM_STUB_LATENCY_MS", "800"))  # Median time to first token
+    LLM_STUB_LATENCY_SPREAD: float = float(os.getenv("LLM_STUB_LATENCY_SPREAD", "0.5"))
+    LLM_STUB_TOKENS_PER_SECOND: float = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "50"))
+    
+    LLM_CONTEXT_WINDOW: int = int(os.getenv("LLM_CONTEXT_WINDOW", "4096"))  # Prompt plus completion tokens
+    DOCUMENT_COMPLETION_TOKENS: int = int(os.getenv("DOCUMENT_COMPLETION_TOKENS", "1024"))
+    
+    # LLM gateway settings (0 disables a rate limit)
+    LLM_MAX_IN_FLIGHT: int = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+    LLM_MAX_QUEUE: int = int(os.getenv("LLM_MAX_QUEUE", "64"))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+    LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    
+    # LLM call resilience settings
+    LLM_CALL_TIMEOUT_SECONDS: float = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "30"))  # Per attempt, 0 for none
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BACKOFF_SECONDS: float = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.5"))
+    LLM_HEDGE_AFTER_SECONDS: float = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))  # 0 disables hedging
+    LLM_BREAKER_ERROR_RATE: float = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+    LLM_BREAKER_MIN_CALLS: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+    LLM_BREAKER_WINDOW_SECONDS: float = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "60"))
+    LLM_BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+    
+    # LLM usage accounting settings
+    LLM_CALL_LOG_SIZE: int = int(os.getenv("LLM_CALL_LOG_SIZE", "1000"))  # Recent calls kept in memory
+    LLM_USAGE_FLUSH_SECONDS: float = float(os.getenv("LLM_USAGE_FLUSH_SECONDS", "10"))
+    LLM_COST_PER_1K_PROMPT_TOKENS: float = float(os.getenv("LLM_COST_PER_1K_PROMPT_TOKENS", "0"))
+    LLM_COST_PER_1K_COMPLETION_TOKENS: float = float(os.getenv("LLM_COST_PER_1K_COMPLETION_TOKENS", "0"))
+    
+    # LLM response cache settings
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))  # 1 hour
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+    
+    # Document analysis settings
+    DOCUMENT_ANALYSIS_MODE: str = os.getenv("DOCUMENT_ANALYSIS_MODE", "auto")  # single, map_reduce or auto
+    DOCUMENT_MAP_MAX_CHUNKS: int = int(os.getenv("DOCUMENT_MAP_MAX_CHUNKS", "8"))
+    DOCUMENT_MAP_CONCURRENCY: int = int(os.getenv("DOCUMENT_MAP_CONCURRENCY", "4"))
+    DOCUMENT_ANALYSIS_USER_CONCURRENCY: int = int(os.getenv("DOCUMENT_ANALYSIS_USER_CONCURRENCY", "2"))  # Analyses per user at once
+    DOCUMENT_BATCH_MAX_FILES: int = int(os.getenv("DOCUMENT_BATCH_MAX_FILES", "50"))
+    
+    # Document analysis cache settings
+    DOCUMENT_CACHE_MAX_ENTRIES: int = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "5000"))
+    DOCUMENT_CACHE_MAX_AGE_DAYS: int = int(os.getenv("DOCUMENT_CACHE_MAX_AGE_DAYS", "90"))  # 0 for no limit
+    
+    # Document retrieval settings for advisor chat
+    VECTOR_DIMENSIONS: int = int(os.getenv("VECTOR_DIMENSIONS", "512"))
+    VECTOR_CHUNK_TOKENS: int = int(os.getenv("VECTOR_CHUNK_TOKENS", "200"))
+    VECTOR_INDEX_MAX_USERS: int = int(os.getenv("VECTOR_INDEX_MAX_USERS", "200"))  # Users kept in memory
+    VECTOR_MIN_SCORE: float = float(os.getenv("VECTOR_MIN_SCORE", "0.1"))
+    CHAT_CONTEXT_CHUNKS: int = int(os.getenv("CHAT_CONTEXT_CHUNKS", "4"))  # 0 to disable retrieval
+    CHAT_CONTEXT_MAX_TOKENS: int = int(os.getenv("CHAT_CONTEXT_MAX_TOKENS", "600"))
+    
+    # Chat memory settings
+    CHAT_MEMORY_MAX_USERS: int = int(os.getenv("CHAT_MEMORY_MAX_USERS", "1000"))
+    CHAT_MEMORY_IDLE_TTL_SECONDS: int = int(os.getenv("CHAT_MEMORY_IDLE_TTL_SECONDS", "1800"))  # 30 minutes
+    CHAT_MEMORY_MAX_BYTES_PER_USER: int = int(os.getenv("CHAT_MEMORY_MAX_BYTES_PER_USER", "65536"))  # 64KB
+    CHAT_MEMORY_MODE: str = os.getenv("CHAT_MEMORY_MODE", "buffer")  # buffer or summary
+    CHAT_MEMORY_RECENT_TURNS: int = int(os.getenv("CHAT_MEMORY_RECENT_TURNS", "4"))
+    CHAT_HISTORY_MAX_TOKENS: int = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "1024"))
+    
+    # PDF extraction settings
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))  # Worker processes
+    PDF_EXTRACT_TIMEOUT_SECONDS: float = float(os.getenv("PDF_EXTRACT_TIMEOUT_SECONDS", "60"))
+    PDF_MAX_PAGES: int = int(os.getenv("PDF_MAX_PAGES", "200"))  # 0 for no limit
+    
+    # Background job settings
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF_SECONDS: float = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))  # Heartbeat-renewed hold on a running job
+    JOB_RETENTION_DAYS: float = float(os.getenv("JOB_RETENTION_DAYS", "7"))  # Finished jobs kept this long
+    
+    # Local data directory for SQLite side stores and caches
+    DATA_DIR: str = os.getenv("DATA_DIR", "./data")
+    
     # File upload settings
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./uploads")
     MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", "10485760"))  # 10MB
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", "1048576"))  # 1MB read per write
+    UPLOAD_FORM_OVERHEAD: int = int(os.getenv("UPLOAD_FORM_OVERHEAD", "65536"))  # Multipart framing and form fields
+    BLOB_GC_INTERVAL_SECONDS: float = float(os.getenv("BLOB_GC_INTERVAL_SECONDS", "300"))
+    BLOB_GC_SHARDS_PER_RUN: int = int(os.getenv("BLOB_GC_SHARDS_PER_RUN", "16"))  # Of 256
+    BLOB_GC_GRACE_SECONDS: float = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))  # 1 hour
     
     # Template settings
     TEMPLATES_DIR: str = os.getenv("TEMPLATES_DIR", "./frontend/templates")
@@ -39,7 +39,12 @@ def get_db() -> Generator[Session, None, None]:
 def init_db() -> None:
     """Initialize database tables"""
     # Import models to ensure they are registered with the Base class
-    from backend.models import user, document, risk_analysis
+    from backend.models import user, document, risk_analysis, chat_message, llm_usage, document_analysis_cache, blob, upload_batch
     
     # Create tables
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    
+    # create_all skips existing tables, so add indexes declared after a table was created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
\ No newline at end of file
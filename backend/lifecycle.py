@@ -0,0 +1,42 @@
+"""
+Startup and shutdown of the shared background services, used by both web apps
+"""
+import os
+
+from backend.core.config import settings
+from backend.database import init_db
+from backend.services.blob_store import blob_store
+from backend.services.chat_history_service import chat_history_service
+from backend.services.chat_memory_store import chat_memory_store
+from backend.services.job_queue import job_queue
+from backend.services.llm_metrics import llm_metrics
+from backend.services.pdf_extraction import pdf_extractor
+
+async def start_services() -> None:
+    """Initialize the database and start the background writers, workers and cleanup"""
+    init_db()
+    # Create upload directory if it doesn't exist
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    # Start batched chat history writes
+    chat_history_service.start()
+    # Start periodic LLM usage ledger writes
+    llm_metrics.start()
+    # Resume queued background jobs and jobs whose lease expired
+    job_queue.start()
+    # Start incremental cleanup of unreferenced uploads
+    blob_store.start()
+
+async def stop_services() -> None:
+    """Stop the background services and persist in-process state"""
+    # Stop job workers; unfinished jobs resume on the next start
+    await job_queue.stop()
+    # Stop upload cleanup
+    await blob_store.stop()
+    # Stop PDF extraction worker processes
+    pdf_extractor.shutdown()
+    # Spill conversation memories so they survive a restart
+    chat_memory_store.flush()
+    # Write any queued chat messages
+    await chat_history_service.stop()
+    # Write outstanding LLM usage to the ledger
+    await llm_metrics.stop()
\ No newline at end of file
@@ -0,0 +1,19 @@
+"""
+Upload blob model for SQLAlchemy
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime
+
+from backend.database import Base
+
+class Blob(Base):
+    """Stored upload content shared by every document with the same bytes and type"""
+    __tablename__ = "blobs"
+    
+    key = Column(String, primary_key=True)  # Path under the blob root: ab/cd/<sha256><ext>
+    content_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of the file, hex
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)  # Documents pointing at the blob
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    released_at = Column(DateTime, nullable=True, index=True)  # When the last reference went away
\ No newline at end of file
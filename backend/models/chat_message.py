@@ -0,0 +1,28 @@
+"""
+Chat message model for SQLAlchemy
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship
+
+from backend.database import Base
+
+class ChatMessage(Base):
+    """Chat message exchanged with the AI advisor"""
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Serves keyset pagination of a user's history
+        Index("ix_chat_messages_user_id_created_at", "user_id", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    role = Column(String, nullable=False)  # user, assistant
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Foreign keys
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Relationships
+    user = relationship("User", back_populates="chat_messages")
\ No newline at end of file
@@ -15,7 +15,7 @@ class Document(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    path = Column(String, nullable=False)
+    path = Column(String, nullable=False, index=True)
     type = Column(String, nullable=False)
     size = Column(Integer, nullable=False)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
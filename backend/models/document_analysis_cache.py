@@ -0,0 +1,24 @@
+"""
+Document analysis cache model for SQLAlchemy
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+
+from backend.database import Base
+
+class DocumentAnalysisCache(Base):
+    """Stored analysis of a document's content, shared by every upload of the same bytes"""
+    __tablename__ = "document_analysis_cache"
+    __table_args__ = (
+        UniqueConstraint("content_hash", "prompt_version", name="uq_document_analysis_cache_hash_version"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)  # SHA-256 of the file, hex
+    prompt_version = Column(String, nullable=False)
+    analysis = Column(JSON, nullable=False)
+    size = Column(Integer, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
\ No newline at end of file
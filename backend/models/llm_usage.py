@@ -0,0 +1,28 @@
+"""
+LLM usage ledger model for SQLAlchemy
+"""
+from sqlalchemy import Column, Integer, String, Date, Float, Index
+
+from backend.database import Base
+
+class LLMUsage(Base):
+    """Aggregated LLM calls, tokens, latency and cost per day, user, endpoint and model"""
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        Index("ix_llm_usage_day_user_id_endpoint", "day", "user_id", "endpoint"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    # Not a foreign key: shared calls (cached financial insights) have no user,
+    # and spend must stay on the books after a user is deleted
+    user_id = Column(Integer, nullable=True)
+    endpoint = Column(String, nullable=False)
+    model_name = Column(String, nullable=False)
+    calls = Column(Integer, default=0, nullable=False)
+    errors = Column(Integer, default=0, nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    total_latency_ms = Column(Float, default=0.0, nullable=False)
+    total_queue_ms = Column(Float, default=0.0, nullable=False)
+    cost = Column(Float, default=0.0, nullable=False)
\ No newline at end of file
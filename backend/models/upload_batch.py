@@ -0,0 +1,24 @@
+"""
+Upload batch model for SQLAlchemy
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, DateTime, JSON, ForeignKey
+from sqlalchemy.orm import relationship
+
+from backend.database import Base
+
+class UploadBatch(Base):
+    """Documents uploaded together in one request, tracked as a unit"""
+    __tablename__ = "upload_batches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_ids = Column(JSON, nullable=False)  # Documents created, in upload order
+    rejected = Column(JSON, nullable=False)  # Files refused, with the reason
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Foreign keys
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    
+    # Relationships
+    user = relationship("User", back_populates="upload_batches")
\ No newline at end of file
@@ -28,4 +28,6 @@ class User(Base):
     
     # Relationships
     documents = relationship("Document", back_populates="user", cascade="all, delete-orphan")
-    risk_analyses = relationship("RiskAnalysis", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    risk_analyses = relationship("RiskAnalysis", back_populates="user", cascade="all, delete-orphan")
+    chat_messages = relationship("ChatMessage", back_populates="user", cascade="all, delete-orphan")
+    upload_batches = relationship("UploadBatch", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
@@ -3,50 +3,52 @@ AI service using langchain with GROQ integration
 """
 import os
 import json
+import asyncio
 import logging
 import random
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
-from uuid import uuid4
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 
-from langchain.chains import ConversationChain, LLMChain
-from langchain.prompts import PromptTemplate
 from langchain.memory import ConversationBufferMemory
-from langchain_groq import ChatGroq
 
 from backend.core.config import settings
+from backend.services.chat_history_service import chat_history_service
+from backend.services.chat_memory_store import chat_memory_store
+from backend.services.llm_cache import insight_cache
+from backend.services.llm_gateway import LLMOverloadedError, llm_gateway
+from backend.services.prompt_registry import output_text, prompt_registry
+from backend.services.single_flight import llm_single_flight
+from backend.services.summary_memory import RollingSummaryMemory
+from backend.services.tokens import estimate_tokens, truncate_to_tokens
+from backend.services.vector_index import vector_index
 
 logger = logging.getLogger(__name__)
 
 class AIService:
     """Service for AI capabilities using Langchain with GROQ API"""
     
+    # Model settings, also part of the insight cache key
+    model_settings = {
+        "model_name": settings.LLM_MODEL_NAME,
+        "temperature": 0.7,
+        "max_tokens": 2048,
+    }
+    
     def __init__(self):
         """Initialize the AI service"""
         self.llm = None
-        self.chat_memories = {}  # User ID -> ConversationBufferMemory
+        self.chat_memories = chat_memory_store  # User ID -> ConversationBufferMemory
         self._initialize()
     
     def _initialize(self):
         """Initialize the Langchain components with GROQ"""
-        # Check if GROQ API key is available
-        if not settings.GROQ_API_KEY:
+        # Get the shared model for the configured backend from the gateway
+        self.llm = llm_gateway.get_llm(**self.model_settings)
+        if self.llm is None:
             logger.warning("GROQ API key not found, AI services will be limited")
             return
         
-        try:
-            # Initialize GROQ model
-            self.llm = ChatGroq(
-                api_key=settings.GROQ_API_KEY,
-                model_name="llama2-70b-4096",  # Can be changed to other GROQ models
-                temperature=0.7,
-                max_tokens=2048,
-            )
-            
-            logger.info("GROQ LLM initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize GROQ LLM: {str(e)}")
-            self.llm = None
+        logger.info("LLM initialized successfully")
     
     async def get_financial_insight(self, user_id: int) -> Dict[str, Any]:
         """
@@ -64,31 +66,36 @@ class AIService:
                 "confidence": 0.0
             }
         
-        # Create prompt for financial insights
-        prompt_template = PromptTemplate(
-            input_variables=["context"],
-            template="""You are a financial advisor for Indian investors. Based on current economic trends in India 
-            and global markets, provide one actionable financial insight that would be valuable for Indian investors.
-            
-            Context: {context}
-            
-            Give a precise, actionable insight with a confidence level (0-100%).
-            Format your response as JSON: {"message": "Your insight here", "confidence": confidence_value}
-            """
-        )
-        
         # Get current date for context
         current_date = datetime.now().strftime("%Y-%m-%d")
         
         # Create context (in a real app, this would include user's portfolio data)
         context = f"Current date: {current_date}. User is interested in financial advice for Indian markets."
         
+        prompt = prompt_registry.get("financial_insight")
+        
+        # The prompt is the same for every user, so the rendered text keys the cache
+        cache_key = insight_cache.make_key(
+            prompt.template.format(context=context),
+            prompt_version=prompt.version,
+            **self.model_settings
+        )
+        cached = insight_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Concurrent cold-cache requests share a single LLM call
+        return await llm_single_flight.do(
+            cache_key,
+            lambda: self._generate_insight(context, cache_key)
+        )
+    
+    async def _generate_insight(self, context: str, cache_key: str) -> Dict[str, Any]:
+        """Call the LLM for an insight and cache the parsed result"""
         try:
-            # Create chain
-            chain = LLMChain(llm=self.llm, prompt=prompt_template)
-            
-            # Run chain
-            response = await chain.arun(context=context)
+            # Run the shared prompt | llm runnable
+            chain = prompt_registry.runnable("financial_insight", self.llm)
+            response = output_text(await llm_gateway.ainvoke(chain, {"context": context}, endpoint="insight"))
             
             # Parse JSON response
             try:
@@ -96,16 +103,19 @@ class AIService:
                 # Ensure the result has the expected format
                 if "message" not in result or "confidence" not in result:
                     raise ValueError("Invalid response format")
-                
-                return result
             except (json.JSONDecodeError, ValueError):
                 # If parsing fails, extract message and generate random confidence
                 logger.warning(f"Failed to parse AI response as JSON: {response}")
-                return {
+                result = {
                     "message": response.strip(),
                     "confidence": round(random.uniform(50, 90), 1)
                 }
+            
+            insight_cache.set(cache_key, result)
+            return result
         
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error getting AI insight: {str(e)}")
             return {
@@ -113,6 +123,51 @@ class AIService:
                 "confidence": 0.0
             }
     
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get insight cache statistics
+        
+        Returns:
+            Dictionary with cache size, hit/miss counters and hit rate
+        """
+        return insight_cache.stats()
+    
+    def prompt_stats(self) -> Dict[str, Any]:
+        """
+        Get prompt registry statistics
+        
+        Returns:
+            Dictionary with prompt versions and construction overhead
+        """
+        return prompt_registry.stats()
+    
+    def single_flight_stats(self) -> Dict[str, Any]:
+        """
+        Get request coalescing statistics
+        
+        Returns:
+            Dictionary with in-flight, leader and coalesced call counts
+        """
+        return llm_single_flight.stats()
+    
+    def gateway_stats(self) -> Dict[str, Any]:
+        """
+        Get LLM gateway statistics
+        
+        Returns:
+            Dictionary with in-flight calls, queue depth and wait times
+        """
+        return llm_gateway.stats()
+    
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Get chat memory store statistics
+        
+        Returns:
+            Dictionary with resident users, spill and rehydration counters
+        """
+        return self.chat_memories.stats()
+    
     async def chat_with_ai(
         self, 
         message: str, 
@@ -133,60 +188,159 @@ class AIService:
         if self.llm is None:
             return "AI chat services are currently unavailable. Please check your GROQ API key."
         
-        # Initialize memory for this user if it doesn't exist
-        if user_id not in self.chat_memories:
-            self.chat_memories[user_id] = ConversationBufferMemory()
-        
-        # Create prompt template
-        prompt_template = PromptTemplate(
-            input_variables=["history", "input"],
-            template="""You are a financial advisor specializing in the Indian market. 
-            You provide helpful, ethical, and accurate financial advice.
-            
-            Current conversation:
-            {history}
-            Human: {input}
-            AI: """
-        )
+        memory = self._get_memory(user_id)
         
         try:
-            # Create conversation chain
-            conversation = ConversationChain(
-                llm=self.llm,
-                memory=self.chat_memories[user_id],
-                prompt=prompt_template,
-                verbose=False
+            # Run the shared conversation runnable with this user's history
+            conversation = prompt_registry.runnable("advisor_chat", self.llm)
+            response = output_text(
+                await llm_gateway.ainvoke(
+                    conversation,
+                    await self._chat_inputs(memory, message, user_id),
+                    endpoint="chat",
+                    user_id=user_id
+                )
             )
+            response = response.strip()
             
-            # Get response
-            response = await conversation.arun(input=message)
+            memory.save_context({"input": message}, {"response": response})
+            self._after_turn(user_id, memory, message, response)
             
-            return response.strip()
+            return response
         
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error in AI chat: {str(e)}")
             return "I'm sorry, I couldn't process your request at this time. Please try again later."
     
-    async def get_chat_history(self, user_id: int) -> List[Dict[str, Any]]:
+    async def stream_chat(self, message: str, user_id: int = 0) -> AsyncIterator[str]:
+        """
+        Stream a chat response from the AI financial advisor as it is generated
+        
+        Args:
+            message: User message
+            user_id: User ID for persistent conversation context
+            
+        Yields:
+            Chunks of the AI response
+        """
+        if self.llm is None:
+            yield "AI chat services are currently unavailable. Please check your GROQ API key."
+            return
+        
+        memory = self._get_memory(user_id)
+        conversation = prompt_registry.runnable("advisor_chat", self.llm)
+        
+        chunks = []
+        try:
+            stream = llm_gateway.astream(
+                conversation,
+                await self._chat_inputs(memory, message, user_id),
+                endpoint="chat_stream",
+                user_id=user_id
+            )
+            async for chunk in stream:
+                text = output_text(chunk)
+                if text:
+                    chunks.append(text)
+                    yield text
+        except LLMOverloadedError:
+            # Nothing has been sent yet, so let the caller answer 429
+            if not chunks:
+                raise
+            return
+        except Exception as e:
+            logger.error(f"Error in AI chat stream: {str(e)}")
+            if not chunks:
+                yield "I'm sorry, I couldn't process your request at this time. Please try again later."
+            return
+        
+        # Commit the full exchange so the next turn sees it
+        response = "".join(chunks).strip()
+        memory.save_context({"input": message}, {"response": response})
+        self._after_turn(user_id, memory, message, response)
+    
+    def _get_memory(self, user_id: int) -> ConversationBufferMemory:
+        """Get the conversation memory for a user, rehydrating or creating it if needed"""
+        return self.chat_memories.get(user_id)
+    
+    def _after_turn(
+        self,
+        user_id: int,
+        memory: ConversationBufferMemory,
+        message: str,
+        response: str
+    ) -> None:
+        """Record a completed turn and do any follow-up work off the request path"""
+        # Persisted in the background by batched writes
+        chat_history_service.record(user_id, "user", message)
+        chat_history_service.record(user_id, "assistant", response)
+        
+        self.chat_memories.save(user_id, memory)
+        if isinstance(memory, RollingSummaryMemory):
+            memory.schedule_fold(self.llm, user_id)
+    
+    async def _chat_inputs(self, memory: ConversationBufferMemory, message: str, user_id: int) -> Dict[str, str]:
+        """Build the advisor chat prompt variables from a user's memory and documents"""
+        return {
+            "documents": await self._document_context(user_id, message),
+            "history": memory.load_memory_variables({})["history"],
+            "input": message
+        }
+    
+    async def _document_context(self, user_id: int, message: str) -> str:
+        """
+        Retrieve the user's document excerpts most relevant to a message
+        
+        Excerpts come from the local vector index, best first, and stop at the
+        context token budget so the prompt stays small.
+        
+        Args:
+            user_id: User whose documents are searched
+            message: User message
+        
+        Returns:
+            Excerpts labelled with their document name, or "None" if nothing matches
+        """
+        if settings.CHAT_CONTEXT_CHUNKS <= 0 or not user_id:
+            return "None"
+        
+        try:
+            chunks = await asyncio.to_thread(vector_index.search, user_id, message, settings.CHAT_CONTEXT_CHUNKS)
+        except Exception as e:
+            logger.error(f"Error retrieving document context for user {user_id}: {str(e)}")
+            return "None"
+        
+        excerpts = []
+        remaining = settings.CHAT_CONTEXT_MAX_TOKENS
+        for chunk in chunks:
+            excerpt = truncate_to_tokens(f"[{chunk['name']}] {chunk['text']}", remaining)
+            if not excerpt:
+                break
+            excerpts.append(excerpt)
+            remaining -= estimate_tokens(excerpt)
+        
+        return "\n\n".join(excerpts) or "None"
+    
+    async def get_chat_history(
+        self,
+        user_id: int,
+        before: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
         """
         Get chat history for a user
         
         Args:
             user_id: User ID
+            before: Only return messages older than this message ID
+            limit: Maximum number of messages to return
             
         Returns:
-            List of chat messages
-        """
-        # In a real app, this would be stored in the database
-        # For now, we'll just return a placeholder
-        return [
-            {
-                "id": str(uuid4()),
-                "content": "How can I help you with your financial planning today?",
-                "role": "assistant",
-                "timestamp": datetime.now()
-            }
-        ]
+            List of chat messages, oldest first
+        """
+        return await chat_history_service.get_messages(user_id, before=before, limit=limit)
 
 # Singleton instance
 ai_service = AIService()
\ No newline at end of file
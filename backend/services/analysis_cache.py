@@ -0,0 +1,186 @@
+"""
+Content-addressed cache of document analyses
+"""
+import copy
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.core.config import settings
+from backend.database import SessionLocal
+from backend.models.document_analysis_cache import DocumentAnalysisCache
+
+logger = logging.getLogger(__name__)
+
+class AnalysisCache:
+    """
+    Document analyses keyed by content hash and prompt version
+    
+    Re-uploading the same bytes returns the stored analysis without
+    extraction or an LLM call; bumping the prompt version misses naturally.
+    Entries older than `max_age_days` are dropped, and beyond `max_entries`
+    the least recently used are evicted. Methods use the database and are
+    meant to be called from a worker thread in async code.
+    """
+    
+    def __init__(self, max_entries: int = 5000, max_age_days: int = 90):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries: Maximum number of stored analyses
+            max_age_days: Age in days after which an analysis is dropped (0 for no limit)
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, content_hash: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored analysis of a document
+        
+        Args:
+            content_hash: SHA-256 of the document
+            prompt_version: Version of the analysis prompt
+        
+        Returns:
+            A copy of the analysis, or None on a miss or expired entry
+        """
+        db = SessionLocal()
+        try:
+            entry = db.query(DocumentAnalysisCache).filter(
+                DocumentAnalysisCache.content_hash == content_hash,
+                DocumentAnalysisCache.prompt_version == prompt_version
+            ).first()
+            
+            if entry is not None and self._expired(entry):
+                db.delete(entry)
+                db.commit()
+                entry = None
+                self._count(evictions=1)
+            
+            if entry is None:
+                self._count(misses=1)
+                return None
+            
+            entry.hits += 1
+            entry.last_used_at = datetime.utcnow()
+            db.commit()
+            self._count(hits=1)
+            
+            return copy.deepcopy(entry.analysis)
+        finally:
+            db.close()
+    
+    def set(self, content_hash: str, prompt_version: str, analysis: Dict[str, Any], size: int) -> None:
+        """
+        Store an analysis, evicting expired and least recently used entries
+        
+        Args:
+            content_hash: SHA-256 of the document
+            prompt_version: Version of the analysis prompt
+            analysis: Analysis result
+            size: Document size in bytes
+        """
+        db = SessionLocal()
+        try:
+            entry = db.query(DocumentAnalysisCache).filter(
+                DocumentAnalysisCache.content_hash == content_hash,
+                DocumentAnalysisCache.prompt_version == prompt_version
+            ).first()
+            
+            now = datetime.utcnow()
+            if entry is None:
+                db.add(DocumentAnalysisCache(
+                    content_hash=content_hash,
+                    prompt_version=prompt_version,
+                    analysis=analysis,
+                    size=size,
+                    created_at=now,
+                    last_used_at=now
+                ))
+            else:
+                entry.analysis = analysis
+                entry.created_at = now
+                entry.last_used_at = now
+            
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker stored the same document first; its analysis is as good
+                db.rollback()
+            
+            self._evict(db)
+        finally:
+            db.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with size, hit/miss counters and hit rate
+        """
+        db = SessionLocal()
+        try:
+            size = db.query(DocumentAnalysisCache).count()
+        finally:
+            db.close()
+        
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "max_entries": self.max_entries,
+                "max_age_days": self.max_age_days,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+    
+    def _evict(self, db) -> None:
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        evicted = 0
+        if self.max_age_days > 0:
+            cutoff = datetime.utcnow() - timedelta(days=self.max_age_days)
+            evicted += db.query(DocumentAnalysisCache).filter(
+                DocumentAnalysisCache.created_at < cutoff
+            ).delete(synchronize_session=False)
+        
+        excess = db.query(DocumentAnalysisCache).count() - self.max_entries
+        if excess > 0:
+            oldest = db.query(DocumentAnalysisCache.id).order_by(
+                DocumentAnalysisCache.last_used_at
+            ).limit(excess).subquery()
+            evicted += db.query(DocumentAnalysisCache).filter(
+                DocumentAnalysisCache.id.in_(oldest.select())
+            ).delete(synchronize_session=False)
+        
+        if evicted:
+            db.commit()
+            self._count(evictions=evicted)
+            logger.info(f"Evicted {evicted} cached document analyses")
+    
+    def _expired(self, entry: DocumentAnalysisCache) -> bool:
+        if self.max_age_days <= 0:
+            return False
+        return entry.created_at < datetime.utcnow() - timedelta(days=self.max_age_days)
+    
+    def _count(self, hits: int = 0, misses: int = 0, evictions: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+# Shared document analysis cache
+analysis_cache = AnalysisCache(
+    max_entries=settings.DOCUMENT_CACHE_MAX_ENTRIES,
+    max_age_days=settings.DOCUMENT_CACHE_MAX_AGE_DAYS
+)
\ No newline at end of file
@@ -0,0 +1,368 @@
+"""
+Content-addressed, sharded storage for uploaded files
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from backend.core.config import settings
+from backend.database import SessionLocal
+from backend.models.blob import Blob
+from backend.models.document import Document
+from backend.services.upload_storage import SavedUpload, save_upload
+
+logger = logging.getLogger(__name__)
+
+# First-level shard directories (two hex digits of the hash), swept by the collector in turn
+SHARDS = [f"{i:02x}" for i in range(256)]
+
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+class BlobStore:
+    """
+    Uploads stored once per distinct content, under the SHA-256 of their bytes
+    
+    Files live at root/ab/cd/<sha256><ext>, so no directory grows past a few
+    dozen entries even at millions of files, and uploading the same bytes
+    again reuses the existing file. The extension stays in the name because
+    readers pick a parser from it. A Blob row per file counts the documents
+    pointing at it; a document delete removes the file once the count
+    reaches zero.
+    
+    A collector sweeps a few shards per run. It recounts references from
+    the documents table (fixing counts left wrong by a crash between the
+    blob and document writes) and removes unreferenced files, files with
+    no Blob row and abandoned partial uploads once they are older than the
+    grace period, which keeps it clear of uploads still in flight.
+    """
+    
+    def __init__(
+        self,
+        root: str,
+        grace_seconds: float = 3600,
+        gc_interval: float = 300,
+        gc_shards_per_run: int = 16
+    ):
+        """
+        Initialize the store
+        
+        Args:
+            root: Directory holding the blobs
+            grace_seconds: Age before an unreferenced or orphaned file may be removed
+            gc_interval: Seconds between collector runs
+            gc_shards_per_run: First-level shards swept per run
+        """
+        self.root = root
+        self.grace_seconds = grace_seconds
+        self.gc_interval = gc_interval
+        self.gc_shards_per_run = max(1, gc_shards_per_run)
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._next_shard = 0
+        self.stored = 0
+        self.deduplicated = 0
+        self.removed = 0
+        self.counts_fixed = 0
+    
+    def path_for(self, content_hash: str, extension: str) -> str:
+        """
+        Get the path of a blob
+        
+        Args:
+            content_hash: SHA-256 of the content, hex
+            extension: File extension including the dot
+        
+        Returns:
+            Path under the blob root
+        """
+        extension = extension.lower()
+        if not _EXTENSION.match(extension):
+            extension = ""
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], f"{content_hash}{extension}")
+    
+    async def put_upload(self, upload: Any, extension: str, max_bytes: int = settings.MAX_UPLOAD_SIZE) -> SavedUpload:
+        """
+        Stream an upload into the store, keeping the existing file if the content is already there
+        
+        Args:
+            upload: Uploaded file (anything with a binary .file)
+            extension: File extension including the dot
+            max_bytes: Size limit; 0 for no limit
+        
+        Returns:
+            The stored blob's path, size and hash; take a reference with acquire()
+            before pointing a document at it
+        
+        Raises:
+            UploadTooLargeError: If the file is larger than max_bytes
+        """
+        incoming = os.path.join(self.root, "incoming", uuid.uuid4().hex)
+        saved = await save_upload(upload, incoming, max_bytes)
+        return await asyncio.to_thread(self._place, saved, extension)
+    
+    def acquire(self, saved: SavedUpload) -> None:
+        """
+        Count a new document reference to a stored blob
+        
+        Args:
+            saved: Blob returned by put_upload
+        """
+        key = self._key(saved.path)
+        db = SessionLocal()
+        try:
+            if not self._increment(db, key):
+                db.add(Blob(key=key, content_hash=saved.content_hash, size=saved.size, ref_count=1))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another upload of the same content created the row first
+                    db.rollback()
+                    self._increment(db, key)
+        finally:
+            db.close()
+    
+    def release(self, path: str) -> None:
+        """
+        Drop a document's reference to a file, removing the file if nothing else uses it
+        
+        Files outside the store (uploaded before it existed) are removed directly.
+        
+        Args:
+            path: Path the document pointed at
+        """
+        key = self._key(path)
+        if key is None:
+            self._remove_file(path)
+            return
+        
+        db = SessionLocal()
+        try:
+            db.query(Blob).filter(Blob.key == key, Blob.ref_count > 0).update(
+                {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False
+            )
+            db.commit()
+            
+            blob = db.get(Blob, key)
+            if blob is None or blob.ref_count > 0:
+                return
+            
+            # The documents table is the source of truth; a file is removed only if
+            # nothing points at it and it was not touched within the grace period,
+            # when an upload in flight may be about to reference it
+            referenced = db.query(Document.id).filter(Document.path == path).first() is not None
+            if not referenced and self._older_than_grace(path):
+                removed = db.query(Blob).filter(Blob.key == key, Blob.ref_count == 0).delete(synchronize_session=False)
+                db.commit()
+                if removed:
+                    self._remove_file(path)
+            else:
+                blob.released_at = datetime.utcnow()
+                db.commit()
+        finally:
+            db.close()
+    
+    def collect(self, shards: int) -> None:
+        """
+        Sweep the next few shards, fixing reference counts and removing unreferenced files
+        
+        Args:
+            shards: Number of first-level shards to sweep
+        """
+        for _ in range(min(shards, len(SHARDS))):
+            with self._lock:
+                shard = SHARDS[self._next_shard]
+                self._next_shard = (self._next_shard + 1) % len(SHARDS)
+            self._collect_shard(shard)
+        
+        self._collect_incoming()
+    
+    def start(self) -> None:
+        """Start the periodic collector on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the collector"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get storage statistics
+        
+        Returns:
+            Dictionary with blob and reference counts, bytes stored and collector counters
+        """
+        db = SessionLocal()
+        try:
+            blobs, references, size = db.query(
+                func.count(Blob.key), func.coalesce(func.sum(Blob.ref_count), 0), func.coalesce(func.sum(Blob.size), 0)
+            ).one()
+        finally:
+            db.close()
+        
+        with self._lock:
+            return {
+                "blobs": blobs,
+                "references": references,
+                "bytes_stored": size,
+                "stored": self.stored,
+                "deduplicated": self.deduplicated,
+                "removed": self.removed,
+                "counts_fixed": self.counts_fixed
+            }
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.gc_interval)
+            try:
+                await asyncio.to_thread(self.collect, self.gc_shards_per_run)
+            except Exception as e:
+                logger.error(f"Error collecting unreferenced uploads: {str(e)}")
+    
+    def _place(self, saved: SavedUpload, extension: str) -> SavedUpload:
+        """Move a freshly written upload to its content address, or drop it if that file exists"""
+        path = self.path_for(saved.content_hash, extension)
+        try:
+            # Refresh the timestamp so the collector leaves the file alone until it is referenced
+            os.utime(path)
+            os.remove(saved.path)
+            self._count(deduplicated=1)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(saved.path, path)
+            self._count(stored=1)
+        
+        return SavedUpload(path, saved.size, saved.content_hash)
+    
+    def _collect_shard(self, shard: str) -> None:
+        """Reconcile one first-level shard: counts from documents, then files on disk"""
+        prefix = os.path.join(self.root, shard) + os.sep
+        db = SessionLocal()
+        try:
+            # Paths in the shard sort between the prefix and the prefix with its separator bumped
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            references: Dict[str, int] = {}
+            for path, count in db.query(Document.path, func.count(Document.id)).filter(
+                Document.path >= prefix, Document.path < upper
+            ).group_by(Document.path):
+                references[self._key(path)] = count
+            
+            blobs = {blob.key: blob for blob in db.query(Blob).filter(Blob.key >= f"{shard}/", Blob.key < f"{shard}0")}
+            now = datetime.utcnow()
+            cutoff = now - timedelta(seconds=self.grace_seconds)
+            for key, blob in blobs.items():
+                # Recently written blobs may have a reference taken but no document yet
+                if not self._older_than_grace(self._path(key)):
+                    continue
+                
+                count = references.get(key, 0)
+                if blob.ref_count != count:
+                    logger.warning(f"Fixing reference count of blob {key}: {blob.ref_count} -> {count}")
+                    blob.ref_count = count
+                    self._count(counts_fixed=1)
+                
+                if count > 0:
+                    blob.released_at = None
+                elif blob.released_at is None:
+                    blob.released_at = now
+                elif blob.released_at < cutoff:
+                    db.delete(blob)
+                    self._remove_file(self._path(key))
+            
+            # Files referenced by documents but missing a row, e.g. after a crash
+            for key, count in references.items():
+                if key not in blobs and os.path.exists(self._path(key)):
+                    db.add(Blob(
+                        key=key,
+                        content_hash=os.path.basename(key)[:64],
+                        size=os.path.getsize(self._path(key)),
+                        ref_count=count
+                    ))
+                    self._count(counts_fixed=1)
+            db.commit()
+        finally:
+            db.close()
+        
+        # Files nobody has a row for
+        directory = os.path.join(self.root, shard)
+        if not os.path.isdir(directory):
+            return
+        for subdirectory in os.scandir(directory):
+            if not subdirectory.is_dir():
+                continue
+            for entry in os.scandir(subdirectory.path):
+                key = self._key(entry.path)
+                if key not in blobs and key not in references and self._older_than_grace(entry.path):
+                    self._remove_file(entry.path)
+    
+    def _collect_incoming(self) -> None:
+        """Remove partial uploads abandoned by a crashed request"""
+        directory = os.path.join(self.root, "incoming")
+        if not os.path.isdir(directory):
+            return
+        for entry in os.scandir(directory):
+            if self._older_than_grace(entry.path):
+                self._remove_file(entry.path)
+    
+    def _increment(self, db, key: str) -> bool:
+        """Add a reference to an existing row; False if there is none"""
+        updated = db.query(Blob).filter(Blob.key == key).update(
+            {Blob.ref_count: Blob.ref_count + 1, Blob.released_at: None}, synchronize_session=False
+        )
+        db.commit()
+        return updated > 0
+    
+    def _key(self, path: str) -> Optional[str]:
+        """Blob key of a path, or None if it is outside the store"""
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+        if relative.startswith(os.pardir) or os.sep not in relative:
+            return None
+        return relative.replace(os.sep, "/")
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+    
+    def _older_than_grace(self, path: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(path) > self.grace_seconds
+        except FileNotFoundError:
+            return True
+    
+    def _remove_file(self, path: str) -> None:
+        try:
+            os.remove(path)
+            self._count(removed=1)
+        except FileNotFoundError:
+            pass
+    
+    def _count(self, stored: int = 0, deduplicated: int = 0, removed: int = 0, counts_fixed: int = 0) -> None:
+        with self._lock:
+            self.stored += stored
+            self.deduplicated += deduplicated
+            self.removed += removed
+            self.counts_fixed += counts_fixed
+
+# Shared upload storage
+blob_store = BlobStore(
+    os.path.join(settings.UPLOAD_DIR, "blobs"),
+    grace_seconds=settings.BLOB_GC_GRACE_SECONDS,
+    gc_interval=settings.BLOB_GC_INTERVAL_SECONDS,
+    gc_shards_per_run=settings.BLOB_GC_SHARDS_PER_RUN
+)
\ No newline at end of file
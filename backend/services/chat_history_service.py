@@ -0,0 +1,178 @@
+"""
+Chat history service for persisting and paginating advisor conversations
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, insert, or_
+
+from backend.database import SessionLocal
+from backend.models.chat_message import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+class ChatHistoryService:
+    """
+    Service for chat history persistence
+    
+    Messages are queued in memory and written by a background task in batches,
+    so recording a message never waits on the database.
+    """
+    
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.5, max_queue_size: int = 10000):
+        """
+        Initialize the chat history service
+        
+        Args:
+            batch_size: Maximum number of messages per insert
+            flush_interval: Seconds to wait for a batch to fill before writing it
+            max_queue_size: Maximum number of unwritten messages held in memory
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+    
+    def start(self) -> None:
+        """Start the background writer on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Write any queued messages and stop the background writer"""
+        if self._task is None:
+            return
+        
+        # The sentinel is queued behind pending messages, so everything before it is written
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+    
+    def record(self, user_id: int, role: str, content: str) -> None:
+        """
+        Queue a chat message for persistence without blocking
+        
+        Args:
+            user_id: User ID
+            role: Message role (user or assistant)
+            content: Message text
+        """
+        if self._task is None or self._task.done():
+            self.start()
+        
+        try:
+            self._queue.put_nowait({
+                "user_id": user_id,
+                "role": role,
+                "content": content,
+                "created_at": datetime.utcnow()
+            })
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Chat history queue full, dropping message for user {user_id}")
+    
+    async def get_messages(
+        self,
+        user_id: int,
+        before: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a page of chat history using keyset pagination
+        
+        Args:
+            user_id: User ID
+            before: Only return messages older than this message ID
+            limit: Maximum number of messages to return
+        
+        Returns:
+            List of chat messages, oldest first
+        """
+        return await asyncio.to_thread(self._query_messages, user_id, before, limit)
+    
+    async def _run(self) -> None:
+        """Collect queued messages into batches and write them"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"Error writing chat history batch: {str(e)}")
+    
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Insert a batch of messages in one statement"""
+        db = SessionLocal()
+        try:
+            db.execute(insert(ChatMessage), batch)
+            db.commit()
+            self.written += len(batch)
+        finally:
+            db.close()
+    
+    def _query_messages(self, user_id: int, before: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        """Read one page of messages, newest first from the index, returned oldest first"""
+        db = SessionLocal()
+        try:
+            query = db.query(ChatMessage).filter(ChatMessage.user_id == user_id)
+            
+            if before is not None:
+                anchor = db.query(ChatMessage.created_at).filter(
+                    ChatMessage.id == before,
+                    ChatMessage.user_id == user_id
+                ).scalar()
+                if anchor is None:
+                    return []
+                
+                # Seek past the anchor on (created_at, id) instead of using OFFSET
+                query = query.filter(or_(
+                    ChatMessage.created_at < anchor,
+                    and_(ChatMessage.created_at == anchor, ChatMessage.id < before)
+                ))
+            
+            messages = query.order_by(
+                ChatMessage.created_at.desc(),
+                ChatMessage.id.desc()
+            ).limit(limit).all()
+            
+            return [
+                {
+                    "id": str(message.id),
+                    "content": message.content,
+                    "role": message.role,
+                    "timestamp": message.created_at.isoformat()
+                }
+                for message in reversed(messages)
+            ]
+        finally:
+            db.close()
+
+# Singleton instance
+chat_history_service = ChatHistoryService()
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Bounded store for per-user conversation memories with SQLite spill-over
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+from backend.core.config import settings
+from backend.services.summary_memory import RollingSummaryMemory
+
+logger = logging.getLogger(__name__)
+
+class ChatMemoryStore:
+    """
+    Keeps recently active conversation memories in process and spills the rest to SQLite
+    
+    Memories are evicted when the number of resident users exceeds the LRU cap or
+    when a user has been idle longer than the TTL. Evicted memories are written to
+    SQLite and rehydrated lazily on the user's next message.
+    """
+    
+    def __init__(
+        self,
+        db_path: str,
+        max_users: int = 1000,
+        idle_ttl_seconds: int = 1800,
+        max_bytes_per_user: int = 65536,
+        memory_factory: Callable[[], ConversationBufferMemory] = ConversationBufferMemory
+    ):
+        """
+        Initialize the memory store
+        
+        Args:
+            db_path: Path of the SQLite file used for spilled memories
+            max_users: Maximum number of memories kept in process
+            idle_ttl_seconds: Idle time after which a memory is spilled
+            max_bytes_per_user: Budget for message content per user
+            memory_factory: Callable creating an empty memory
+        """
+        self.db_path = db_path
+        self.max_users = max(1, max_users)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_bytes_per_user = max_bytes_per_user
+        self.memory_factory = memory_factory
+        
+        # User ID -> (last used time, memory), least recently used first
+        self._memories: "OrderedDict[Any, Tuple[float, ConversationBufferMemory]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        
+        self.spills = 0
+        self.rehydrations = 0
+        self.trimmed_messages = 0
+    
+    def get(self, user_id: Any) -> ConversationBufferMemory:
+        """
+        Get the memory for a user, rehydrating or creating it if needed
+        
+        Args:
+            user_id: User ID
+        
+        Returns:
+            Conversation memory for the user
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            
+            entry = self._memories.get(user_id)
+            if entry is not None:
+                memory = entry[1]
+                self._memories[user_id] = (now, memory)
+                self._memories.move_to_end(user_id)
+                return memory
+            
+            memory = self._rehydrate(user_id) or self.memory_factory()
+            self._memories[user_id] = (now, memory)
+            
+            # Spill least recently used memories beyond the cap
+            while len(self._memories) > self.max_users:
+                evicted_id, (_, evicted) = self._memories.popitem(last=False)
+                self._spill(evicted_id, evicted)
+            
+            return memory
+    
+    def save(self, user_id: Any, memory: ConversationBufferMemory) -> None:
+        """
+        Record that a conversation turn was added to a memory
+        
+        Trims the oldest messages beyond the per-user byte budget. If the memory
+        was evicted while the turn was in flight, it is spilled again so the turn
+        is not lost.
+        
+        Args:
+            user_id: User ID
+            memory: Memory returned by get for this user
+        """
+        with self._lock:
+            self._enforce_budget(memory)
+            
+            entry = self._memories.get(user_id)
+            if entry is None or entry[1] is not memory:
+                self._spill(user_id, memory)
+    
+    def flush(self) -> None:
+        """Spill every resident memory to SQLite (used on shutdown)"""
+        with self._lock:
+            while self._memories:
+                user_id, (_, memory) = self._memories.popitem(last=False)
+                self._spill(user_id, memory)
+    
+    def __contains__(self, user_id: Any) -> bool:
+        with self._lock:
+            return user_id in self._memories
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._memories)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get memory store statistics
+        
+        Returns:
+            Dictionary with resident users, spill and rehydration counters
+        """
+        with self._lock:
+            return {
+                "resident_users": len(self._memories),
+                "max_users": self.max_users,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "max_bytes_per_user": self.max_bytes_per_user,
+                "spills": self.spills,
+                "rehydrations": self.rehydrations,
+                "trimmed_messages": self.trimmed_messages
+            }
+    
+    def _evict_idle(self, now: float) -> None:
+        """Spill memories idle for longer than the TTL (oldest are at the front)"""
+        while self._memories:
+            user_id, (last_used, memory) = next(iter(self._memories.items()))
+            if now - last_used < self.idle_ttl_seconds:
+                break
+            
+            del self._memories[user_id]
+            self._spill(user_id, memory)
+    
+    def _enforce_budget(self, memory: ConversationBufferMemory) -> None:
+        """Drop the oldest messages until the memory fits the byte budget"""
+        messages = memory.chat_memory.messages
+        size = sum(len(str(m.content).encode("utf-8")) for m in messages)
+        
+        # Always keep the latest exchange, even if it alone exceeds the budget
+        drop = 0
+        while size > self.max_bytes_per_user and len(messages) - drop > 2:
+            size -= len(str(messages[drop].content).encode("utf-8"))
+            drop += 1
+        
+        if drop:
+            memory.chat_memory.messages = messages[drop:]
+            self.trimmed_messages += drop
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Open the spill database on first use"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS chat_memories (
+                    user_id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+        
+        return self._conn
+    
+    def _serialize(self, memory: ConversationBufferMemory) -> str:
+        """Serialize a memory to JSON"""
+        return json.dumps({
+            "messages": messages_to_dict(memory.chat_memory.messages),
+            "summary": getattr(memory, "summary", "")
+        })
+    
+    def _deserialize(self, payload: str) -> ConversationBufferMemory:
+        """Rebuild a memory from its JSON form"""
+        data = json.loads(payload)
+        memory = self.memory_factory()
+        memory.chat_memory.messages = messages_from_dict(data.get("messages", []))
+        if isinstance(memory, RollingSummaryMemory):
+            memory.summary = data.get("summary", "")
+        return memory
+    
+    def _spill(self, user_id: Any, memory: ConversationBufferMemory) -> None:
+        """Write a memory to SQLite"""
+        if not memory.chat_memory.messages:
+            return
+        
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_memories (user_id, payload, updated_at) VALUES (?, ?, ?)",
+                (str(user_id), self._serialize(memory), time.time())
+            )
+            conn.commit()
+            self.spills += 1
+        except Exception as e:
+            logger.error(f"Failed to spill chat memory for user {user_id}: {str(e)}")
+    
+    def _rehydrate(self, user_id: Any) -> Optional[ConversationBufferMemory]:
+        """Load and remove a spilled memory from SQLite"""
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT payload FROM chat_memories WHERE user_id = ?",
+                (str(user_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            conn.execute("DELETE FROM chat_memories WHERE user_id = ?", (str(user_id),))
+            conn.commit()
+            self.rehydrations += 1
+            return self._deserialize(row[0])
+        except Exception as e:
+            logger.error(f"Failed to rehydrate chat memory for user {user_id}: {str(e)}")
+            return None
+
+def create_chat_memory() -> ConversationBufferMemory:
+    """Create an empty conversation memory for the configured memory mode"""
+    if settings.CHAT_MEMORY_MODE == "summary":
+        return RollingSummaryMemory(
+            max_turns=settings.CHAT_MEMORY_RECENT_TURNS,
+            max_tokens=settings.CHAT_HISTORY_MAX_TOKENS
+        )
+    
+    return ConversationBufferMemory()
+
+# Shared memory store for the AI advisor
+chat_memory_store = ChatMemoryStore(
+    db_path=os.path.join(settings.DATA_DIR, "chat_memory.db"),
+    max_users=settings.CHAT_MEMORY_MAX_USERS,
+    idle_ttl_seconds=settings.CHAT_MEMORY_IDLE_TTL_SECONDS,
+    max_bytes_per_user=settings.CHAT_MEMORY_MAX_BYTES_PER_USER,
+    memory_factory=create_chat_memory
+)
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+Token budgeting that fills a prompt with the most informative parts of a document
+"""
+import re
+from typing import List
+
+from backend.services.tokens import estimate_tokens, truncate_to_tokens
+
+# Marker inserted where blocks were left out
+OMISSION_MARKER = "[...]"
+
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?%?")
+_CURRENCY = re.compile(r"₹|\bRs\.?|\bINR\b|\$", re.IGNORECASE)
+_KEY_TERMS = re.compile(
+    r"\b(total|subtotal|net|gross|balance|closing|opening|profit|loss|income|revenue|"
+    r"expense|expenditure|tax|tds|gst|dividend|interest|nav|returns?|xirr|cagr|"
+    r"assets?|liabilit(?:y|ies)|equity|portfolio|summary|amount|due)\b",
+    re.IGNORECASE
+)
+_COLUMN_GAP = re.compile(r"\t| {2,}|\|")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+class BudgetedContent:
+    """Content selected to fit a token budget"""
+    
+    def __init__(self, text: str, tokens: int, kept_blocks: int, total_blocks: int, source_tokens: int):
+        self.text = text
+        self.tokens = tokens
+        self.kept_blocks = kept_blocks
+        self.total_blocks = total_blocks
+        self.source_tokens = source_tokens
+    
+    @property
+    def truncated(self) -> bool:
+        return self.kept_blocks < self.total_blocks
+    
+    def stats(self) -> dict:
+        """Budgeting figures for logging and analysis metadata"""
+        return {
+            "source_tokens": self.source_tokens,
+            "prompt_tokens": self.tokens,
+            "kept_blocks": self.kept_blocks,
+            "total_blocks": self.total_blocks,
+            "truncated": self.truncated
+        }
+
+class ContentBudgeter:
+    """
+    Fits document text into what is left of the model's context window
+    
+    The budget is the context window minus the rendered template, the
+    completion reserve and a safety margin for tokenizer estimation error.
+    Text that fits is used as is. Otherwise it is split into blocks at
+    paragraph, line and sentence boundaries, each block is scored with cheap
+    heuristics (tables, totals, headings, amounts), and the best value per
+    token is kept in document order, so text is never cut mid-sentence.
+    """
+    
+    def __init__(self, context_window: int = 4096, completion_tokens: int = 1024, safety_margin: float = 0.1):
+        """
+        Initialize the budgeter
+        
+        Args:
+            context_window: Model context window in tokens
+            completion_tokens: Tokens reserved for the completion
+            safety_margin: Fraction of the window kept free for estimation error
+        """
+        self.context_window = context_window
+        self.completion_tokens = completion_tokens
+        self.safety_margin = safety_margin
+    
+    def budget(self, prompt_text: str) -> int:
+        """
+        Tokens available for content in a prompt
+        
+        Args:
+            prompt_text: The prompt rendered without the content
+        
+        Returns:
+            Content token budget (0 if the template alone fills the window)
+        """
+        margin = int(self.context_window * self.safety_margin)
+        return max(0, self.context_window - self.completion_tokens - margin - estimate_tokens(prompt_text))
+    
+    def fit(self, text: str, max_tokens: int) -> BudgetedContent:
+        """
+        Select the most informative parts of a text within a token budget
+        
+        Args:
+            text: Document text
+            max_tokens: Token budget for the selected text
+        
+        Returns:
+            Selected text and budgeting figures
+        """
+        source_tokens = estimate_tokens(text)
+        if source_tokens <= max_tokens:
+            return BudgetedContent(text, source_tokens, 1, 1, source_tokens)
+        
+        blocks = self._split(text, max(1, max_tokens // 8))
+        costs = [estimate_tokens(block) for block in blocks]
+        scores = [self._score(block, index) for index, block in enumerate(blocks)]
+        
+        # Greedy by value per token; markers between gaps are paid for as they appear
+        marker_cost = estimate_tokens(OMISSION_MARKER)
+        order = sorted(range(len(blocks)), key=lambda i: scores[i] / max(1, costs[i]), reverse=True)
+        selected = set()
+        used = 0
+        for index in order:
+            cost = costs[index] + marker_cost
+            if used + cost > max_tokens:
+                continue
+            selected.add(index)
+            used += cost
+        
+        if not selected:
+            # Every block is larger than the budget: fall back to the opening words
+            clipped = truncate_to_tokens(text, max_tokens - marker_cost)
+            return BudgetedContent(
+                clipped + " " + OMISSION_MARKER,
+                estimate_tokens(clipped) + marker_cost,
+                0,
+                len(blocks),
+                source_tokens
+            )
+        
+        parts: List[str] = []
+        previous = -1
+        for index in sorted(selected):
+            if index != previous + 1:
+                parts.append(OMISSION_MARKER)
+            parts.append(blocks[index])
+            previous = index
+        if previous != len(blocks) - 1:
+            parts.append(OMISSION_MARKER)
+        
+        selected_text = "\n".join(parts)
+        return BudgetedContent(
+            selected_text,
+            estimate_tokens(selected_text),
+            len(selected),
+            len(blocks),
+            source_tokens
+        )
+    
+    def chunk(self, text: str, max_tokens: int) -> List[str]:
+        """
+        Split a text into consecutive chunks that each fit a token budget
+        
+        Chunks are packed from whole paragraphs, lines or sentences, so a
+        chunk only ends mid-sentence when a single sentence exceeds the budget.
+        
+        Args:
+            text: Document text
+            max_tokens: Token budget per chunk
+        
+        Returns:
+            List of chunks in document order
+        """
+        max_tokens = max(1, max_tokens)
+        chunks: List[str] = []
+        current: List[str] = []
+        used = 0
+        for block in self._split(text, max_tokens):
+            for piece in self._pieces(block, max_tokens):
+                cost = estimate_tokens(piece)
+                if current and used + cost > max_tokens:
+                    chunks.append("\n\n".join(current))
+                    current, used = [], 0
+                current.append(piece)
+                used += cost
+        
+        if current:
+            chunks.append("\n\n".join(current))
+        
+        return chunks
+    
+    def _pieces(self, block: str, max_tokens: int) -> List[str]:
+        """Cut a block that is still over budget (one very long sentence) at word boundaries"""
+        pieces = []
+        while estimate_tokens(block) > max_tokens:
+            head = truncate_to_tokens(block, max_tokens)
+            if not head:
+                break
+            pieces.append(head)
+            block = block[len(head):].strip()
+        if block:
+            pieces.append(block)
+        return pieces
+    
+    def _split(self, text: str, max_block_tokens: int) -> List[str]:
+        """Split into paragraphs, then lines, then sentences until blocks are small enough"""
+        blocks = []
+        for paragraph in re.split(r"\n\s*\n", text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if estimate_tokens(paragraph) <= max_block_tokens:
+                blocks.append(paragraph)
+                continue
+            
+            for line in paragraph.split("\n"):
+                line = line.strip()
+                if not line:
+                    continue
+                if estimate_tokens(line) <= max_block_tokens:
+                    blocks.append(line)
+                    continue
+                
+                blocks.extend(sentence for sentence in _SENTENCE_END.split(line) if sentence)
+        
+        return blocks
+    
+    def _score(self, block: str, index: int) -> float:
+        """Heuristic information value of a block"""
+        lines = [line for line in block.split("\n") if line.strip()]
+        words = max(1, len(block.split()))
+        numbers = len(_NUMBER.findall(block))
+        
+        score = 1.0
+        # Figures and amounts carry most of the financial content
+        score += min(3.0, 6.0 * numbers / words)
+        score += min(2.0, 0.5 * len(_CURRENCY.findall(block)))
+        score += min(2.0, 0.5 * len(_KEY_TERMS.findall(block)))
+        
+        # Table rows: several columns separated by gaps, tabs or pipes, with numbers
+        table_rows = sum(1 for line in lines if len(_COLUMN_GAP.split(line.strip())) >= 3 and _NUMBER.search(line))
+        if lines and table_rows / len(lines) >= 0.5:
+            score += 2.0
+        
+        # Headings: short lines in title or upper case, or ending with a colon
+        first = lines[0].strip() if lines else ""
+        if first and len(first) <= 80 and (first.isupper() or first.istitle() or first.endswith(":")):
+            score += 1.5
+        
+        # The opening usually names the document, account and period
+        if index < 3:
+            score += 2.0 - index * 0.5
+        
+        return score
\ No newline at end of file
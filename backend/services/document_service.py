@@ -3,59 +3,102 @@ Document service for processing and analyzing financial documents
 """
 import os
 import json
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
 import pandas as pd
-from pypdf import PdfReader
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from langchain_groq import ChatGroq
 
 from backend.core.config import settings
+from backend.database import SessionLocal
+from backend.models.document import Document
+from backend.services.analysis_cache import analysis_cache
+from backend.services.content_budget import ContentBudgeter
+from backend.services.job_queue import job_queue
+from backend.services.llm_cache import LLMResponseCache
+from backend.services.llm_gateway import PRIORITY_BACKGROUND, LLMOverloadedError, llm_gateway
+from backend.services.pdf_extraction import EXTRACTOR_VERSION as PDF_EXTRACTOR_VERSION, pdf_extractor
+from backend.services.prompt_registry import output_text, prompt_registry
+from backend.services.search_index import search_index
+from backend.services.single_flight import llm_single_flight
+from backend.services.tabular_reader import EXTRACTOR_VERSION as TABULAR_EXTRACTOR_VERSION, summarize_workbook
+from backend.services.text_store import text_store
+from backend.services.tokens import estimate_tokens
+from backend.services.vector_index import vector_index
 
 logger = logging.getLogger(__name__)
 
+# Called with the number of finished and total analysis steps
+ProgressCallback = Callable[[int, int], None]
+
 class DocumentService:
     """Service for document processing and analysis specific to financial documents"""
     
+    # Model settings, also part of the request coalescing key
+    model_settings = {
+        "model_name": settings.LLM_MODEL_NAME,
+        "temperature": 0.3,  # Lower temperature for more focused analysis
+        "max_tokens": settings.DOCUMENT_COMPLETION_TOKENS,
+    }
+    
+    # Extract this multiple of the prompt budget, so the budgeter still has text to choose from
+    extraction_budget_factor = 2
+    
+    # Summaries of fallback responses, which are never cached
+    fallback_summaries = {
+        "Document analysis is not available at this time.",
+        "Unsupported document type",
+        "AI-powered document analysis is not available.",
+        "An error occurred during document analysis."
+    }
+    
     def __init__(self):
         """Initialize document service"""
         self.llm = None
+        self.budgeter = ContentBudgeter(
+            context_window=settings.LLM_CONTEXT_WINDOW,
+            completion_tokens=self.model_settings["max_tokens"]
+        )
+        self.mode = settings.DOCUMENT_ANALYSIS_MODE
+        self.max_chunks = max(1, settings.DOCUMENT_MAP_MAX_CHUNKS)
+        self.map_concurrency = max(1, settings.DOCUMENT_MAP_CONCURRENCY)
+        # Document ID -> progress of analyses running in this process
+        self.progress: Dict[int, Dict[str, int]] = {}
         self._initialize()
     
     def _initialize(self):
         """Initialize the LLM for document analysis"""
-        # Check if GROQ API key is available
-        if not settings.GROQ_API_KEY:
+        # Get the shared model for the configured backend from the gateway
+        self.llm = llm_gateway.get_llm(**self.model_settings)
+        if self.llm is None:
             logger.warning("GROQ API key not found, document analysis will be limited")
             return
         
-        try:
-            # Initialize GROQ model
-            self.llm = ChatGroq(
-                api_key=settings.GROQ_API_KEY,
-                model_name="llama2-70b-4096",  # Can be changed to other GROQ models
-                temperature=0.3,  # Lower temperature for more focused analysis
-                max_tokens=2048,
-            )
-            
-            logger.info("GROQ LLM initialized successfully for document analysis")
-        except Exception as e:
-            logger.error(f"Failed to initialize GROQ LLM for document analysis: {str(e)}")
-            self.llm = None
+        logger.info("LLM initialized successfully for document analysis")
     
-    async def analyze_document(self, file_path: str, file_type: str) -> Dict[str, Any]:
+    async def analyze_document(
+        self,
+        file_path: str,
+        file_type: str,
+        page_range: Optional[Tuple[int, int]] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        document_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Analyze a document and extract financial insights
         
         Args:
             file_path: Path to the document
             file_type: Type of document (pdf, xlsx, etc.)
+            page_range: First and last PDF page to analyze, 1-based and inclusive
+            on_progress: Called as each chunk of a map-reduce analysis finishes
+            document_id: Stored document, whose extracted text is kept and reused
+            user_id: Owner of the document, charged for the LLM calls
             
         Returns:
-            Dictionary with summary and insights
+            Dictionary with summary and insights, plus extraction figures for PDFs
         """
         # Default response if analysis fails
         default_response = {
@@ -69,11 +112,14 @@ class DocumentService:
         try:
             # Extract content based on file type
             document_content = ""
+            extraction = None
             
             if file_type.lower() in ["pdf", "application/pdf"]:
-                document_content = await self._extract_pdf_content(file_path)
+                document_content, extraction = await self._extract_pdf_content(file_path, page_range, document_id)
             elif file_type.lower() in ["xlsx", "xls", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/vnd.ms-excel"]:
-                document_content = await self._extract_excel_content(file_path)
+                document_content = await self._extract_tabular_content(file_path, document_id)
+            elif file_type.lower() in ["csv", "tsv", "text/csv", "text/tab-separated-values"]:
+                document_content = await self._extract_tabular_content(file_path, document_id)
             else:
                 return {
                     "summary": "Unsupported document type",
@@ -85,91 +131,489 @@ class DocumentService:
                 return default_response
             
             # Analyze content using AI
-            return await self._analyze_with_ai(document_content)
+            analysis = await self._analyze_with_ai(document_content, on_progress, user_id)
+            if extraction is not None:
+                analysis["extraction"] = extraction
+            
+            return analysis
             
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error analyzing document: {str(e)}")
             return default_response
     
-    async def _extract_pdf_content(self, file_path: str) -> str:
-        """Extract text content from PDF"""
+    def analysis_version(self) -> str:
+        """Versions of the analysis prompts, part of the analysis cache key"""
+        names = ["document_analysis"]
+        if self.mode != "single":
+            names += ["document_chunk_summary", "document_reduce"]
+        return "/".join(prompt_registry.get(name).version for name in names)
+    
+    async def get_cached_analysis(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored analysis of a previously analyzed document
+        
+        Args:
+            content_hash: SHA-256 of the document
+            
+        Returns:
+            Analysis, or None if this content has not been analyzed
+        """
+        try:
+            return await asyncio.to_thread(analysis_cache.get, content_hash, self.analysis_version())
+        except Exception as e:
+            logger.error(f"Error reading document analysis cache: {str(e)}")
+            return None
+    
+    async def cache_analysis(self, content_hash: str, size: int, analysis: Dict[str, Any]) -> None:
+        """
+        Store an analysis for later uploads of the same document
+        
+        Args:
+            content_hash: SHA-256 of the document
+            size: Document size in bytes
+            analysis: Analysis result; fallback responses are skipped
+        """
+        if analysis.get("summary") in self.fallback_summaries:
+            return
+        
+        try:
+            await asyncio.to_thread(analysis_cache.set, content_hash, self.analysis_version(), analysis, size)
+        except Exception as e:
+            logger.error(f"Error writing document analysis cache: {str(e)}")
+    
+    async def index_for_search(self, document: Document, analysis: Optional[Dict[str, Any]]) -> None:
+        """
+        Add a document's name, AI summary and stored extracted text to the search and retrieval indexes
+        
+        Args:
+            document: Analyzed document
+            analysis: Its analysis; fallback responses are left out of the index
+        """
+        summary = ""
+        if analysis and analysis.get("summary") not in self.fallback_summaries:
+            summary = "\n".join([analysis.get("summary", "")] + list(analysis.get("insights", [])))
+        
+        extension = os.path.splitext(document.path)[1].lower()
+        version = PDF_EXTRACTOR_VERSION if extension == ".pdf" else TABULAR_EXTRACTOR_VERSION
+        stored = await self._load_extracted_text(document.id, version)
+        if stored is None:
+            # Deduplicated uploads reuse another document's analysis and were never extracted themselves
+            stored = await self._share_extracted_text(document, version)
+        content = "\n\n".join(text for _, text in stored[1]) if stored else ""
+        
+        try:
+            await asyncio.to_thread(
+                search_index.index_document, document.id, document.user_id, document.name, summary, content
+            )
+        except Exception as e:
+            logger.error(f"Error indexing document {document.id} for search: {str(e)}")
+        
+        # Chunk embeddings for retrieval in advisor chat
+        if not content:
+            logger.debug(f"Document {document.id} has no extractable text for retrieval")
+            return
+        try:
+            await asyncio.to_thread(
+                vector_index.add_document, document.user_id, document.id, document.name, content
+            )
+        except Exception as e:
+            logger.error(f"Error indexing document {document.id} for retrieval: {str(e)}")
+    
+    async def process_analysis_job(self, payload: Dict[str, Any]) -> None:
+        """
+        Job handler: analyze an uploaded document and store the result on it
+        
+        Args:
+            payload: Job payload with the document ID, optional page range and content hash
+        """
+        document_id = payload["document_id"]
+        db = SessionLocal()
+        try:
+            document = db.get(Document, document_id)
+            if document is None:
+                logger.info(f"Document {document_id} was deleted before analysis")
+                return
+            
+            file_type = os.path.splitext(document.path)[1].lower()[1:]
+            page_range = tuple(payload["page_range"]) if payload.get("page_range") else None
+            
+            def on_progress(done: int, total: int) -> None:
+                self.progress[document_id] = {"done": done, "total": total}
+                logger.info(f"Document {document_id} analysis: {done}/{total} steps done")
+            
+            # LLMOverloadedError propagates so the job queue retries later
+            try:
+                analysis = await self.analyze_document(
+                    document.path, file_type, page_range, on_progress, document_id, document.user_id
+                )
+            finally:
+                self.progress.pop(document_id, None)
+            
+            # Only whole-document analyses are reused for identical uploads
+            if payload.get("content_hash") and page_range is None:
+                await self.cache_analysis(payload["content_hash"], document.size, analysis)
+            
+            # The document may have been deleted while it was analyzed; indexing it would
+            # leave search entries behind, and the ORM update would fail and retry the job
+            if db.query(Document.id).filter(Document.id == document_id).first() is None:
+                logger.info(f"Document {document_id} was deleted during analysis")
+                return
+            
+            # Indexed and cached before it is marked completed, so a completed document is
+            # searchable and an identical upload made after that reuses the analysis
+            await self.index_for_search(document, analysis)
+            
+            db.query(Document).filter(Document.id == document_id).update(
+                {Document.analysis: analysis, Document.analysis_status: "completed"}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+    
+    async def process_index_job(self, payload: Dict[str, Any]) -> None:
+        """
+        Job handler: index a document that reused a cached analysis
+        
+        Its text may have to be extracted and embedded, which stays off the upload request.
+        
+        Args:
+            payload: Job payload with the document ID
+        """
+        document_id = payload["document_id"]
+        db = SessionLocal()
+        try:
+            document = db.get(Document, document_id)
+            if document is None:
+                logger.info(f"Document {document_id} was deleted before indexing")
+                return
+            
+            await self.index_for_search(document, document.analysis)
+        finally:
+            db.close()
+    
+    def mark_analysis_failed(self, payload: Dict[str, Any], error: str) -> None:
+        """
+        Job failure handler: mark a document whose analysis ran out of retries
+        
+        Args:
+            payload: Job payload with the document ID
+            error: Last error
+        """
+        db = SessionLocal()
         try:
-            # Read PDF
-            reader = PdfReader(file_path)
+            document = db.get(Document, payload["document_id"])
+            if document is not None:
+                document.analysis_status = "failed"
+                db.commit()
+        finally:
+            db.close()
+    
+    async def _extract_pdf_content(
+        self,
+        file_path: str,
+        page_range: Optional[Tuple[int, int]] = None,
+        document_id: Optional[int] = None
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Extract text content from PDF, stopping once there is enough for the prompt"""
+        try:
+            # Map-reduce can use up to max_chunks prompts' worth of text
+            factor = self.extraction_budget_factor if self.mode == "single" else self.max_chunks
+            max_tokens = self._content_budget() * factor
+            requested_range = list(page_range) if page_range else None
+            
+            # Reuse text stored by an earlier extraction of the same pages that read at least as far
+            if document_id is not None:
+                stored = await self._load_extracted_text(document_id, PDF_EXTRACTOR_VERSION)
+                if stored is not None:
+                    meta, segments = stored
+                    if meta.get("page_range") == requested_range and (
+                        not meta.get("stopped_early") or meta.get("max_tokens", 0) >= max_tokens
+                    ):
+                        extraction = {key: meta[key] for key in meta if key not in ("page_range", "max_tokens")}
+                        return "\n\n".join(text for _, text in segments), extraction
+            
+            # Parse in a worker process so the event loop keeps serving other requests
+            result = await pdf_extractor.extract(
+                file_path,
+                max_tokens=max_tokens,
+                page_range=page_range
+            )
+            text = result.pop("text")
+            page_texts = result.pop("page_texts")
             
-            # Extract text from each page
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n\n"
+            if document_id is not None:
+                segments = [(str(result["first_page"] + index), page) for index, page in enumerate(page_texts)]
+                meta = dict(result, page_range=requested_range, max_tokens=max_tokens)
+                await self._save_extracted_text(document_id, PDF_EXTRACTOR_VERSION, segments, meta)
             
-            return text
+            return text, result
         except Exception as e:
             logger.error(f"Error extracting PDF content: {str(e)}")
-            return ""
+            return "", None
     
-    async def _extract_excel_content(self, file_path: str) -> str:
-        """Extract data from Excel file"""
+    async def _extract_tabular_content(self, file_path: str, document_id: Optional[int] = None) -> str:
+        """Extract data from an Excel, CSV or TSV file"""
         try:
-            # Read Excel file
-            df = pd.read_excel(file_path)
+            extension = os.path.splitext(file_path)[1].lower()[1:]
             
-            # Convert to string representation
-            excel_content = f"Excel file with {len(df)} rows and {len(df.columns)} columns.\n\n"
-            excel_content += "Column names: " + ", ".join(df.columns.astype(str)) + "\n\n"
+            stored = None
+            if document_id is not None:
+                stored = await self._load_extracted_text(document_id, TABULAR_EXTRACTOR_VERSION)
             
-            # Add sample data (first few rows)
-            sample_rows = min(5, len(df))
-            excel_content += f"Sample data (first {sample_rows} rows):\n"
-            excel_content += df.head(sample_rows).to_string() + "\n\n"
+            if stored is not None:
+                segments = stored[1]
+            else:
+                # Stream every sheet once in a worker thread, keeping only head rows and running statistics
+                sheets = await asyncio.to_thread(summarize_workbook, file_path)
+                segments = [(sheet.name, sheet.to_text()) for sheet in sheets]
+                if document_id is not None:
+                    await self._save_extracted_text(document_id, TABULAR_EXTRACTOR_VERSION, segments)
             
-            # Add basic statistics for numeric columns
-            numeric_cols = df.select_dtypes(include=["number"]).columns
-            if len(numeric_cols) > 0:
-                excel_content += "Basic statistics for numeric columns:\n"
-                excel_content += df[numeric_cols].describe().to_string()
+            # Convert to string representation
+            if extension in ("csv", "tsv"):
+                tabular_content = f"{extension.upper()} file.\n\n"
+            else:
+                tabular_content = f"Excel file with {len(segments)} sheets.\n\n"
+            tabular_content += "\n\n".join(text for _, text in segments)
             
-            return excel_content
+            return tabular_content
         except Exception as e:
-            logger.error(f"Error extracting Excel content: {str(e)}")
+            logger.error(f"Error extracting tabular content: {str(e)}")
             return ""
     
-    async def _analyze_with_ai(self, document_content: str) -> Dict[str, Any]:
-        """Analyze document content using AI"""
+    async def _load_extracted_text(
+        self,
+        document_id: int,
+        version: str
+    ) -> Optional[Tuple[Dict[str, Any], List[Tuple[str, str]]]]:
+        """Read a document's stored text and extraction details, or None if nothing usable is stored"""
+        def load():
+            stored = text_store.open(document_id, version)
+            if stored is None:
+                return None
+            with stored:
+                return stored.meta, list(stored.iter_segments())
+        
+        try:
+            return await asyncio.to_thread(load)
+        except Exception as e:
+            logger.error(f"Error reading stored text of document {document_id}: {str(e)}")
+            return None
+    
+    async def _share_extracted_text(
+        self,
+        document: Document,
+        version: str
+    ) -> Optional[Tuple[Dict[str, Any], List[Tuple[str, str]]]]:
+        """
+        Give a document the stored text of another document with the same file, extracting it if none has any
+        
+        Args:
+            document: Document with no stored text
+            version: Extractor version
+        
+        Returns:
+            The document's stored text and extraction details, or None if nothing could be extracted
+        """
+        def link() -> bool:
+            db = SessionLocal()
+            try:
+                siblings = db.query(Document.id).filter(Document.path == document.path, Document.id != document.id)
+                return any(text_store.link(sibling_id, document.id, version) for (sibling_id,) in siblings)
+            finally:
+                db.close()
+        
+        try:
+            linked = await asyncio.to_thread(link)
+        except Exception as e:
+            logger.error(f"Error sharing stored text with document {document.id}: {str(e)}")
+            linked = False
+        
+        if not linked:
+            if version == PDF_EXTRACTOR_VERSION:
+                await self._extract_pdf_content(document.path, None, document.id)
+            else:
+                await self._extract_tabular_content(document.path, document.id)
+        
+        return await self._load_extracted_text(document.id, version)
+    
+    async def _save_extracted_text(
+        self,
+        document_id: int,
+        version: str,
+        segments: List[Tuple[str, str]],
+        meta: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Store a document's extracted text; failures only cost a re-parse later"""
+        try:
+            await asyncio.to_thread(text_store.save, document_id, version, segments, meta)
+        except Exception as e:
+            logger.error(f"Error storing text of document {document_id}: {str(e)}")
+    
+    def _content_budget(self) -> int:
+        """Tokens of document text that fit in the analysis prompt"""
+        prompt = prompt_registry.get("document_analysis")
+        return self.budgeter.budget(prompt.template.format(document=""))
+    
+    async def _analyze_with_ai(
+        self,
+        document_content: str,
+        on_progress: Optional[ProgressCallback] = None,
+        user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Analyze document content using AI, charging the calls to the given user"""
         if self.llm is None:
             return {
                 "summary": "AI-powered document analysis is not available.",
                 "insights": ["Check GROQ API key configuration"]
             }
         
-        # Limit content length for API
-        max_content_length = 10000
-        if len(document_content) > max_content_length:
-            document_content = document_content[:max_content_length] + "...[truncated]"
+        # Documents too long for one prompt are summarized in parallel chunks
+        if self.mode == "map_reduce" or (
+            self.mode == "auto" and estimate_tokens(document_content) > self._content_budget()
+        ):
+            return await self._map_reduce(document_content, on_progress, user_id)
         
-        # Create prompt template
-        prompt_template = PromptTemplate(
-            input_variables=["document"],
-            template="""You are a financial document analyzer specializing in Indian financial markets.
-            Analyze the following document text and extract key financial insights.
-            
-            Document text:
-            {document}
-            
-            Provide a concise summary of the document and extract 3-5 key financial insights.
-            Format your response as JSON with two fields:
-            1. "summary": A concise summary of the document (1-2 paragraphs)
-            2. "insights": An array of strings, each string being a key financial insight
+        return await self._analyze_single(document_content, user_id)
+    
+    async def _analyze_single(self, document_content: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Analyze document content in one prompt, recording how it was budgeted"""
+        prompt = prompt_registry.get("document_analysis")
+        
+        # Fill what the template and completion leave of the context window with the most informative text
+        budgeted = self.budgeter.fit(document_content, self._content_budget())
+        if budgeted.truncated:
+            logger.info(
+                f"Document budgeted from {budgeted.source_tokens} to {budgeted.tokens} tokens "
+                f"({budgeted.kept_blocks}/{budgeted.total_blocks} blocks)"
+            )
+        document_content = budgeted.text
+        
+        request_key = LLMResponseCache.make_key(
+            prompt.template.format(document=document_content),
+            prompt_version=prompt.version,
+            **self.model_settings
+        )
+        
+        # Identical documents analyzed concurrently share a single LLM call, charged to whoever started it
+        result = await llm_single_flight.do(
+            request_key,
+            lambda: self._run_analysis({"document": document_content}, user_id=user_id)
+        )
+        
+        # Copied, since concurrent callers share the result
+        return dict(result, budget=budgeted.stats())
+    
+    async def _map_reduce(
+        self,
+        document_content: str,
+        on_progress: Optional[ProgressCallback] = None,
+        user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Summarize chunks of a long document concurrently, then combine the summaries
+        
+        Args:
+            document_content: Extracted document text
+            on_progress: Called after each chunk summary and after the final combine step
+            user_id: User the LLM calls are charged to
+        
+        Returns:
+            Dictionary with summary and insights, plus chunk counts
+        """
+        map_prompt = prompt_registry.get("document_chunk_summary")
+        chunk_budget = self.budgeter.budget(map_prompt.template.format(chunk="", part=0, parts=0))
+        
+        # Keep the most informative text when even max_chunks prompts cannot hold it all
+        selected = self.budgeter.fit(document_content, chunk_budget * self.max_chunks)
+        chunks = self.budgeter.chunk(selected.text, chunk_budget)
+        if len(chunks) <= 1:
+            return await self._analyze_single(selected.text, user_id)
+        
+        total_steps = len(chunks) + 1
+        done = 0
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+        chain = prompt_registry.runnable("document_chunk_summary", self.llm)
+        
+        async def summarize(index: int, chunk: str) -> Optional[str]:
+            nonlocal done
+            async with semaphore:
+                try:
+                    output = await llm_gateway.ainvoke(
+                        chain,
+                        {"chunk": chunk, "part": index + 1, "parts": len(chunks)},
+                        priority=PRIORITY_BACKGROUND,
+                        endpoint="document_map",
+                        user_id=user_id
+                    )
+                    summary = output_text(output).strip()
+                except LLMOverloadedError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error summarizing document chunk {index + 1}/{len(chunks)}: {str(e)}")
+                    summary = None
             
-            Your response should be only the JSON object, nothing else.
-            """
+            done += 1
+            if on_progress is not None:
+                on_progress(done, total_steps)
+            return summary
+        
+        # A task group cancels the other chunk calls as soon as one is overloaded, so they stop
+        # holding gateway slots; the job retry summarizes every chunk again anyway
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(summarize(index, chunk)) for index, chunk in enumerate(chunks)]
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0]
+        summaries = [task.result() for task in tasks]
+        parts = [
+            f"Part {index + 1}: {summary}"
+            for index, summary in enumerate(summaries)
+            if summary
+        ]
+        if not parts:
+            return {
+                "summary": "An error occurred during document analysis.",
+                "insights": ["The analysis service encountered an error"]
+            }
+        
+        reduce_prompt = prompt_registry.get("document_reduce")
+        combined = self.budgeter.fit(
+            "\n\n".join(parts),
+            self.budgeter.budget(reduce_prompt.template.format(summaries=""))
         )
+        result = await self._run_analysis({"summaries": combined.text}, "document_reduce", user_id)
+        if on_progress is not None:
+            on_progress(total_steps, total_steps)
         
+        result["map_reduce"] = {
+            "chunks": len(chunks),
+            "failed_chunks": len(chunks) - len(parts),
+            "source_tokens": selected.source_tokens,
+            "truncated": selected.truncated
+        }
+        return result
+    
+    async def _run_analysis(
+        self,
+        inputs: Dict[str, Any],
+        prompt_name: str = "document_analysis",
+        user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Call the LLM for a document analysis (or the combine step of map-reduce) and parse the result"""
         try:
-            # Create chain
-            chain = LLMChain(llm=self.llm, prompt=prompt_template)
-            
-            # Run chain
-            response = await chain.arun(document=document_content)
+            # Run the shared prompt | llm runnable
+            chain = prompt_registry.runnable(prompt_name, self.llm)
+            output = await llm_gateway.ainvoke(
+                chain,
+                inputs,
+                priority=PRIORITY_BACKGROUND,
+                endpoint=prompt_name,
+                user_id=user_id
+            )
+            response = output_text(output)
             
             # Parse JSON response
             try:
@@ -191,6 +635,8 @@ class DocumentService:
                     "insights": insights
                 }
         
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error analyzing document with AI: {str(e)}")
             return {
@@ -199,4 +645,11 @@ class DocumentService:
             }
 
 # Singleton instance
-document_service = DocumentService()
\ No newline at end of file
+document_service = DocumentService()
+
+job_queue.register(
+    "analyze_document",
+    document_service.process_analysis_job,
+    on_failure=document_service.mark_analysis_failed
+)
+job_queue.register("index_document", document_service.process_index_job)
\ No newline at end of file
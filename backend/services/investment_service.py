@@ -3,6 +3,7 @@ Investment service for processing and analyzing investment data
 """
 import os
 import json
+import asyncio
 import logging
 import random
 from datetime import datetime
@@ -11,6 +12,7 @@ from typing import List, Dict, Any, Optional
 import pandas as pd
 
 from backend.core.config import settings
+from backend.services.tabular_reader import iter_records
 
 logger = logging.getLogger(__name__)
 
@@ -19,71 +21,102 @@ class InvestmentService:
     
     async def import_investment_data(self, file_path: str) -> List[Dict[str, Any]]:
         """
-        Import investment data from Excel file
+        Import investment data from an Excel, CSV or TSV file
         
         Args:
-            file_path: Path to the Excel file
-            
+            file_path: Path to the file
+        
         Returns:
             List of investment objects
         """
         try:
-            # Read Excel file
-            df = pd.read_excel(file_path)
-            
-            # Validate required columns
-            required_columns = ["Name", "Type", "Value", "Return"]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                logger.error(f"Missing required columns in Excel file: {missing_columns}")
-                return []
-            
-            # Process data
-            investments = []
-            for _, row in df.iterrows():
-                # Skip rows with missing essential data
-                if pd.isna(row["Name"]) or pd.isna(row["Value"]):
-                    continue
-                
-                # Process investment type
-                investment_type = row["Type"] if not pd.isna(row["Type"]) else self._infer_type(row["Name"])
-                
-                # Process risk level (if available)
-                risk_level = row.get("Risk Level", None)
-                if pd.isna(risk_level):
-                    risk_level = self._infer_risk_level(investment_type, None)
-                else:
-                    risk_level = self._infer_risk_level(investment_type, risk_level)
-                
-                # Process allocation (if available)
-                allocation = row.get("Allocation", None)
-                if pd.isna(allocation):
-                    allocation = 0.0
-                
-                # Get return value
-                return_value = row["Return"] if not pd.isna(row["Return"]) else 0.0
-                
-                # Create investment object
-                investment = {
-                    "id": f"inv_{len(investments) + 1}",
-                    "name": row["Name"],
-                    "type": investment_type,
-                    "value": self._parse_number(row["Value"]),
-                    "allocation": self._parse_number(allocation),
-                    "return": self._parse_number(return_value),
-                    "riskLevel": risk_level,
-                    "icon": self._get_icon_for_type(investment_type)
-                }
-                
-                investments.append(investment)
-            
-            return investments
-            
+            # Stream the rows of every sheet in a worker thread
+            return await asyncio.to_thread(self._read_investments, file_path)
         except Exception as e:
             logger.error(f"Error importing investment data: {str(e)}")
             return []
     
+    def _read_investments(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Read investments from every sheet that has the required columns
+        
+        Args:
+            file_path: Path to the Excel, CSV or TSV file
+        
+        Returns:
+            List of investment objects
+        """
+        required_columns = ["Name", "Type", "Value", "Return"]
+        investments = []
+        missing_columns = None
+        skipped_sheets = set()
+        
+        for sheet_name, row in iter_records(file_path):
+            # Validate required columns once per sheet
+            if sheet_name in skipped_sheets:
+                continue
+            missing = [col for col in required_columns if col not in row]
+            if missing:
+                skipped_sheets.add(sheet_name)
+                missing_columns = missing
+                continue
+            
+            investment = self._parse_investment(row, len(investments) + 1)
+            if investment is not None:
+                investments.append(investment)
+        
+        if not investments and missing_columns:
+            logger.error(f"Missing required columns in investment file: {missing_columns}")
+        
+        return investments
+    
+    def _parse_investment(self, row: Dict[str, Any], number: int) -> Optional[Dict[str, Any]]:
+        """
+        Build an investment object from a spreadsheet row
+        
+        Args:
+            row: Row values keyed by column name
+            number: Position of the investment, used for its ID
+        
+        Returns:
+            Investment object, or None if the row lacks a name or value
+        """
+        # Skip rows with missing essential data
+        if pd.isna(row["Name"]) or pd.isna(row["Value"]):
+            return None
+        
+        # Process investment type
+        investment_type = row["Type"] if not pd.isna(row["Type"]) else self._infer_type(row["Name"])
+        
+        # Process risk level (if available)
+        risk_level = row.get("Risk Level", None)
+        if pd.isna(risk_level):
+            risk_level = self._infer_risk_level(investment_type, None)
+        else:
+            risk_level = self._infer_risk_level(investment_type, risk_level)
+        
+        # Process allocation (if available)
+        allocation = row.get("Allocation", None)
+        if pd.isna(allocation):
+            allocation = 0.0
+        
+        # Get return value
+        return_value = row["Return"] if not pd.isna(row["Return"]) else 0.0
+        
+        # Create investment object
+        investment = {
+            "id": f"inv_{number}",
+            "name": row["Name"],
+            "type": investment_type,
+            "value": self._parse_number(row["Value"]),
+            "allocation": self._parse_number(allocation),
+            "return": self._parse_number(return_value),
+            "riskLevel": risk_level,
+            "icon": self._get_icon_for_type(investment_type)
+        }
+        
+        return investment
+    
     def _parse_number(self, value: Any) -> float:
         """
         Parse a number from various formats
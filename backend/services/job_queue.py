@@ -0,0 +1,465 @@
+"""
+Persistent background job queue backed by SQLite
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+JobHandler = Callable[[Dict[str, Any]], Union[Any, Awaitable[Any]]]
+FailureHandler = Callable[[Dict[str, Any], str], Union[Any, Awaitable[Any]]]
+
+class JobQueue:
+    """
+    Durable job queue processed by a pool of asyncio workers
+    
+    Jobs are rows in a local SQLite file, so they survive restarts without an
+    external broker. A claimed job is leased to the claiming queue, which
+    renews the lease with a heartbeat while the job runs; jobs whose lease
+    expires, because the process running them died, are requeued by any
+    live queue sharing the file, and finished jobs are purged once they are
+    older than the retention period. Handlers are registered per job kind
+    and may be coroutine functions (run on the event loop) or plain
+    functions (run in a worker thread). Queue writes run in worker threads
+    too, so SQLite never blocks the event loop. Failed jobs are retried with
+    jittered exponential backoff until `max_attempts` is reached, then
+    marked failed and passed to the kind's failure handler. Jobs may share
+    a concurrency key with a limit, such as one per user, so no key runs
+    more than its limit at once and one user's burst cannot occupy every
+    worker.
+    """
+    
+    def __init__(
+        self,
+        db_path: str,
+        workers: int = 2,
+        max_attempts: int = 3,
+        retry_backoff: float = 10.0,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0,
+        retention_seconds: float = 7 * 86400
+    ):
+        """
+        Initialize the job queue
+        
+        Args:
+            db_path: Path of the SQLite file holding the jobs
+            workers: Number of concurrent workers
+            max_attempts: Default attempts per job before it is marked failed
+            retry_backoff: Base delay in seconds before the first retry
+            poll_interval: Maximum seconds an idle worker sleeps before polling
+            lease_seconds: Seconds without a heartbeat before a running job is requeued
+            retention_seconds: Seconds finished and failed jobs are kept
+        """
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        # Lease holder name, unique per queue instance even across processes on one host
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        
+        self._handlers: Dict[str, JobHandler] = {}
+        self._failure_handlers: Dict[str, FailureHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.requeued = 0
+        self.purged = 0
+    
+    def register(self, kind: str, handler: JobHandler, on_failure: Optional[FailureHandler] = None) -> None:
+        """
+        Register the handler for a job kind
+        
+        Args:
+            kind: Job kind
+            handler: Called with the job payload
+            on_failure: Called with the payload and last error once retries are exhausted
+        """
+        self._handlers[kind] = handler
+        if on_failure is not None:
+            self._failure_handlers[kind] = on_failure
+    
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        max_attempts: Optional[int] = None,
+        concurrency_key: Optional[str] = None,
+        concurrency_limit: Optional[int] = None
+    ) -> int:
+        """
+        Add a job to the queue
+        
+        Args:
+            kind: Job kind
+            payload: JSON-serializable job arguments
+            max_attempts: Attempts before the job is marked failed (default from the queue)
+            concurrency_key: Jobs sharing this key are limited together
+            concurrency_limit: Most jobs with the key that may run at once; None or 0 for no limit
+        
+        Returns:
+            Job ID
+        """
+        return self.enqueue_many(kind, [payload], max_attempts, concurrency_key, concurrency_limit)[0]
+    
+    def enqueue_many(
+        self,
+        kind: str,
+        payloads: List[Dict[str, Any]],
+        max_attempts: Optional[int] = None,
+        concurrency_key: Optional[str] = None,
+        concurrency_limit: Optional[int] = None
+    ) -> List[int]:
+        """
+        Add several jobs of one kind to the queue in a single transaction
+        
+        Args:
+            kind: Job kind
+            payloads: JSON-serializable arguments, one per job
+            max_attempts: Attempts before a job is marked failed (default from the queue)
+            concurrency_key: Jobs sharing this key are limited together
+            concurrency_limit: Most jobs with the key that may run at once; None or 0 for no limit
+        
+        Returns:
+            Job IDs, in payload order
+        """
+        now = time.time()
+        job_ids = []
+        with self._lock:
+            conn = self._connection()
+            for payload in payloads:
+                cursor = conn.execute(
+                    """INSERT INTO jobs (kind, payload, status, attempts, max_attempts, run_after, created_at, updated_at,
+                                         concurrency_key, concurrency_limit)
+                       VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        kind, json.dumps(payload), JOB_QUEUED, max_attempts or self.max_attempts, now, now, now,
+                        concurrency_key, concurrency_limit if concurrency_key else None
+                    )
+                )
+                job_ids.append(cursor.lastrowid)
+            conn.commit()
+        
+        if self._wakeup is not None:
+            self._wakeup.set()
+        
+        return job_ids
+    
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get a job by ID
+        
+        Args:
+            job_id: Job ID
+        
+        Returns:
+            Job fields, or None if there is no such job
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT id, kind, payload, status, attempts, max_attempts, last_error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "payload": json.loads(row[2]),
+            "status": row[3],
+            "attempts": row[4],
+            "max_attempts": row[5],
+            "last_error": row[6]
+        }
+    
+    def backdate(self, job_id: int, seconds: float) -> None:
+        """
+        Move a job's last update into the past, as if it had gone untouched
+        
+        Lets tests exercise lease expiry and retention without waiting them out.
+        
+        Args:
+            job_id: Job ID
+            seconds: How far back to move the last update
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - seconds, job_id))
+            conn.commit()
+    
+    def start(self) -> None:
+        """Requeue jobs whose lease has expired and start the workers and heartbeat on the running event loop"""
+        if self._tasks:
+            return
+        
+        self.maintain()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        self._heartbeat = asyncio.create_task(self._run_heartbeat())
+    
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running are requeued for the next start"""
+        tasks = self._tasks + ([self._heartbeat] if self._heartbeat is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._heartbeat = None
+        self._wakeup = None
+    
+    def maintain(self) -> None:
+        """Renew this queue's leases, requeue jobs whose lease expired and purge old finished jobs"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE status = ? AND worker = ?",
+                (now, JOB_RUNNING, self.worker_id)
+            )
+            requeued = conn.execute(
+                """UPDATE jobs SET status = ?, worker = NULL, updated_at = ?
+                   WHERE status = ? AND updated_at < ? AND (worker IS NULL OR worker != ?)""",
+                (JOB_QUEUED, now, JOB_RUNNING, now - self.lease_seconds, self.worker_id)
+            ).rowcount
+            purged = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (JOB_DONE, JOB_FAILED, now - self.retention_seconds)
+            ).rowcount
+            conn.commit()
+            self.requeued += requeued
+            self.purged += purged
+        
+        if requeued:
+            logger.info(f"Requeued {requeued} jobs whose lease expired")
+            if self._wakeup is not None:
+                self._wakeup.set()
+        if purged:
+            logger.info(f"Purged {purged} finished jobs")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics
+        
+        Returns:
+            Dictionary with job counts per state and worker counters
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        
+        return {
+            "workers": len(self._tasks),
+            "jobs": dict(rows),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "requeued": self.requeued,
+            "purged": self.purged
+        }
+    
+    async def _worker(self, index: int) -> None:
+        """Claim and run jobs until cancelled"""
+        while True:
+            # Cleared before claiming so an enqueue in between is not missed
+            self._wakeup.clear()
+            # A claim cut short by shutdown still lands in its thread; the job's lease then
+            # expires and another start picks it up
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                # asyncio.timeout rather than wait_for, which on 3.11 can swallow a cancel
+                # that lands as the wakeup fires and leave stop() waiting forever
+                try:
+                    async with asyncio.timeout(self.poll_interval):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+                continue
+            
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                # Shutting down mid-job: give the attempt back so it reruns after restart. Written
+                # in place, as awaiting a thread here could be interrupted by a second cancel
+                if not job.get("finished"):
+                    self._update(job["id"], status=JOB_QUEUED, attempts=job["attempts"] - 1, worker=None)
+                raise
+    
+            # A finished job may unblock queued jobs held back by their concurrency limit
+            self._wakeup.set()
+    
+    async def _run_heartbeat(self) -> None:
+        """Renew leases well inside their expiry and run the other maintenance until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self.maintain)
+            except sqlite3.Error as e:
+                logger.error(f"Error maintaining job leases: {str(e)}")
+    
+    async def _run(self, job: Dict[str, Any]) -> None:
+        """Run one claimed job and record its outcome"""
+        handler = self._handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind '{job['kind']}'")
+            
+            await self._call(handler, job["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if handler is not None and job["attempts"] < job["max_attempts"]:
+                delay = random.uniform(0.5, 1.0) * self.retry_backoff * (2 ** (job["attempts"] - 1))
+                logger.warning(f"Job {job['id']} ({job['kind']}) failed, retrying in {delay:.1f}s: {error}")
+                await self._finish(job, status=JOB_QUEUED, run_after=time.time() + delay, last_error=error)
+                self.retried += 1
+                return
+            
+            logger.error(f"Job {job['id']} ({job['kind']}) failed after {job['attempts']} attempts: {error}")
+            await self._finish(job, status=JOB_FAILED, last_error=error)
+            self.failed += 1
+            
+            on_failure = self._failure_handlers.get(job["kind"])
+            if on_failure is not None:
+                try:
+                    await self._call(on_failure, job["payload"], error)
+                except Exception as failure_error:
+                    logger.error(f"Failure handler for job {job['id']} raised: {str(failure_error)}")
+            return
+        
+        await self._finish(job, status=JOB_DONE, last_error=None)
+        self.completed += 1
+    
+    async def _finish(self, job: Dict[str, Any], **fields: Any) -> None:
+        """Record a job's outcome in a worker thread; the write completes even if the worker is cancelled meanwhile"""
+        job["finished"] = True
+        await asyncio.to_thread(self._update, job["id"], **fields)
+    
+    async def _call(self, func: Callable, *args: Any) -> Any:
+        """Await coroutine functions; run plain functions in a thread"""
+        if asyncio.iscoroutinefunction(func):
+            return await func(*args)
+        return await asyncio.to_thread(func, *args)
+    
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the next due job whose concurrency key is under its limit to running"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                """UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, updated_at = ?
+                   WHERE id = (
+                       SELECT id FROM jobs AS queued WHERE status = ? AND run_after <= ?
+                       AND (
+                           queued.concurrency_key IS NULL
+                           OR queued.concurrency_limit IS NULL
+                           OR queued.concurrency_limit <= 0
+                           OR (
+                               SELECT COUNT(*) FROM jobs AS running
+                               WHERE running.concurrency_key = queued.concurrency_key AND running.status = ?
+                           ) < queued.concurrency_limit
+                       )
+                       ORDER BY run_after, id LIMIT 1
+                   )
+                   RETURNING id, kind, payload, attempts, max_attempts""",
+                (JOB_RUNNING, self.worker_id, now, JOB_QUEUED, now, JOB_RUNNING)
+            ).fetchone()
+            conn.commit()
+        
+        if row is None:
+            return None
+        
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "payload": json.loads(row[2]),
+            "attempts": row[3],
+            "max_attempts": row[4]
+        }
+    
+    def _update(self, job_id: int, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            conn.commit()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Open the SQLite job database on first use"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    run_after REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    last_error TEXT,
+                    concurrency_key TEXT,
+                    concurrency_limit INTEGER,
+                    worker TEXT
+                )"""
+            )
+            # Job files created before concurrency limits or leases existed
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "concurrency_key" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN concurrency_key TEXT")
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN concurrency_limit INTEGER")
+            if "worker" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_jobs_concurrency_key_status ON jobs (concurrency_key, status)"
+            )
+            self._conn.commit()
+        
+        return self._conn
+
+# Shared background job queue
+job_queue = JobQueue(
+    db_path=os.path.join(settings.DATA_DIR, "jobs.db"),
+    workers=settings.JOB_WORKERS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS,
+    poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    retention_seconds=settings.JOB_RETENTION_DAYS * 86400
+)
\ No newline at end of file
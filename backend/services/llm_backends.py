@@ -0,0 +1,219 @@
+"""
+Pluggable LLM backends selected by settings.LLM_BACKEND
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_groq import ChatGroq
+
+from backend.core.config import settings
+from backend.services.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_STUB_INSIGHTS = [
+    "Increase SIP contributions to large-cap index funds while valuations are near their long-term average.",
+    "Use the Section 80C limit early in the financial year through ELSS funds to benefit from rupee cost averaging.",
+    "Keep six months of expenses in a liquid fund before adding to equity exposure.",
+]
+
+_STUB_CHAT_REPLIES = [
+    "For most Indian investors, a mix of equity index funds, PPF and a liquid emergency fund is a sound base. "
+    "Review your asset allocation once a year and rebalance when it drifts by more than five percent.",
+    "Short-term gains on equity funds are taxed at 20%, while long-term gains above Rs 1.25 lakh are taxed at 12.5%. "
+    "Holding for more than a year is usually more tax efficient.",
+    "Before investing, make sure you have adequate term and health insurance. "
+    "After that, prioritise retirement savings through NPS and EPF alongside equity mutual funds.",
+]
+
+class StubChatModel(BaseChatModel):
+    """
+    Local chat model returning canned, schema-valid responses with modelled latency
+    
+    Responses match what the services parse: insight JSON for the insight
+    prompt, summary/insights JSON for document analysis, and plain text for
+    chat and conversation summaries. Latency before the first token follows the
+    configured distribution, and streamed tokens arrive at a fixed rate, so the
+    whole request path can be load-tested without a network.
+    """
+    
+    model_name: str = "stub"
+    temperature: float = 0.7
+    max_tokens: int = 2048
+    latency_distribution: str = "lognormal"  # fixed, uniform or lognormal
+    latency_ms: float = 800.0
+    latency_spread: float = 0.5
+    tokens_per_second: float = 50.0
+    
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        prompt, text = self._prompt_and_response(messages)
+        time.sleep(self._first_token_delay() + self._generation_time(text))
+        return self._result(prompt, text)
+    
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        prompt, text = self._prompt_and_response(messages)
+        await asyncio.sleep(self._first_token_delay() + self._generation_time(text))
+        return self._result(prompt, text)
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        _, text = self._prompt_and_response(messages)
+        time.sleep(self._first_token_delay())
+        for token in self._tokens(text):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            time.sleep(1.0 / self.tokens_per_second)
+    
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        _, text = self._prompt_and_response(messages)
+        await asyncio.sleep(self._first_token_delay())
+        for token in self._tokens(text):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            await asyncio.sleep(1.0 / self.tokens_per_second)
+    
+    def _prompt_and_response(self, messages: List[BaseMessage]):
+        prompt = "\n".join(str(message.content) for message in messages)
+        return prompt, self._canned_response(prompt)
+    
+    def _canned_response(self, prompt: str) -> str:
+        """Pick a response shaped like what the prompt asks for"""
+        # Deterministic per prompt, so cached and coalesced paths behave like the real model
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        
+        if '"confidence"' in prompt:
+            return json.dumps({
+                "message": _STUB_INSIGHTS[seed % len(_STUB_INSIGHTS)],
+                "confidence": 60 + seed % 35
+            })
+        
+        if '"summary"' in prompt and '"insights"' in prompt:
+            return json.dumps({
+                "summary": "This financial document lists account activity and holdings "
+                           "with periodic totals and closing balances.",
+                "insights": [
+                    "Regular monthly inflows indicate a stable income source.",
+                    "Discretionary spending is the largest expense category.",
+                    "Idle cash balances could be moved to a liquid or short-duration fund.",
+                ]
+            })
+        
+        if "Progressively summarize" in prompt:
+            return "The human asked for Indian personal finance advice and the AI suggested a diversified, tax-efficient plan."
+        
+        return _STUB_CHAT_REPLIES[seed % len(_STUB_CHAT_REPLIES)]
+    
+    def _first_token_delay(self) -> float:
+        """Sample the time to first token in seconds"""
+        base = self.latency_ms / 1000.0
+        if self.latency_distribution == "fixed":
+            return base
+        if self.latency_distribution == "uniform":
+            return max(0.0, random.uniform(base * (1 - self.latency_spread), base * (1 + self.latency_spread)))
+        # lognormal: latency_ms is the median, latency_spread the sigma (long right tail)
+        return random.lognormvariate(0.0, self.latency_spread) * base
+    
+    def _generation_time(self, text: str) -> float:
+        return estimate_tokens(text) / self.tokens_per_second
+    
+    def _tokens(self, text: str) -> List[str]:
+        """Split text into word-sized stream chunks that join back to the original"""
+        words = text.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+    
+    def _result(self, prompt: str, text: str) -> ChatResult:
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens
+            },
+            response_metadata={"model_name": self.model_name}
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+def _create_groq(model_name: str, temperature: float, max_tokens: int) -> Optional[BaseChatModel]:
+    """Create a GROQ chat model, or None without an API key"""
+    if not settings.GROQ_API_KEY:
+        return None
+    
+    return ChatGroq(
+        api_key=settings.GROQ_API_KEY,
+        model_name=model_name,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+
+def _create_stub(model_name: str, temperature: float, max_tokens: int) -> BaseChatModel:
+    """Create a local stub chat model"""
+    return StubChatModel(
+        model_name=model_name,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        latency_distribution=settings.LLM_STUB_LATENCY,
+        latency_ms=settings.LLM_STUB_LATENCY_MS,
+        latency_spread=settings.LLM_STUB_LATENCY_SPREAD,
+        tokens_per_second=settings.LLM_STUB_TOKENS_PER_SECOND,
+    )
+
+# Backend name -> factory(model_name, temperature, max_tokens)
+LLM_BACKENDS: Dict[str, Callable[[str, float, int], Optional[BaseChatModel]]] = {
+    "groq": _create_groq,
+    "stub": _create_stub,
+}
+
+def create_chat_model(model_name: str, temperature: float, max_tokens: int) -> Optional[BaseChatModel]:
+    """
+    Create a chat model for the configured backend
+    
+    Args:
+        model_name: Model name
+        temperature: Sampling temperature
+        max_tokens: Maximum completion tokens
+    
+    Returns:
+        Chat model, or None if the backend is not usable (e.g. missing API key)
+    """
+    factory = LLM_BACKENDS.get(settings.LLM_BACKEND)
+    if factory is None:
+        logger.error(f"Unknown LLM backend '{settings.LLM_BACKEND}', expected one of {', '.join(LLM_BACKENDS)}")
+        return None
+    
+    return factory(model_name, temperature, max_tokens)
\ No newline at end of file
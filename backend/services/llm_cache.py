@@ -0,0 +1,128 @@
+"""
+In-process response cache for LLM completions
+"""
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """TTL-bounded LRU cache for LLM results, keyed by prompt and model settings"""
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 3600):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries: Maximum number of entries kept before LRU eviction
+            ttl_seconds: Time-to-live of each entry in seconds
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def make_key(prompt: str, **model_settings: Any) -> str:
+        """
+        Build a cache key from a rendered prompt and the model settings
+        
+        Args:
+            prompt: Fully rendered prompt text
+            **model_settings: Model name, temperature, max tokens, etc.
+        
+        Returns:
+            Hex SHA-256 digest identifying the request
+        """
+        payload = json.dumps(
+            {"prompt": prompt, "settings": model_settings},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value
+        
+        Args:
+            key: Cache key from make_key
+        
+        Returns:
+            A copy of the cached value, or None on a miss or expired entry
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+        
+        # Callers may mutate the result, so never hand out the stored object
+        return copy.deepcopy(value)
+    
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entries if needed
+        
+        Args:
+            key: Cache key from make_key
+            value: Value to cache
+        """
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dictionary with size, hit/miss counters and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Shared cache for financial insights
+insight_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+)
\ No newline at end of file
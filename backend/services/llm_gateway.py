@@ -0,0 +1,546 @@
+"""
+Shared LLM gateway with concurrency limiting, rate limiting and backpressure
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable
+
+from backend.core.config import settings
+from backend.services.llm_backends import create_chat_model
+from backend.services.llm_metrics import (
+    OUTCOME_CANCELLED,
+    OUTCOME_CIRCUIT_OPEN,
+    OUTCOME_ERROR,
+    OUTCOME_OK,
+    OUTCOME_OVERLOADED,
+    OUTCOME_TIMEOUT,
+    llm_metrics,
+)
+from backend.services.llm_resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from backend.services.prompt_registry import output_text
+from backend.services.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0  # Advisor chat and dashboard insights
+PRIORITY_BACKGROUND = 1  # Document analysis and chat summarization
+
+class LLMOverloadedError(Exception):
+    """Raised when an LLM call cannot be admitted because the gateway queue is full"""
+    
+    def __init__(self, retry_after: float, message: str = "LLM capacity exhausted, please retry later"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+    
+    def __init__(self, per_minute: int):
+        """
+        Initialize a full bucket
+        
+        Args:
+            per_minute: Refill rate and capacity; 0 disables the limit
+        """
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+    
+    def delay(self, amount: float) -> float:
+        """
+        Seconds until `amount` can be taken (0 if available now)
+        
+        Requests larger than the capacity only wait for a full bucket.
+        """
+        if not self.enabled:
+            return 0.0
+        
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        
+        return (needed - self.level) / self.rate
+    
+    def take(self, amount: float) -> None:
+        """Take tokens; the level may go negative to account for actual usage"""
+        if self.enabled:
+            self._refill()
+            self.level -= amount
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+class LLMGateway:
+    """
+    Single entry point for LLM calls from every service
+    
+    Owns the shared model clients and admits calls through a max-in-flight
+    limit and request/token per-minute buckets. Calls that cannot start
+    immediately wait in a bounded priority queue (interactive before
+    background); when the queue is full, or a call waits too long, an
+    LLMOverloadedError carrying a Retry-After estimate is raised.
+    
+    Admitted calls run under the retry policy (deadline, retries, hedging)
+    and the circuit breaker, which raises CircuitOpenError while the
+    provider is failing so services fall back without waiting on it.
+    """
+    
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_queue: int = 64,
+        queue_timeout: float = 30.0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Initialize the gateway
+        
+        Args:
+            max_in_flight: Maximum number of concurrent LLM calls
+            max_queue: Maximum number of calls waiting for admission
+            queue_timeout: Maximum seconds a call may wait for admission
+            requests_per_minute: Request rate limit, 0 for unlimited
+            tokens_per_minute: Token rate limit, 0 for unlimited
+            retry_policy: Deadline, retry and hedging policy for provider calls
+            breaker: Circuit breaker guarding the provider
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        
+        self._clients: Dict[Tuple, Any] = {}
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future, int]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_queue_depth = 0
+        self._wait_times: deque = deque(maxlen=1000)
+        self._service_times: deque = deque(maxlen=100)
+    
+    def get_llm(self, model_name: str, temperature: float, max_tokens: int) -> Optional[Any]:
+        """
+        Get the shared client for a model configuration
+        
+        Args:
+            model_name: Model name
+            temperature: Sampling temperature
+            max_tokens: Maximum completion tokens
+        
+        Returns:
+            Chat model from the configured backend, or None if it is unavailable
+        """
+        key = (settings.LLM_BACKEND, model_name, temperature, max_tokens)
+        if key not in self._clients:
+            llm = create_chat_model(model_name, temperature, max_tokens)
+            if llm is None:
+                return None
+            
+            self._clients[key] = llm
+            logger.info(f"{settings.LLM_BACKEND} LLM initialized for {model_name} at temperature {temperature}")
+        
+        return self._clients[key]
+    
+    async def ainvoke(
+        self,
+        runnable: Runnable,
+        inputs: Dict[str, Any],
+        priority: int = PRIORITY_INTERACTIVE,
+        endpoint: str = "unknown",
+        user_id: Optional[int] = None
+    ) -> Any:
+        """
+        Invoke a prompt | llm runnable once admitted
+        
+        Failed or timed out attempts give their slot back and are retried
+        after a jittered backoff, up to the retry policy's limit. Every call
+        is recorded in the LLM metrics, whatever its outcome.
+        
+        Args:
+            runnable: Runnable to invoke
+            inputs: Prompt variables
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            endpoint: Feature making the call, for usage accounting
+            user_id: User the call is made for, or None for shared calls
+        
+        Returns:
+            Model output
+        
+        Raises:
+            LLMOverloadedError: If the call could not be admitted
+            CircuitOpenError: If the circuit breaker is open
+            asyncio.TimeoutError: If the last attempt missed its deadline
+        """
+        prompt_tokens = self._estimate_prompt_tokens(inputs)
+        started = time.monotonic()
+        queue_seconds = 0.0
+        ttft_seconds = None
+        output = None
+        outcome = OUTCOME_OK
+        attempt = 0
+        try:
+            while True:
+                self.breaker.before_call()
+                try:
+                    async with self.slot(priority, prompt_tokens) as waited:
+                        queue_seconds += waited
+                        admitted = time.monotonic()
+                        output = await self.retry_policy.attempt(
+                            lambda: runnable.ainvoke(inputs),
+                            can_hedge=lambda: self._reserve_hedge(prompt_tokens)
+                        )
+                        # Without streaming the first token arrives with the whole response
+                        ttft_seconds = time.monotonic() - admitted
+                except (LLMOverloadedError, asyncio.CancelledError):
+                    self.breaker.release_probe()
+                    raise
+                except Exception as e:
+                    self.breaker.record_failure()
+                    if attempt >= self.retry_policy.max_retries:
+                        raise
+                    
+                    delay = self.retry_policy.backoff_delay(attempt)
+                    logger.warning(f"LLM call failed ({type(e).__name__}: {e}), retrying in {delay:.2f}s")
+                    self.retry_policy.retries += 1
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    continue
+                
+                self.breaker.record_success()
+                self.token_bucket.take(estimate_tokens(output_text(output)))
+                return output
+        except BaseException as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            usage = getattr(output, "usage_metadata", None) or {}
+            llm_metrics.record(
+                endpoint=endpoint,
+                user_id=user_id,
+                model_name=_model_name(runnable),
+                outcome=outcome,
+                prompt_tokens=usage.get("input_tokens", prompt_tokens),
+                completion_tokens=usage.get(
+                    "output_tokens",
+                    estimate_tokens(output_text(output)) if output is not None else 0
+                ),
+                queue_seconds=queue_seconds,
+                ttft_seconds=ttft_seconds,
+                latency_seconds=time.monotonic() - started,
+                attempts=attempt + 1
+            )
+    
+    async def astream(
+        self,
+        runnable: Runnable,
+        inputs: Dict[str, Any],
+        priority: int = PRIORITY_INTERACTIVE,
+        endpoint: str = "unknown",
+        user_id: Optional[int] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Stream a prompt | llm runnable once admitted
+        
+        The slot is held until the stream is exhausted or closed. Streams are
+        not retried, since chunks may already have reached the client; the
+        call deadline applies to the wait for each chunk instead.
+        
+        Args:
+            runnable: Runnable to stream
+            inputs: Prompt variables
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            endpoint: Feature making the call, for usage accounting
+            user_id: User the call is made for, or None for shared calls
+        
+        Yields:
+            Output chunks
+        
+        Raises:
+            LLMOverloadedError: If the call could not be admitted
+            CircuitOpenError: If the circuit breaker is open
+            asyncio.TimeoutError: If a chunk missed the call deadline
+        """
+        prompt_tokens = self._estimate_prompt_tokens(inputs)
+        completion_tokens = 0
+        usage: Dict[str, int] = {}
+        started = time.monotonic()
+        queue_seconds = 0.0
+        ttft_seconds = None
+        outcome = OUTCOME_OK
+        try:
+            self.breaker.before_call()
+            try:
+                async with self.slot(priority, prompt_tokens) as waited:
+                    queue_seconds = waited
+                    admitted = time.monotonic()
+                    chunks = runnable.astream(inputs).__aiter__()
+                    try:
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(
+                                    chunks.__anext__(),
+                                    self.retry_policy.timeout or None
+                                )
+                            except StopAsyncIteration:
+                                break
+                            except asyncio.TimeoutError:
+                                self.retry_policy.timeouts += 1
+                                raise
+                            
+                            if ttft_seconds is None:
+                                ttft_seconds = time.monotonic() - admitted
+                            completion_tokens += estimate_tokens(output_text(chunk))
+                            # Providers that report usage do so on one of the chunks
+                            for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                                if isinstance(value, int):
+                                    usage[key] = usage.get(key, 0) + value
+                            yield chunk
+                    finally:
+                        self.token_bucket.take(completion_tokens)
+                        await chunks.aclose()
+            except LLMOverloadedError:
+                self.breaker.release_probe()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Closed or cancelled by the consumer: only judge the provider if it answered
+                if ttft_seconds is not None:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.release_probe()
+                raise
+            
+            self.breaker.record_success()
+        except BaseException as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            llm_metrics.record(
+                endpoint=endpoint,
+                user_id=user_id,
+                model_name=_model_name(runnable),
+                outcome=outcome,
+                prompt_tokens=usage.get("input_tokens", prompt_tokens),
+                completion_tokens=usage.get("output_tokens", completion_tokens),
+                queue_seconds=queue_seconds,
+                ttft_seconds=ttft_seconds,
+                latency_seconds=time.monotonic() - started
+            )
+    
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0):
+        """
+        Hold one LLM concurrency slot for the duration of the block
+        
+        Args:
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            tokens: Estimated prompt tokens charged to the token bucket
+        
+        Yields:
+            Seconds spent waiting for admission
+        
+        Raises:
+            LLMOverloadedError: If the queue is full or admission times out
+        """
+        waited = await self._acquire(priority, tokens)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self._service_times.append(time.monotonic() - started)
+            self._release()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get gateway statistics
+        
+        Returns:
+            Dictionary with in-flight calls, queue depth, admission counters and
+            queue wait times
+        """
+        waits = sorted(self._wait_times)
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "max_queue_depth_seen": self.max_queue_depth,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                "p95": round(waits[int(len(waits) * 0.95) - 1] * 1000, 2) if waits else 0.0,
+                "max": round(waits[-1] * 1000, 2) if waits else 0.0
+            },
+            "requests_per_minute": int(self.request_bucket.capacity),
+            "tokens_per_minute": int(self.token_bucket.capacity),
+            "retries": self.retry_policy.stats(),
+            "circuit_breaker": self.breaker.stats()
+        }
+    
+    async def _acquire(self, priority: int, tokens: int) -> float:
+        """Admit a call immediately or wait in the priority queue, returning the wait in seconds"""
+        enqueued = time.monotonic()
+        
+        # Fast path: capacity available and nobody ahead of us
+        if not self._waiters and self._in_flight < self.max_in_flight and self._rate_delay(tokens) == 0:
+            self._admit(tokens)
+            self._wait_times.append(0.0)
+            return 0.0
+        
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise LLMOverloadedError(self._retry_after())
+        
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter, tokens))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        self._dispatch()
+        
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                self.timed_out += 1
+                self._dispatch()
+                raise LLMOverloadedError(self._retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the caller went away: hand the slot back
+                self._release()
+            else:
+                waiter.cancel()
+                self._dispatch()
+            raise
+        
+        waited = time.monotonic() - enqueued
+        self._wait_times.append(waited)
+        return waited
+    
+    def _reserve_hedge(self, tokens: int) -> Optional[Callable[[], None]]:
+        """Take a spare slot for a hedged request without queueing"""
+        if self._waiters or self._in_flight >= self.max_in_flight or self._rate_delay(tokens) > 0:
+            return None
+        
+        self._admit(tokens)
+        return self._release
+    
+    def _release(self) -> None:
+        """Free a slot and admit the next waiter"""
+        self._in_flight -= 1
+        self._dispatch()
+    
+    def _admit(self, tokens: int) -> None:
+        self._in_flight += 1
+        self.admitted += 1
+        self.request_bucket.take(1)
+        self.token_bucket.take(tokens)
+    
+    def _dispatch(self) -> None:
+        """Admit queued calls in priority order while capacity and rate allow"""
+        while self._waiters and self._in_flight < self.max_in_flight:
+            _, _, waiter, tokens = self._waiters[0]
+            if waiter.done():
+                # Cancelled or timed out while queued
+                heapq.heappop(self._waiters)
+                continue
+            
+            delay = self._rate_delay(tokens)
+            if delay > 0:
+                # Wake up when the buckets have refilled enough
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+                return
+            
+            heapq.heappop(self._waiters)
+            self._admit(tokens)
+            waiter.set_result(None)
+    
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+    
+    def _rate_delay(self, tokens: int) -> float:
+        return max(self.request_bucket.delay(1), self.token_bucket.delay(tokens))
+    
+    def _retry_after(self) -> float:
+        """Estimate when capacity frees up from queue depth and recent call durations"""
+        service_time = (
+            sum(self._service_times) / len(self._service_times)
+            if self._service_times else 1.0
+        )
+        backlog = (len(self._waiters) + 1) / self.max_in_flight
+        return max(1.0, math.ceil(backlog * service_time), self._rate_delay(0))
+    
+    def _estimate_prompt_tokens(self, inputs: Dict[str, Any]) -> int:
+        return sum(estimate_tokens(str(value)) for value in inputs.values())
+
+def _outcome(error: BaseException) -> str:
+    """Classify why an LLM call ended early"""
+    if isinstance(error, LLMOverloadedError):
+        return OUTCOME_OVERLOADED
+    if isinstance(error, CircuitOpenError):
+        return OUTCOME_CIRCUIT_OPEN
+    if isinstance(error, asyncio.TimeoutError):
+        return OUTCOME_TIMEOUT
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return OUTCOME_CANCELLED
+    return OUTCOME_ERROR
+
+def _model_name(runnable: Runnable) -> str:
+    """Name of the model at the end of a prompt | llm runnable"""
+    model = getattr(runnable, "last", runnable)
+    return getattr(model, "model_name", None) or type(model).__name__
+
+# Singleton instance
+llm_gateway = LLMGateway(
+    max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    retry_policy=RetryPolicy(
+        timeout=settings.LLM_CALL_TIMEOUT_SECONDS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        backoff=settings.LLM_RETRY_BACKOFF_SECONDS,
+        hedge_after=settings.LLM_HEDGE_AFTER_SECONDS
+    ),
+    breaker=CircuitBreaker(
+        error_threshold=settings.LLM_BREAKER_ERROR_RATE,
+        min_calls=settings.LLM_BREAKER_MIN_CALLS,
+        window_seconds=settings.LLM_BREAKER_WINDOW_SECONDS,
+        cooldown_seconds=settings.LLM_BREAKER_COOLDOWN_SECONDS
+    )
+)
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""
+Per-call LLM instrumentation with an in-memory call log and a usage ledger
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+from backend.database import SessionLocal
+from backend.models.llm_usage import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+# Call outcomes
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_OVERLOADED = "overloaded"
+OUTCOME_CIRCUIT_OPEN = "circuit_open"
+OUTCOME_CANCELLED = "cancelled"
+
+class LLMMetrics:
+    """
+    Records every LLM call made through the gateway
+    
+    Each call is appended to a fixed-size ring buffer for inspection and
+    folded into in-memory aggregates keyed by (day, user, endpoint, model).
+    A background task adds the aggregates to the `llm_usage` ledger table
+    every `flush_interval` seconds, so recording a call never touches the
+    database.
+    """
+    
+    def __init__(
+        self,
+        capacity: int = 1000,
+        flush_interval: float = 10.0,
+        prompt_cost_per_1k: float = 0.0,
+        completion_cost_per_1k: float = 0.0
+    ):
+        """
+        Initialize the metrics recorder
+        
+        Args:
+            capacity: Number of recent calls kept in the ring buffer
+            flush_interval: Seconds between ledger writes
+            prompt_cost_per_1k: Cost per 1000 prompt tokens
+            completion_cost_per_1k: Cost per 1000 completion tokens
+        """
+        self.flush_interval = flush_interval
+        self.prompt_cost_per_1k = prompt_cost_per_1k
+        self.completion_cost_per_1k = completion_cost_per_1k
+        
+        self._calls: deque = deque(maxlen=capacity)
+        self._pending: Dict[Tuple[date, Optional[int], str, str], Dict[str, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.recorded = 0
+    
+    def record(
+        self,
+        endpoint: str,
+        user_id: Optional[int],
+        model_name: str,
+        outcome: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        queue_seconds: float,
+        ttft_seconds: Optional[float],
+        latency_seconds: float,
+        attempts: int = 1
+    ) -> None:
+        """
+        Record one LLM call
+        
+        Args:
+            endpoint: Feature that made the call (e.g. chat, insight)
+            user_id: User the call was made for, or None for shared calls
+            model_name: Model that served the call
+            outcome: One of the OUTCOME_* constants
+            prompt_tokens: Prompt tokens (reported by the provider or estimated)
+            completion_tokens: Completion tokens (reported by the provider or estimated)
+            queue_seconds: Time spent waiting for gateway admission
+            ttft_seconds: Time from admission to the first token, if one arrived
+            latency_seconds: Total time including queueing and retries
+            attempts: Number of provider attempts
+        """
+        cost = self._cost(prompt_tokens, completion_tokens)
+        self._calls.append({
+            "timestamp": datetime.utcnow().isoformat(),
+            "endpoint": endpoint,
+            "user_id": user_id,
+            "model": model_name,
+            "outcome": outcome,
+            "attempts": attempts,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "queue_ms": round(queue_seconds * 1000, 2),
+            "ttft_ms": round(ttft_seconds * 1000, 2) if ttft_seconds is not None else None,
+            "latency_ms": round(latency_seconds * 1000, 2),
+            "cost": round(cost, 6)
+        })
+        self.recorded += 1
+        
+        key = (datetime.utcnow().date(), user_id, endpoint, model_name)
+        totals = self._pending.setdefault(key, {
+            "calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "total_latency_ms": 0.0, "total_queue_ms": 0.0, "cost": 0.0
+        })
+        totals["calls"] += 1
+        totals["errors"] += 0 if outcome == OUTCOME_OK else 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        totals["total_latency_ms"] += latency_seconds * 1000
+        totals["total_queue_ms"] += queue_seconds * 1000
+        totals["cost"] += cost
+    
+    def recent_calls(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get the most recent calls, newest first
+        
+        Args:
+            limit: Maximum number of calls to return
+        
+        Returns:
+            List of call records
+        """
+        calls = list(self._calls)
+        calls.reverse()
+        return calls[:limit]
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the calls in the ring buffer per endpoint
+        
+        Returns:
+            Dictionary of endpoint -> call counts, token totals, cost and
+            latency percentiles
+        """
+        by_endpoint: Dict[str, List[Dict[str, Any]]] = {}
+        for call in self._calls:
+            by_endpoint.setdefault(call["endpoint"], []).append(call)
+        
+        summary = {}
+        for endpoint, calls in by_endpoint.items():
+            latencies = sorted(call["latency_ms"] for call in calls)
+            queues = sorted(call["queue_ms"] for call in calls)
+            ttfts = sorted(call["ttft_ms"] for call in calls if call["ttft_ms"] is not None)
+            summary[endpoint] = {
+                "calls": len(calls),
+                "errors": sum(1 for call in calls if call["outcome"] != OUTCOME_OK),
+                "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+                "completion_tokens": sum(call["completion_tokens"] for call in calls),
+                "cost": round(sum(call["cost"] for call in calls), 6),
+                "latency_ms": _percentiles(latencies),
+                "queue_ms": _percentiles(queues),
+                "ttft_ms": _percentiles(ttfts)
+            }
+        
+        return summary
+    
+    def start(self) -> None:
+        """Start the periodic ledger writer on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the ledger writer and write outstanding aggregates"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self.flush()
+    
+    async def flush(self) -> None:
+        """Add the pending aggregates to the ledger"""
+        # Serialized so two flushes never both create the same ledger row
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            
+            pending, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(self._write_ledger, pending)
+            except Exception as e:
+                logger.error(f"Error writing LLM usage ledger: {str(e)}")
+                # Put the totals back so they are retried on the next flush
+                for key, totals in pending.items():
+                    current = self._pending.setdefault(key, dict.fromkeys(totals, 0))
+                    for field, value in totals.items():
+                        current[field] += value
+    
+    async def get_usage(self, days: int = 7, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get ledger rows for recent days
+        
+        Args:
+            days: Number of days to include, counting today
+            user_id: Only include this user's usage
+        
+        Returns:
+            List of ledger rows, newest day first
+        """
+        await self.flush()
+        return await asyncio.to_thread(self._query_usage, days, user_id)
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+    
+    def _write_ledger(self, pending: Dict[Tuple[date, Optional[int], str, str], Dict[str, float]]) -> None:
+        """Add aggregates to existing ledger rows, creating rows as needed"""
+        db = SessionLocal()
+        try:
+            for (day, user_id, endpoint, model_name), totals in pending.items():
+                row = db.query(LLMUsage).filter(
+                    LLMUsage.day == day,
+                    LLMUsage.user_id.is_(None) if user_id is None else LLMUsage.user_id == user_id,
+                    LLMUsage.endpoint == endpoint,
+                    LLMUsage.model_name == model_name
+                ).first()
+                if row is None:
+                    row = LLMUsage(day=day, user_id=user_id, endpoint=endpoint, model_name=model_name)
+                    for field in totals:
+                        setattr(row, field, 0)
+                    db.add(row)
+                
+                for field, value in totals.items():
+                    setattr(row, field, getattr(row, field) + value)
+            
+            db.commit()
+        finally:
+            db.close()
+    
+    def _query_usage(self, days: int, user_id: Optional[int]) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            since = datetime.utcnow().date() - timedelta(days=max(1, days) - 1)
+            query = db.query(LLMUsage).filter(LLMUsage.day >= since)
+            if user_id is not None:
+                query = query.filter(LLMUsage.user_id == user_id)
+            
+            rows = query.order_by(LLMUsage.day.desc(), LLMUsage.cost.desc()).all()
+            return [
+                {
+                    "day": row.day.isoformat(),
+                    "user_id": row.user_id,
+                    "endpoint": row.endpoint,
+                    "model": row.model_name,
+                    "calls": row.calls,
+                    "errors": row.errors,
+                    "prompt_tokens": row.prompt_tokens,
+                    "completion_tokens": row.completion_tokens,
+                    "avg_latency_ms": round(row.total_latency_ms / row.calls, 2) if row.calls else 0.0,
+                    "avg_queue_ms": round(row.total_queue_ms / row.calls, 2) if row.calls else 0.0,
+                    "cost": round(row.cost, 6)
+                }
+                for row in rows
+            ]
+        finally:
+            db.close()
+    
+    def _cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (
+            prompt_tokens / 1000 * self.prompt_cost_per_1k
+            + completion_tokens / 1000 * self.completion_cost_per_1k
+        )
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/max of sorted values"""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    
+    return {
+        "p50": values[len(values) // 2],
+        "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        "max": values[-1]
+    }
+
+# Singleton instance
+llm_metrics = LLMMetrics(
+    capacity=settings.LLM_CALL_LOG_SIZE,
+    flush_interval=settings.LLM_USAGE_FLUSH_SECONDS,
+    prompt_cost_per_1k=settings.LLM_COST_PER_1K_PROMPT_TOKENS,
+    completion_cost_per_1k=settings.LLM_COST_PER_1K_COMPLETION_TOKENS
+)
\ No newline at end of file
@@ -0,0 +1,268 @@
+"""
+Deadlines, retries and circuit breaking for LLM provider calls
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit breaker is open"""
+    
+    def __init__(self, retry_after: float, message: str = "LLM provider circuit is open"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a sliding time window
+    
+    While closed, calls go through and their outcomes are recorded. Once at
+    least `min_calls` outcomes in the window have an error rate of
+    `error_threshold` or more, the breaker opens and calls fail fast with
+    CircuitOpenError for `cooldown_seconds`. It then half-opens and lets a
+    single probe call through: success closes the breaker, failure reopens it.
+    """
+    
+    def __init__(
+        self,
+        error_threshold: float = 0.5,
+        min_calls: int = 10,
+        window_seconds: float = 60.0,
+        cooldown_seconds: float = 30.0
+    ):
+        """
+        Initialize a closed breaker
+        
+        Args:
+            error_threshold: Error rate (0-1) that opens the breaker
+            min_calls: Minimum outcomes in the window before the rate is judged
+            window_seconds: Length of the sliding outcome window
+            cooldown_seconds: Time the breaker stays open before a probe
+        """
+        self.error_threshold = error_threshold
+        self.min_calls = max(1, min_calls)
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        
+        self.state = STATE_CLOSED
+        self._outcomes: deque = deque()  # (timestamp, succeeded)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        
+        # Metrics
+        self.times_opened = 0
+        self.short_circuited = 0
+    
+    def before_call(self) -> None:
+        """
+        Check that a call may go to the provider
+        
+        Raises:
+            CircuitOpenError: If the breaker is open or a probe is already running
+        """
+        if self.state == STATE_OPEN:
+            remaining = self._opened_at + self.cooldown_seconds - time.monotonic()
+            if remaining > 0:
+                self.short_circuited += 1
+                raise CircuitOpenError(remaining)
+            
+            self.state = STATE_HALF_OPEN
+            logger.info("LLM circuit breaker half-open, sending a probe call")
+        
+        if self.state == STATE_HALF_OPEN:
+            if self._probe_in_flight:
+                self.short_circuited += 1
+                raise CircuitOpenError(self.cooldown_seconds)
+            self._probe_in_flight = True
+    
+    def release_probe(self) -> None:
+        """Give back a probe that ended without reaching the provider"""
+        self._probe_in_flight = False
+    
+    def record_success(self) -> None:
+        """Record a successful provider call"""
+        if self.state == STATE_HALF_OPEN:
+            self._probe_in_flight = False
+            self.state = STATE_CLOSED
+            self._outcomes.clear()
+            logger.info("LLM circuit breaker closed")
+            return
+        
+        self._record(True)
+    
+    def record_failure(self) -> None:
+        """Record a failed or timed out provider call"""
+        if self.state == STATE_HALF_OPEN:
+            self._probe_in_flight = False
+            self._open()
+            return
+        
+        self._record(False)
+        if self.state == STATE_CLOSED and len(self._outcomes) >= self.min_calls:
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if failures / len(self._outcomes) >= self.error_threshold:
+                self._open()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker statistics
+        
+        Returns:
+            Dictionary with state, windowed error rate and short-circuit counters
+        """
+        self._trim()
+        failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_error_rate": round(failures / len(self._outcomes), 4) if self._outcomes else 0.0,
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited
+        }
+    
+    def _record(self, succeeded: bool) -> None:
+        self._outcomes.append((time.monotonic(), succeeded))
+        self._trim()
+    
+    def _trim(self) -> None:
+        cutoff = time.monotonic() - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+    
+    def _open(self) -> None:
+        self.state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.times_opened += 1
+        logger.warning(f"LLM circuit breaker opened for {self.cooldown_seconds}s")
+
+class RetryPolicy:
+    """
+    Per-attempt deadline, bounded retries with full jitter and optional hedging
+    
+    Each attempt is cancelled after `timeout` seconds. Failed attempts are
+    retried up to `max_retries` times, sleeping a random time up to
+    `backoff * 2**attempt` in between. With `hedge_after` set, an attempt that
+    has not finished after that many seconds gets a second, identical request
+    racing it (if `can_hedge` allows), and the first result wins.
+    """
+    
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        hedge_after: float = 0.0
+    ):
+        """
+        Initialize the policy
+        
+        Args:
+            timeout: Deadline for a single attempt in seconds (0 for none)
+            max_retries: Retries after the first attempt
+            backoff: Base backoff in seconds
+            hedge_after: Seconds before a hedged request is sent (0 disables hedging)
+        """
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        
+        # Metrics
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter backoff before retry number `attempt` (0-based)"""
+        return random.uniform(0, self.backoff * (2 ** attempt))
+    
+    async def attempt(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        can_hedge: Optional[Callable[[], Optional[Callable[[], None]]]] = None
+    ) -> Any:
+        """
+        Run one attempt under the deadline, hedging it if configured
+        
+        Args:
+            call: Coroutine function performing the provider call
+            can_hedge: Returns a release callback if spare capacity for a hedged
+                request was reserved, or None to skip hedging
+        
+        Returns:
+            The result of the first request to finish successfully
+        
+        Raises:
+            asyncio.TimeoutError: If the deadline passes
+        """
+        try:
+            return await asyncio.wait_for(self._hedged(call, can_hedge), self.timeout or None)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+    
+    async def _hedged(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        can_hedge: Optional[Callable[[], Optional[Callable[[], None]]]]
+    ) -> Any:
+        if self.hedge_after <= 0 or can_hedge is None:
+            return await call()
+        
+        primary = asyncio.ensure_future(call())
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+            if done:
+                return primary.result()
+            
+            release = can_hedge()
+            if release is None:
+                return await primary
+            
+            self.hedges += 1
+            hedge = asyncio.ensure_future(call())
+            hedge.add_done_callback(lambda _: release())
+            try:
+                pending = {primary, hedge}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is hedge:
+                                self.hedge_wins += 1
+                            return task.result()
+                
+                # Both failed: surface the primary's error
+                return primary.result()
+            finally:
+                hedge.cancel()
+        finally:
+            primary.cancel()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get retry statistics
+        
+        Returns:
+            Dictionary with timeout, retry and hedging counters
+        """
+        return {
+            "timeout_seconds": self.timeout,
+            "max_retries": self.max_retries,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+PDF text extraction in a bounded process pool, off the event loop
+"""
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+from backend.core.config import settings
+from backend.services.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes, so stored text is extracted again
+EXTRACTOR_VERSION = "pypdf-1"
+
+class PDFExtractionTimeout(Exception):
+    """Raised when a PDF takes longer than the extraction timeout"""
+
+def iter_pdf_pages(reader: PdfReader, first: int, last: int) -> Iterator[Tuple[int, str]]:
+    """
+    Extract pages lazily, so callers can stop as soon as they have enough text
+    
+    Args:
+        reader: Open PDF reader
+        first: Index of the first page (0-based)
+        last: Index after the last page
+    
+    Yields:
+        Page index and page text
+    """
+    for index in range(first, last):
+        yield index, reader.pages[index].extract_text() or ""
+
+def extract_pdf_text(
+    file_path: str,
+    max_pages: int,
+    max_tokens: int = 0,
+    page_range: Optional[Tuple[int, int]] = None
+) -> Dict[str, Any]:
+    """
+    Extract the text of a PDF (runs in a worker process)
+    
+    Pages are extracted in order until the text reaches `max_tokens`, so the
+    rest of a long document is never parsed.
+    
+    Args:
+        file_path: Path to the PDF
+        max_pages: Maximum number of pages to extract (0 for all)
+        max_tokens: Stop once this many tokens have been extracted (0 for no limit)
+        page_range: First and last page to extract, 1-based and inclusive
+            (a last page of None means the end of the document)
+    
+    Returns:
+        Dictionary with the text of each extracted page and page counts
+    """
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+    
+    first, last = 0, total_pages
+    if page_range is not None:
+        first = min(max(page_range[0], 1), total_pages + 1) - 1
+        last = max(first, min(page_range[1] or total_pages, total_pages))
+    if max_pages > 0:
+        last = min(last, first + max_pages)
+    
+    # Collect pages in a list; repeated string concatenation is quadratic on long documents
+    parts: List[str] = []
+    tokens = 0
+    stopped_early = False
+    for index, text in iter_pdf_pages(reader, first, last):
+        parts.append(text)
+        tokens += estimate_tokens(text)
+        if max_tokens > 0 and tokens >= max_tokens:
+            stopped_early = index + 1 < last
+            break
+    
+    return {
+        "page_texts": parts,
+        "pages": len(parts),
+        "total_pages": total_pages,
+        "first_page": first + 1,
+        "pages_skipped": total_pages - len(parts),
+        "stopped_early": stopped_early,
+        "tokens": tokens
+    }
+
+class PDFExtractor:
+    """
+    Runs CPU-bound PDF parsing in a bounded pool of worker processes
+    
+    pypdf holds the GIL while parsing, so even a thread would stall the event
+    loop; a process pool keeps it responsive. Each document gets a timeout
+    and a page limit. A document that times out cannot be interrupted inside
+    its worker, so the pool is torn down and rebuilt, failing any other
+    extraction running in it at that moment.
+    """
+    
+    def __init__(self, max_workers: int = 2, timeout: float = 60.0, max_pages: int = 200):
+        """
+        Initialize the extractor
+        
+        Args:
+            max_workers: Number of worker processes
+            timeout: Seconds allowed per document
+            max_pages: Maximum pages extracted per document (0 for all)
+        """
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self._pool: Optional[ProcessPoolExecutor] = None
+        
+        self.extracted = 0
+        self.timed_out = 0
+        self.stopped_early = 0
+        self.pages_extracted = 0
+        self.pages_skipped = 0
+    
+    async def extract(
+        self,
+        file_path: str,
+        max_tokens: int = 0,
+        page_range: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract the text of a PDF without blocking the event loop
+        
+        Args:
+            file_path: Path to the PDF
+            max_tokens: Stop extracting once this many tokens have been read (0 for no limit)
+            page_range: First and last page to extract, 1-based and inclusive
+        
+        Returns:
+            Dictionary with the text, the text of each page and page counts
+            (see extract_pdf_text)
+        
+        Raises:
+            PDFExtractionTimeout: If extraction exceeds the timeout
+        """
+        pool = self._get_pool()
+        future = asyncio.get_running_loop().run_in_executor(
+            pool, extract_pdf_text, file_path, self.max_pages, max_tokens, page_range
+        )
+        try:
+            result = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            self._reset_pool(pool)
+            raise PDFExtractionTimeout(f"PDF extraction exceeded {self.timeout}s: {file_path}")
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            raise
+        
+        result["text"] = "\n\n".join(result["page_texts"])
+        
+        self.extracted += 1
+        self.pages_extracted += result["pages"]
+        self.pages_skipped += result["pages_skipped"]
+        if result["stopped_early"]:
+            self.stopped_early += 1
+        if result["pages_skipped"]:
+            logger.info(f"Extracted {result['pages']} of {result['total_pages']} pages from {file_path}")
+        
+        return result
+    
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get extraction statistics
+        
+        Returns:
+            Dictionary with extraction, timeout and page counters
+        """
+        return {
+            "workers": self.max_workers,
+            "extracted": self.extracted,
+            "timed_out": self.timed_out,
+            "stopped_early": self.stopped_early,
+            "pages_extracted": self.pages_extracted,
+            "pages_skipped": self.pages_skipped
+        }
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+    
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Kill a pool with a stuck or crashed worker so the next call gets a fresh one"""
+        if self._pool is not pool:
+            return
+        
+        self._pool = None
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# Shared PDF extractor
+pdf_extractor = PDFExtractor(
+    max_workers=settings.PDF_EXTRACT_WORKERS,
+    timeout=settings.PDF_EXTRACT_TIMEOUT_SECONDS,
+    max_pages=settings.PDF_MAX_PAGES
+)
\ No newline at end of file
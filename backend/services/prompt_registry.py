@@ -0,0 +1,253 @@
+"""
+Registry of versioned prompt templates compiled once at startup
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
+
+logger = logging.getLogger(__name__)
+
+class RegisteredPrompt:
+    """A compiled prompt template with its version and construction cost"""
+    
+    def __init__(self, name: str, version: str, template: PromptTemplate, compile_seconds: float):
+        self.name = name
+        self.version = version
+        self.template = template
+        self.compile_seconds = compile_seconds
+
+class PromptRegistry:
+    """
+    Registry that builds prompt templates and runnables once and hands out shared instances
+    
+    Building a PromptTemplate and an LLMChain on every request costs pydantic
+    validation each time. The registry does that work once per prompt (and once
+    per prompt and model for runnables) and records the construction cost and the
+    per-request lookup cost so the saving can be measured.
+    """
+    
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._prompts: Dict[str, Dict[str, RegisteredPrompt]] = {}
+        self._active: Dict[str, str] = {}
+        self._runnables: Dict[Tuple[str, str], Tuple[Any, Runnable]] = {}
+        self._lock = threading.Lock()
+        
+        # Per-request overhead counters
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self.runnable_builds = 0
+        self.runnable_build_seconds = 0.0
+    
+    def register(
+        self,
+        name: str,
+        template: str,
+        input_variables: List[str],
+        version: str = "1",
+        activate: bool = True
+    ) -> RegisteredPrompt:
+        """
+        Compile and register a prompt template
+        
+        Args:
+            name: Prompt name
+            template: Template text in f-string format
+            input_variables: Names of the template variables
+            version: Version label; bump it whenever the template text changes
+            activate: Make this version the one returned by get
+        
+        Returns:
+            The registered prompt
+        """
+        started = time.perf_counter()
+        prompt_template = PromptTemplate(input_variables=input_variables, template=template)
+        compile_seconds = time.perf_counter() - started
+        
+        registered = RegisteredPrompt(name, version, prompt_template, compile_seconds)
+        with self._lock:
+            self._prompts.setdefault(name, {})[version] = registered
+            if activate or name not in self._active:
+                self._active[name] = version
+        
+        return registered
+    
+    def get(self, name: str, version: Optional[str] = None) -> RegisteredPrompt:
+        """
+        Get a registered prompt
+        
+        Args:
+            name: Prompt name
+            version: Specific version, or None for the active one
+        
+        Returns:
+            The registered prompt
+        
+        Raises:
+            KeyError: If the prompt or version is not registered
+        """
+        started = time.perf_counter()
+        with self._lock:
+            registered = self._prompts[name][version or self._active[name]]
+            self.lookups += 1
+            self.lookup_seconds += time.perf_counter() - started
+        
+        return registered
+    
+    def runnable(self, name: str, llm: Any, version: Optional[str] = None) -> Runnable:
+        """
+        Get a reusable `prompt | llm` runnable for a prompt and model
+        
+        The runnable is built on first use and shared afterwards. It returns the
+        model output (a message for chat models), so callers read `.content`.
+        
+        Args:
+            name: Prompt name
+            llm: Language model the prompt is piped into
+            version: Specific version, or None for the active one
+        
+        Returns:
+            Runnable taking the template variables as input
+        """
+        registered = self.get(name, version)
+        key = (name, registered.version)
+        
+        started = time.perf_counter()
+        with self._lock:
+            cached = self._runnables.get(key)
+            if cached is not None and cached[0] is llm:
+                self.lookup_seconds += time.perf_counter() - started
+                return cached[1]
+            
+            runnable = registered.template | llm
+            self._runnables[key] = (llm, runnable)
+            self.runnable_builds += 1
+            self.runnable_build_seconds += time.perf_counter() - started
+        
+        return runnable
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get registry statistics
+        
+        Returns:
+            Dictionary with registered prompts, one-off construction cost and
+            average per-request lookup overhead
+        """
+        with self._lock:
+            prompts = {
+                name: {
+                    "active_version": self._active[name],
+                    "versions": {
+                        version: {"compile_ms": round(registered.compile_seconds * 1000, 3)}
+                        for version, registered in versions.items()
+                    }
+                }
+                for name, versions in self._prompts.items()
+            }
+            
+            return {
+                "prompts": prompts,
+                "lookups": self.lookups,
+                "avg_lookup_us": round(self.lookup_seconds / self.lookups * 1e6, 2) if self.lookups else 0.0,
+                "runnable_builds": self.runnable_builds,
+                "runnable_build_ms": round(self.runnable_build_seconds * 1000, 3)
+            }
+
+def output_text(output: Any) -> str:
+    """
+    Get the text of a runnable output
+    
+    Args:
+        output: Model output; chat models return messages, plain LLMs strings
+        
+    Returns:
+        Output text
+    """
+    return str(getattr(output, "content", output))
+
+# Singleton instance
+prompt_registry = PromptRegistry()
+
+prompt_registry.register(
+    "financial_insight",
+    input_variables=["context"],
+    template="""You are a financial advisor for Indian investors. Based on current economic trends in India
+            and global markets, provide one actionable financial insight that would be valuable for Indian investors.
+            
+            Context: {context}
+            
+            Give a precise, actionable insight with a confidence level (0-100%).
+            Format your response as JSON: {{"message": "Your insight here", "confidence": confidence_value}}
+            """
+)
+
+prompt_registry.register(
+    "advisor_chat",
+    version="2",
+    input_variables=["documents", "history", "input"],
+    template="""You are a financial advisor specializing in the Indian market.
+            You provide helpful, ethical, and accurate financial advice.
+            
+            Relevant excerpts from the user's documents:
+            {documents}
+            
+            Current conversation:
+            {history}
+            Human: {input}
+            AI: """
+)
+
+prompt_registry.register(
+    "document_analysis",
+    input_variables=["document"],
+    template="""You are a financial document analyzer specializing in Indian financial markets.
+            Analyze the following document text and extract key financial insights.
+            
+            Document text:
+            {document}
+            
+            Provide a concise summary of the document and extract 3-5 key financial insights.
+            Format your response as JSON with two fields:
+            1. "summary": A concise summary of the document (1-2 paragraphs)
+            2. "insights": An array of strings, each string being a key financial insight
+            
+            Your response should be only the JSON object, nothing else.
+            """
+)
+
+prompt_registry.register(
+    "document_chunk_summary",
+    input_variables=["chunk", "part", "parts"],
+    template="""You are a financial document analyzer specializing in Indian financial markets.
+            Below is part {part} of {parts} of a longer financial document.
+            
+            Document text:
+            {chunk}
+            
+            Summarize this part in at most 150 words. Keep every figure that matters: totals, balances,
+            income, expenses, returns, holdings and dates. Do not add information that is not in the text.
+            """
+)
+
+prompt_registry.register(
+    "document_reduce",
+    input_variables=["summaries"],
+    template="""You are a financial document analyzer specializing in Indian financial markets.
+            The following are summaries of consecutive parts of one financial document.
+            
+            Part summaries:
+            {summaries}
+            
+            Combine them into a concise summary of the whole document and extract 3-5 key financial insights.
+            Format your response as JSON with two fields:
+            1. "summary": A concise summary of the document (1-2 paragraphs)
+            2. "insights": An array of strings, each string being a key financial insight
+            
+            Your response should be only the JSON object, nothing else.
+            """
+)
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Full-text search over uploaded documents with SQLite FTS5
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Column weights for BM25: a hit in the name or summary outranks one deep in the text
+NAME_WEIGHT = 5.0
+SUMMARY_WEIGHT = 3.0
+CONTENT_WEIGHT = 1.0
+
+# Words shown around each match in a snippet
+SNIPPET_TOKENS = 16
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+class DocumentSearchIndex:
+    """
+    BM25-ranked full-text index of document names, AI summaries and extracted text
+    
+    Rows live in an FTS5 table in a local SQLite file, keyed by document ID.
+    Every row carries an indexed owner token, so a user's query is answered
+    from the inverted index by intersecting it with their token rather than
+    filtering all matches afterwards. Documents are added or replaced as
+    their analysis completes and removed when they are deleted.
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Initialize the index
+        
+        Args:
+            db_path: Path of the SQLite file holding the index
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    def index_document(self, document_id: int, user_id: int, name: str, summary: str, content: str) -> None:
+        """
+        Add a document to the index, replacing any earlier entry
+        
+        Args:
+            document_id: Document ID
+            user_id: Owner of the document
+            name: Document name
+            summary: AI summary and insights
+            content: Extracted document text
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM document_fts WHERE rowid = ?", (document_id,))
+            conn.execute(
+                "INSERT INTO document_fts (rowid, owner, name, summary, content) VALUES (?, ?, ?, ?, ?)",
+                (document_id, _owner(user_id), name, summary, content)
+            )
+            conn.commit()
+    
+    def remove(self, document_id: int) -> None:
+        """
+        Remove a document from the index
+        
+        Args:
+            document_id: Document ID
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM document_fts WHERE rowid = ?", (document_id,))
+            conn.commit()
+    
+    def search(self, user_id: int, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """
+        Search a user's documents
+        
+        Every word of the query must match; the last word also matches as a
+        prefix, so results show up while the user is still typing.
+        
+        Args:
+            user_id: User whose documents are searched
+            query: Free-text query
+            limit: Maximum number of results
+            offset: Number of results to skip
+        
+        Returns:
+            Dictionary with the total match count and a page of results, best first
+        """
+        expression = _match_expression(query)
+        if expression is None:
+            return {"total": 0, "results": []}
+        
+        match = f"owner : {_owner(user_id)} AND ({expression})"
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(
+                "SELECT COUNT(*) FROM document_fts WHERE document_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"""SELECT rowid, name,
+                           bm25(document_fts, 0.0, ?, ?, ?) AS rank,
+                           snippet(document_fts, 3, '[', ']', '...', {SNIPPET_TOKENS}),
+                           snippet(document_fts, 2, '[', ']', '...', {SNIPPET_TOKENS})
+                    FROM document_fts
+                    WHERE document_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ? OFFSET ?""",
+                (NAME_WEIGHT, SUMMARY_WEIGHT, CONTENT_WEIGHT, match, limit, offset)
+            ).fetchall()
+        
+        return {
+            "total": total,
+            "results": [
+                {
+                    "document_id": row[0],
+                    "name": row[1],
+                    # bm25() is lower for better matches; flip it so higher is better
+                    "score": round(-row[2], 4),
+                    # Show the matching text, or the summary when only the name or summary matched
+                    "snippet": row[3] if "[" in row[3] else row[4]
+                }
+                for row in rows
+            ]
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get index statistics
+        
+        Returns:
+            Dictionary with the number of indexed documents
+        """
+        with self._lock:
+            count = self._connection().execute("SELECT COUNT(*) FROM document_fts").fetchone()[0]
+        return {"documents": count}
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Open the SQLite index on first use"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE VIRTUAL TABLE IF NOT EXISTS document_fts USING fts5(
+                    owner, name, summary, content,
+                    tokenize = 'porter unicode61'
+                )"""
+            )
+            self._conn.commit()
+        
+        return self._conn
+
+def _owner(user_id: int) -> str:
+    """Indexed token identifying a document's owner"""
+    return f"user{int(user_id)}"
+
+def _match_expression(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 expression of quoted terms, so user input is never parsed as syntax"""
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " AND ".join(f"{{name summary content}} : {term}" for term in quoted)
+
+# Shared document search index
+search_index = DocumentSearchIndex(os.path.join(settings.DATA_DIR, "search.db"))
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Request coalescing for identical concurrent LLM calls
+"""
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task
+    
+    The first caller for a key (the leader) starts the work; callers arriving
+    while it is running await the same task instead of repeating the call. The
+    key is forgotten as soon as the task finishes, so this is not a cache.
+    """
+    
+    def __init__(self):
+        """Initialize with no calls in flight"""
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func once for all concurrent callers with the same key
+        
+        Args:
+            key: Identity of the request, e.g. a hash of the rendered prompt
+            func: Coroutine function performing the call
+        
+        Returns:
+            The result of the shared call (exceptions are raised to every caller)
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            
+            # A cancelled caller must not cancel the call other callers are waiting on
+            return await asyncio.shield(task)
+        
+        self.coalesced += 1
+        logger.debug(f"Coalesced request {key[:12]} onto in-flight call")
+        
+        # Followers get their own copy so callers can safely mutate results
+        return copy.deepcopy(await asyncio.shield(task))
+    
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        """Drop a finished task, unless the key was already reused"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing statistics
+        
+        Returns:
+            Dictionary with in-flight, leader and coalesced call counts
+        """
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / total, 4) if total else 0.0
+        }
+
+# Shared instance for AI and document LLM calls
+llm_single_flight = SingleFlight()
\ No newline at end of file
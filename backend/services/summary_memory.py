@@ -0,0 +1,114 @@
+"""
+Conversation memory that keeps recent turns verbatim and folds older turns into a summary
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from langchain.memory import ConversationBufferMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.messages import BaseMessage, get_buffer_string
+from pydantic import PrivateAttr
+
+from backend.services.llm_gateway import PRIORITY_BACKGROUND, llm_gateway
+from backend.services.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Strong references to in-flight summarization tasks so they are not garbage collected
+_background_tasks: Set[asyncio.Task] = set()
+
+class RollingSummaryMemory(ConversationBufferMemory):
+    """
+    Buffer memory with a rolling summary and a hard token budget
+    
+    The last `max_turns` exchanges are replayed verbatim. Older exchanges are
+    folded into `summary` by a background LLM call scheduled after the response
+    has been returned, so summarization never adds latency to a chat turn. The
+    history handed to the prompt never exceeds `max_tokens`.
+    """
+    
+    summary: str = ""
+    max_turns: int = 4
+    max_tokens: int = 1024
+    
+    _folding: bool = PrivateAttr(default=False)
+    
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the summary plus as many recent messages as fit the token budget"""
+        summary = truncate_to_tokens(self.summary, self.max_tokens // 2, keep_end=True)
+        budget = self.max_tokens - estimate_tokens(summary)
+        
+        # Newest messages first; turns still waiting to be folded are included if they fit
+        selected: List[BaseMessage] = []
+        for message in reversed(self.chat_memory.messages):
+            line = get_buffer_string([message], self.human_prefix, self.ai_prefix)
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            selected.append(message)
+            budget -= cost
+        selected.reverse()
+        
+        history = get_buffer_string(selected, self.human_prefix, self.ai_prefix)
+        if summary:
+            history = f"Summary of earlier conversation: {summary}\n{history}"
+        
+        return {self.memory_key: history}
+    
+    def needs_fold(self) -> bool:
+        """Check whether there are turns older than the verbatim window"""
+        return len(self.chat_memory.messages) > self.max_turns * 2
+    
+    def schedule_fold(self, llm: Any, user_id: Optional[int] = None) -> None:
+        """
+        Fold older turns into the summary in the background
+        
+        Args:
+            llm: Language model used for summarization
+            user_id: Owner of the conversation, for usage accounting
+        """
+        if self._folding or not self.needs_fold():
+            return
+        
+        self._folding = True
+        task = asyncio.create_task(self.fold(llm, user_id))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    
+    async def fold(self, llm: Any, user_id: Optional[int] = None) -> None:
+        """
+        Summarize the turns outside the verbatim window into the rolling summary
+        
+        Args:
+            llm: Language model used for summarization
+            user_id: Owner of the conversation, for usage accounting
+        """
+        try:
+            messages = self.chat_memory.messages
+            overflow = messages[:len(messages) - self.max_turns * 2]
+            if not overflow:
+                return
+            
+            response = await llm_gateway.ainvoke(
+                SUMMARY_PROMPT | llm,
+                {
+                    "summary": self.summary,
+                    "new_lines": get_buffer_string(overflow, self.human_prefix, self.ai_prefix)
+                },
+                priority=PRIORITY_BACKGROUND,
+                endpoint="chat_summary",
+                user_id=user_id
+            )
+            self.summary = str(getattr(response, "content", response)).strip()
+            
+            # Messages may have been appended or trimmed meanwhile, so remove by identity
+            folded = {id(message) for message in overflow}
+            self.chat_memory.messages = [
+                message for message in self.chat_memory.messages
+                if id(message) not in folded
+            ]
+        except Exception as e:
+            logger.error(f"Failed to fold conversation into summary: {str(e)}")
+        finally:
+            self._folding = False
\ No newline at end of file
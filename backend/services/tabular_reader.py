@@ -0,0 +1,324 @@
+"""
+Streaming spreadsheet and CSV reader with one-pass column statistics
+"""
+import math
+import os
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# Bump when the sheet descriptions change, so stored text is extracted again
+EXTRACTOR_VERSION = "tabular-1"
+
+# Distinct values tracked per text column before it is reported as high-cardinality
+MAX_TRACKED_VALUES = 50
+
+# CSV rows read per chunk, and rows sampled up front to infer column types
+CSV_CHUNK_ROWS = 50000
+CSV_SAMPLE_ROWS = 1000
+
+# Delimited text formats, by extension
+CSV_SEPARATORS = {".csv": ",", ".tsv": "\t"}
+
+class ColumnStats:
+    """Running aggregates for one column, updated a value at a time"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.numeric = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.total = 0.0
+        # Welford's running mean and sum of squared deviations
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._values: Dict[str, int] = {}
+        self.high_cardinality = False
+    
+    def update(self, value: Any) -> None:
+        """Fold one cell value into the aggregates"""
+        self.count += 1
+        if value is None or (isinstance(value, str) and not value.strip()):
+            self.nulls += 1
+            return
+        
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            number = float(value)
+            if math.isnan(number):
+                self.nulls += 1
+                return
+            
+            self.numeric += 1
+            self.total += number
+            self.minimum = number if self.minimum is None else min(self.minimum, number)
+            self.maximum = number if self.maximum is None else max(self.maximum, number)
+            delta = number - self._mean
+            self._mean += delta / self.numeric
+            self._m2 += delta * (number - self._mean)
+            return
+        
+        if self.high_cardinality:
+            return
+        
+        text = str(value).strip()
+        if text in self._values or len(self._values) < MAX_TRACKED_VALUES:
+            self._values[text] = self._values.get(text, 0) + 1
+        else:
+            self.high_cardinality = True
+            self._values.clear()
+    
+    @property
+    def is_numeric(self) -> bool:
+        """Most non-empty values are numbers"""
+        return self.numeric > 0 and self.numeric >= (self.count - self.nulls) / 2
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get the column statistics
+        
+        Returns:
+            Counts, plus min/max/mean/std/sum for numeric columns or the most
+            common values for text columns
+        """
+        result: Dict[str, Any] = {"name": self.name, "count": self.count - self.nulls, "nulls": self.nulls}
+        if self.is_numeric:
+            result.update({
+                "min": self.minimum,
+                "max": self.maximum,
+                "mean": round(self._mean, 4),
+                "std": round(math.sqrt(self._m2 / (self.numeric - 1)), 4) if self.numeric > 1 else 0.0,
+                "sum": round(self.total, 4)
+            })
+        elif self.high_cardinality:
+            result["distinct"] = f">{MAX_TRACKED_VALUES}"
+        else:
+            top = sorted(self._values.items(), key=lambda item: item[1], reverse=True)[:5]
+            result["distinct"] = len(self._values)
+            result["top_values"] = [value for value, _ in top]
+        
+        return result
+
+class SheetSummary:
+    """Header, head rows and column statistics of one sheet"""
+    
+    def __init__(self, name: str, columns: List[str], head_rows: int):
+        self.name = name
+        self.columns = columns
+        self.rows = 0
+        self.head: List[Tuple] = []
+        self.stats = [ColumnStats(column) for column in columns]
+        self._head_rows = head_rows
+    
+    def add_row(self, row: Tuple) -> None:
+        """Count a data row, keep it if it is among the first rows, and update the statistics"""
+        self.rows += 1
+        if len(self.head) < self._head_rows:
+            self.head.append(row)
+        for stats, value in zip(self.stats, row):
+            stats.update(value)
+    
+    def to_text(self) -> str:
+        """Describe the sheet for an analysis prompt"""
+        lines = [
+            f"Sheet '{self.name}' with {self.rows} rows and {len(self.columns)} columns.",
+            "Column names: " + ", ".join(self.columns),
+        ]
+        
+        if self.head:
+            lines.append(f"Sample data (first {len(self.head)} rows):")
+            lines.append(" | ".join(self.columns))
+            lines.extend(" | ".join(_format_cell(value) for value in row) for row in self.head)
+        
+        numeric = [stats.summary() for stats in self.stats if stats.is_numeric]
+        if numeric:
+            lines.append("Statistics for numeric columns:")
+            lines.extend(
+                f"{column['name']}: count {column['count']}, min {column['min']}, max {column['max']}, "
+                f"mean {column['mean']}, std {column['std']}, sum {column['sum']}"
+                for column in numeric
+            )
+        
+        text = [stats.summary() for stats in self.stats if not stats.is_numeric and stats.count > stats.nulls]
+        if text:
+            lines.append("Values of text columns:")
+            lines.extend(
+                f"{column['name']}: {column['distinct']} distinct"
+                + (f", most common {', '.join(column['top_values'])}" if column.get("top_values") else "")
+                for column in text
+            )
+        
+        return "\n".join(lines)
+
+def iter_sheets(file_path: str) -> Iterator[Tuple[str, Iterator[Tuple]]]:
+    """
+    Iterate the sheets of a workbook, with each sheet's rows read lazily
+    
+    .xlsx files are streamed with openpyxl in read-only mode, so only the
+    current row is in memory. CSV and TSV files are a single sheet read in
+    chunks. Legacy .xls files have no streaming reader and fall back to
+    pandas, one sheet at a time.
+    
+    Args:
+        file_path: Path to the workbook or delimited text file
+    
+    Yields:
+        Sheet name and an iterator of row value tuples
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in CSV_SEPARATORS:
+        yield os.path.basename(file_path), iter_csv_rows(file_path, CSV_SEPARATORS[extension])
+        return
+    
+    if extension == ".xls":
+        sheet_names = pd.ExcelFile(file_path).sheet_names
+        for sheet_name in sheet_names:
+            df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+            df = df.astype(object).where(df.notna(), None)
+            yield str(sheet_name), df.itertuples(index=False, name=None)
+        return
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            yield worksheet.title, worksheet.iter_rows(values_only=True)
+    finally:
+        # Read-only workbooks keep the file open until closed
+        workbook.close()
+
+def infer_csv_numeric_columns(file_path: str, separator: str = ",") -> List[str]:
+    """
+    Find the numeric columns of a CSV from a sample of its first rows
+    
+    Args:
+        file_path: Path to the CSV file
+        separator: Field separator
+    
+    Returns:
+        Names of the columns pandas parses as numbers in the sample
+    """
+    sample = pd.read_csv(
+        file_path,
+        sep=separator,
+        nrows=CSV_SAMPLE_ROWS,
+        encoding="utf-8-sig",
+        encoding_errors="replace"
+    )
+    return [str(column) for column in sample.select_dtypes(include=["number"]).columns]
+
+def iter_csv_rows(file_path: str, separator: str = ",") -> Iterator[Tuple]:
+    """
+    Read a CSV in chunks, yielding the header row and then each data row
+    
+    Column types are inferred once from a sample. Chunks are then read as
+    text and the sampled numeric columns converted, keeping the original
+    text of any value that does not parse, so a stray "N/A" far down the
+    file neither fails the read nor turns the column into strings.
+    
+    Args:
+        file_path: Path to the CSV file
+        separator: Field separator
+    
+    Yields:
+        Row value tuples, the header first; empty cells are None
+    """
+    numeric_columns = infer_csv_numeric_columns(file_path, separator)
+    chunks = pd.read_csv(
+        file_path,
+        sep=separator,
+        dtype=str,
+        chunksize=CSV_CHUNK_ROWS,
+        encoding="utf-8-sig",
+        encoding_errors="replace"
+    )
+    
+    header_sent = False
+    for chunk in chunks:
+        if not header_sent:
+            yield tuple(str(column) for column in chunk.columns)
+            header_sent = True
+        
+        for column in numeric_columns:
+            if column in chunk.columns:
+                converted = pd.to_numeric(chunk[column], errors="coerce")
+                chunk[column] = converted.astype(object).where(converted.notna(), chunk[column])
+        
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+def iter_records(file_path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Iterate the data rows of every sheet as dictionaries keyed by the header row
+    
+    Args:
+        file_path: Path to the workbook
+    
+    Yields:
+        Sheet name and row dictionary
+    """
+    for sheet_name, rows in iter_sheets(file_path):
+        columns = None
+        for row in rows:
+            if _is_empty(row):
+                continue
+            if columns is None:
+                columns = _header(row)
+                continue
+            yield sheet_name, dict(zip(columns, _pad(row, len(columns))))
+
+def summarize_workbook(file_path: str, head_rows: int = 5) -> List[SheetSummary]:
+    """
+    Read every sheet once, keeping head rows and running column statistics
+    
+    Memory stays bounded by the head rows and per-column aggregates, whatever
+    the number of rows.
+    
+    Args:
+        file_path: Path to the workbook
+        head_rows: Sample rows kept per sheet
+    
+    Returns:
+        One summary per non-empty sheet
+    """
+    summaries = []
+    for sheet_name, rows in iter_sheets(file_path):
+        summary = None
+        for row in rows:
+            if _is_empty(row):
+                continue
+            if summary is None:
+                summary = SheetSummary(sheet_name, _header(row), head_rows)
+                continue
+            summary.add_row(_pad(row, len(summary.columns)))
+        
+        if summary is not None:
+            summaries.append(summary)
+    
+    return summaries
+
+def _header(row: Tuple) -> List[str]:
+    """Column names from a header row, naming blank cells by position"""
+    columns = []
+    for index, value in enumerate(row):
+        name = str(value).strip() if value is not None else ""
+        columns.append(name or f"Column {index + 1}")
+    return columns
+
+def _pad(row: Tuple, width: int) -> Tuple:
+    """Fill in trailing empty cells, which read-only worksheets leave out"""
+    return row + (None,) * (width - len(row)) if len(row) < width else row
+
+def _is_empty(row: Tuple) -> bool:
+    return all(value is None or (isinstance(value, str) and not value.strip()) for value in row)
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime) and value.time() == datetime.min.time():
+        return value.date().isoformat()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
\ No newline at end of file
@@ -0,0 +1,267 @@
+"""
+Compressed on-disk store of extracted document text
+"""
+import glob
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# File layout: magic, index length, JSON index, then one zlib stream per segment
+MAGIC = b"FTXT1\n"
+_INDEX_LENGTH = struct.Struct(">I")
+
+class StoredText:
+    """
+    Extracted text of one document, read lazily from a memory-mapped file
+    
+    Only the index is parsed on open; a segment is decompressed when it is
+    asked for. Use as a context manager, or call close().
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise
+        
+        try:
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"Not an extracted text file: {path}")
+            
+            start = len(MAGIC)
+            (index_length,) = _INDEX_LENGTH.unpack_from(self._map, start)
+            start += _INDEX_LENGTH.size
+            index = json.loads(self._map[start:start + index_length].decode("utf-8"))
+        except Exception:
+            self.close()
+            raise
+        
+        self._data_offset = start + index_length
+        self.meta: Dict[str, Any] = index["meta"]
+        self.segments: List[Dict[str, Any]] = index["segments"]
+    
+    def names(self) -> List[str]:
+        """Segment names (page numbers or sheet names) in stored order"""
+        return [segment["name"] for segment in self.segments]
+    
+    def segment(self, position: int) -> str:
+        """Decompress one segment"""
+        segment = self.segments[position]
+        start = self._data_offset + segment["offset"]
+        return zlib.decompress(self._map[start:start + segment["length"]]).decode("utf-8")
+    
+    def iter_segments(self) -> Iterator[Tuple[str, str]]:
+        """Yield segment names and text, decompressing one at a time"""
+        for position, segment in enumerate(self.segments):
+            yield segment["name"], self.segment(position)
+    
+    def text(self, separator: str = "\n\n") -> str:
+        """All segments joined"""
+        return separator.join(text for _, text in self.iter_segments())
+    
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+    
+    def __enter__(self) -> "StoredText":
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+class TextStore:
+    """
+    Extracted text per document and extractor version, compressed on disk
+    
+    Re-analysis, search and indexing read text from here instead of parsing
+    the original upload again. Each entry is one file holding a JSON index
+    and a zlib stream per segment (a PDF page or a spreadsheet sheet), so
+    readers can memory-map it and decompress only the segments they need.
+    Bumping an extractor version makes old entries miss.
+    """
+    
+    def __init__(self, root: str, compression_level: int = 6):
+        """
+        Initialize the store
+        
+        Args:
+            root: Directory holding the entries
+            compression_level: zlib compression level (1-9)
+        """
+        self.root = root
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_raw = 0
+        self.bytes_stored = 0
+    
+    def save(
+        self,
+        document_id: int,
+        version: str,
+        segments: List[Tuple[str, str]],
+        meta: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Store the extracted text of a document, replacing any entry for the same version
+        
+        Args:
+            document_id: Document ID
+            version: Extractor version
+            segments: Segment names and text, in document order
+            meta: Extraction details stored alongside the text
+        """
+        index_segments = []
+        blobs = []
+        offset = 0
+        raw = 0
+        for name, text in segments:
+            data = text.encode("utf-8")
+            blob = zlib.compress(data, self.compression_level)
+            index_segments.append({"name": name, "offset": offset, "length": len(blob), "chars": len(text)})
+            blobs.append(blob)
+            offset += len(blob)
+            raw += len(data)
+        
+        index = json.dumps(
+            {"document_id": document_id, "version": version, "meta": meta or {}, "segments": index_segments}
+        ).encode("utf-8")
+        
+        path = self._path(document_id, version)
+        os.makedirs(self.root, exist_ok=True)
+        # Write next to the target and rename, so readers never see a partial file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(_INDEX_LENGTH.pack(len(index)))
+            f.write(index)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(temp_path, path)
+        
+        with self._lock:
+            self.bytes_raw += raw
+            self.bytes_stored += offset
+    
+    def open(self, document_id: int, version: str) -> Optional[StoredText]:
+        """
+        Open the stored text of a document
+        
+        Args:
+            document_id: Document ID
+            version: Extractor version
+        
+        Returns:
+            Stored text to read from (close it when done), or None if there is no entry
+        """
+        path = self._path(document_id, version)
+        try:
+            stored = StoredText(path)
+        except FileNotFoundError:
+            self._count(misses=1)
+            return None
+        except (ValueError, KeyError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable extracted text {path}: {str(e)}")
+            self._count(misses=1)
+            return None
+        
+        self._count(hits=1)
+        return stored
+    
+    def link(self, source_id: int, target_id: int, version: str) -> bool:
+        """
+        Give a document the stored text of another document with the same content
+        
+        Args:
+            source_id: Document whose text is stored
+            target_id: Document to share it with
+            version: Extractor version
+        
+        Returns:
+            True if the source had an entry to share
+        """
+        source = self._path(source_id, version)
+        target = self._path(target_id, version)
+        temp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            # A hard link costs no space, and deleting one document leaves the other's name in place
+            os.link(source, temp_path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            try:
+                shutil.copyfile(source, temp_path)
+            except FileNotFoundError:
+                return False
+        os.replace(temp_path, target)
+        return True
+    
+    def versions(self, document_id: int) -> List[str]:
+        """
+        List the extractor versions stored for a document
+        
+        Args:
+            document_id: Document ID
+        
+        Returns:
+            Stored versions
+        """
+        prefix = f"{document_id}."
+        return [
+            os.path.basename(path)[len(prefix):-len(".txtz")]
+            for path in glob.glob(os.path.join(glob.escape(self.root), f"{prefix}*.txtz"))
+        ]
+    
+    def delete(self, document_id: int) -> None:
+        """
+        Remove every stored version of a document
+        
+        Args:
+            document_id: Document ID
+        """
+        for version in self.versions(document_id):
+            try:
+                os.remove(self._path(document_id, version))
+            except FileNotFoundError:
+                pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get store statistics
+        
+        Returns:
+            Dictionary with hit/miss counters and bytes written before and after compression
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_raw": self.bytes_raw,
+                "bytes_stored": self.bytes_stored,
+                "compression_ratio": round(self.bytes_raw / self.bytes_stored, 2) if self.bytes_stored else 0.0
+            }
+    
+    def _path(self, document_id: int, version: str) -> str:
+        return os.path.join(self.root, f"{int(document_id)}.{version}.txtz")
+    
+    def _count(self, hits: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+# Shared extracted-text store
+text_store = TextStore(os.path.join(settings.DATA_DIR, "text"))
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Local token counting helpers for prompt budgeting
+"""
+import re
+
+# Words, numbers and individual punctuation marks, roughly how BPE tokenizers split text
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the number of LLM tokens in a text without a network tokenizer
+    
+    Short words and punctuation count as one token, longer words as one token
+    per four characters, which tracks Llama/GPT tokenizers closely enough for
+    budgeting.
+    
+    Args:
+        text: Text to measure
+    
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    
+    count = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        length = match.end() - match.start()
+        count += 1 if length <= 4 else (length + 3) // 4
+    
+    return count
+
+def truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """
+    Truncate a text to an approximate token budget on a whitespace boundary
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+        keep_end: Keep the end of the text instead of the beginning
+    
+    Returns:
+        Text that fits within the budget
+    """
+    if max_tokens <= 0:
+        return ""
+    
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    words = text.split(" ")
+    if keep_end:
+        words.reverse()
+    
+    kept = []
+    used = 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens:
+            break
+        kept.append(word)
+        used += cost
+    
+    if keep_end:
+        kept.reverse()
+    
+    return " ".join(kept)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Streaming upload writes with size enforcement and content hashing
+"""
+import asyncio
+import hashlib
+import os
+import threading
+from typing import Any, BinaryIO
+
+from backend.core.config import settings
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload grows past the size limit while it is being written"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"File too large (max {max_bytes / 1024 / 1024:.1f} MB)")
+
+class SavedUpload:
+    """An upload written to disk, with its size and SHA-256 digest"""
+    
+    def __init__(self, path: str, size: int, content_hash: str):
+        self.path = path
+        self.size = size
+        self.content_hash = content_hash
+
+async def save_upload(
+    upload: Any,
+    destination: str,
+    max_bytes: int = settings.MAX_UPLOAD_SIZE,
+    chunk_size: int = settings.UPLOAD_CHUNK_SIZE
+) -> SavedUpload:
+    """
+    Write an uploaded file to disk in a worker thread, checking its size and hashing it as it goes
+    
+    Args:
+        upload: Uploaded file (anything with a binary .file)
+        destination: Final path of the file
+        max_bytes: Size limit; 0 for no limit
+        chunk_size: Bytes copied per read
+    
+    Returns:
+        The saved upload
+    
+    Raises:
+        UploadTooLargeError: If the file is larger than max_bytes; nothing is left on disk
+    """
+    return await asyncio.to_thread(write_stream, upload.file, destination, max_bytes, chunk_size)
+
+def write_stream(
+    source: BinaryIO,
+    destination: str,
+    max_bytes: int = 0,
+    chunk_size: int = settings.UPLOAD_CHUNK_SIZE
+) -> SavedUpload:
+    """
+    Copy a stream to a file in fixed-size chunks, hashing it in the same pass
+    
+    The data goes to a temporary file next to the destination, which is
+    renamed into place only once it is complete, so a failed or oversized
+    upload never leaves a partial file under the final name. Memory use is
+    one chunk, whatever the size of the stream.
+    
+    Args:
+        source: Binary stream to read
+        destination: Final path of the file
+        max_bytes: Size limit; 0 for no limit
+        chunk_size: Bytes copied per read
+    
+    Returns:
+        The saved upload
+    
+    Raises:
+        UploadTooLargeError: If the stream is larger than max_bytes
+    """
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    temp_path = f"{destination}.{os.getpid()}.{threading.get_ident()}.tmp"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as f:
+            for chunk in iter(lambda: source.read(chunk_size), b""):
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return SavedUpload(destination, size, digest.hexdigest())
\ No newline at end of file
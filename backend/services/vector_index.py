@@ -0,0 +1,258 @@
+"""
+Local vector index over document chunks for retrieval-augmented chat
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from backend.core.config import settings
+from backend.services.content_budget import ContentBudgeter
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+class HashingEmbedder:
+    """
+    Embeds text as hashed word unigram and bigram counts, with no model or network
+    
+    Features are hashed into a fixed number of dimensions with a stable hash
+    (the same across processes, unlike hash()), with a hashed sign so
+    collisions tend to cancel. Counts are dampened with log(1 + tf) and
+    vectors are L2-normalized, so a dot product is the cosine similarity.
+    """
+    
+    def __init__(self, dimensions: int = 512):
+        """
+        Initialize the embedder
+        
+        Args:
+            dimensions: Vector size
+        """
+        self.dimensions = dimensions
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            float32 matrix with one normalized row per text
+        """
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [word.lower() for word in _WORD.findall(text)]
+            features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+            counts: Dict[int, float] = {}
+            for feature in features:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                index = digest % self.dimensions
+                sign = 1.0 if (digest >> 31) & 1 else -1.0
+                counts[index] = counts.get(index, 0.0) + sign
+            for index, count in counts.items():
+                vectors[row, index] = math.copysign(math.log1p(abs(count)), count)
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+class _UserIndex:
+    """One user's chunk vectors and the chunks they came from"""
+    
+    def __init__(self, vectors: np.ndarray, chunks: List[Dict[str, Any]]):
+        self.vectors = vectors
+        self.chunks = chunks
+
+class ChunkVectorIndex:
+    """
+    Per-user matrix of document chunk embeddings, searched by brute force
+    
+    Each user's chunks are embedded into a float32 NumPy matrix, so a query
+    is one matrix-vector product and a partial sort; at a few thousand
+    chunks per user that is well under a millisecond. Indexes are saved
+    under DATA_DIR/vectors (vectors as .npy, chunk text as JSON) and loaded
+    lazily, with the least recently used users dropped from memory.
+    """
+    
+    def __init__(
+        self,
+        root: str,
+        dimensions: int = 512,
+        chunk_tokens: int = 200,
+        max_users: int = 200,
+        min_score: float = 0.1
+    ):
+        """
+        Initialize the index
+        
+        Args:
+            root: Directory holding the per-user index files
+            dimensions: Embedding size
+            chunk_tokens: Token budget per document chunk
+            max_users: Users whose index is kept in memory
+            min_score: Minimum cosine similarity for a chunk to be returned
+        """
+        self.root = root
+        self.embedder = HashingEmbedder(dimensions)
+        self.chunk_tokens = chunk_tokens
+        self.max_users = max(1, max_users)
+        self.min_score = min_score
+        self._chunker = ContentBudgeter()
+        self._users: "OrderedDict[int, _UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.queries = 0
+    
+    def add_document(self, user_id: int, document_id: int, name: str, text: str) -> int:
+        """
+        Chunk, embed and index a document, replacing any chunks it already has
+        
+        Args:
+            user_id: Owner of the document
+            document_id: Document ID
+            name: Document name, shown with retrieved chunks
+            text: Extracted document text
+        
+        Returns:
+            Number of chunks indexed
+        """
+        chunks = [chunk for chunk in self._chunker.chunk(text, self.chunk_tokens) if chunk.strip()]
+        vectors = self.embedder.embed(chunks)
+        
+        with self._lock:
+            index = self._load(user_id)
+            keep = [position for position, chunk in enumerate(index.chunks) if chunk["document_id"] != document_id]
+            index.vectors = np.vstack([index.vectors[keep], vectors])
+            index.chunks = [index.chunks[position] for position in keep] + [
+                {"document_id": document_id, "name": name, "text": chunk} for chunk in chunks
+            ]
+            self._save(user_id, index)
+        
+        return len(chunks)
+    
+    def remove_document(self, user_id: int, document_id: int) -> None:
+        """
+        Remove a document's chunks
+        
+        Args:
+            user_id: Owner of the document
+            document_id: Document ID
+        """
+        with self._lock:
+            index = self._load(user_id)
+            keep = [position for position, chunk in enumerate(index.chunks) if chunk["document_id"] != document_id]
+            if len(keep) == len(index.chunks):
+                return
+            index.vectors = index.vectors[keep]
+            index.chunks = [index.chunks[position] for position in keep]
+            self._save(user_id, index)
+    
+    def search(self, user_id: int, query: str, k: int = 4) -> List[Dict[str, Any]]:
+        """
+        Find a user's document chunks most similar to a query
+        
+        Args:
+            user_id: User whose documents are searched
+            query: Query text
+            k: Maximum number of chunks
+        
+        Returns:
+            Chunks with document ID, name, text and score, best first
+        """
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock:
+            self.queries += 1
+            index = self._load(user_id)
+            if not index.chunks or not query_vector.any():
+                return []
+            
+            scores = index.vectors @ query_vector
+            k = min(k, len(scores))
+            # Partial sort: only the top k are ordered
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            
+            return [
+                dict(index.chunks[position], score=round(float(scores[position]), 4))
+                for position in top
+                if scores[position] >= self.min_score
+            ]
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get index statistics
+        
+        Returns:
+            Dictionary with users and chunks in memory and the query count
+        """
+        with self._lock:
+            return {
+                "users_loaded": len(self._users),
+                "chunks_loaded": sum(len(index.chunks) for index in self._users.values()),
+                "dimensions": self.embedder.dimensions,
+                "queries": self.queries
+            }
+    
+    def _load(self, user_id: int) -> _UserIndex:
+        """Get a user's index from memory or disk (callers hold the lock)"""
+        index = self._users.get(user_id)
+        if index is not None:
+            self._users.move_to_end(user_id)
+            return index
+        
+        vectors_path, chunks_path = self._paths(user_id)
+        vectors = np.zeros((0, self.embedder.dimensions), dtype=np.float32)
+        chunks: List[Dict[str, Any]] = []
+        if os.path.exists(chunks_path):
+            try:
+                loaded = np.load(vectors_path)
+                with open(chunks_path, "r", encoding="utf-8") as f:
+                    loaded_chunks = json.load(f)
+                if loaded.shape == (len(loaded_chunks), self.embedder.dimensions):
+                    vectors, chunks = loaded, loaded_chunks
+                else:
+                    logger.warning(f"Discarding mismatched vector index for user {user_id}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discarding unreadable vector index for user {user_id}: {str(e)}")
+        
+        index = _UserIndex(vectors, chunks)
+        self._users[user_id] = index
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        
+        return index
+    
+    def _save(self, user_id: int, index: _UserIndex) -> None:
+        """Write a user's index, renaming into place so readers never see a partial file"""
+        os.makedirs(self.root, exist_ok=True)
+        vectors_path, chunks_path = self._paths(user_id)
+        
+        with open(f"{vectors_path}.tmp", "wb") as f:
+            np.save(f, index.vectors)
+        os.replace(f"{vectors_path}.tmp", vectors_path)
+        
+        with open(f"{chunks_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index.chunks, f)
+        os.replace(f"{chunks_path}.tmp", chunks_path)
+    
+    def _paths(self, user_id: int) -> Tuple[str, str]:
+        base = os.path.join(self.root, str(int(user_id)))
+        return f"{base}.npy", f"{base}.json"
+
+# Shared document chunk index
+vector_index = ChunkVectorIndex(
+    os.path.join(settings.DATA_DIR, "vectors"),
+    dimensions=settings.VECTOR_DIMENSIONS,
+    chunk_tokens=settings.VECTOR_CHUNK_TOKENS,
+    max_users=settings.VECTOR_INDEX_MAX_USERS,
+    min_score=settings.VECTOR_MIN_SCORE
+)
\ No newline at end of file
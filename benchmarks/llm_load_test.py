@@ -0,0 +1,128 @@
+"""
+Load test for the LLM request path using the local stub backend
+
+Runs concurrent insight, chat and document analysis calls through the real
+services (cache, single-flight, gateway) with LLM_BACKEND=stub, and reports
+latency percentiles per operation.
+
+Usage:
+    python benchmarks/llm_load_test.py --requests 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Configure the stub backend and throwaway stores before the settings are loaded
+_data_dir = tempfile.mkdtemp(prefix="llm_load_test_")
+os.environ["LLM_BACKEND"] = "stub"
+os.environ.setdefault("DATA_DIR", _data_dir)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_data_dir}/load_test.db")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database import SessionLocal, init_db
+from backend.models.user import User
+from backend.services.ai_service import ai_service
+from backend.services.chat_history_service import chat_history_service
+from backend.services.document_service import document_service
+from backend.services.llm_gateway import LLMOverloadedError, llm_gateway
+
+QUESTIONS = [
+    "How should I plan my taxes this year?",
+    "Is it a good time to invest in mid-cap funds?",
+    "How much emergency fund should I keep?",
+    "Should I prepay my home loan or invest in equity?",
+]
+
+async def _insight(user_id: int) -> None:
+    await ai_service.get_financial_insight(user_id)
+
+async def _chat(user_id: int) -> None:
+    await ai_service.chat_with_ai(random.choice(QUESTIONS), user_id=user_id)
+
+async def _document(user_id: int) -> None:
+    content = f"Statement for account {user_id}\nOpening balance: 1,20,000\nClosing balance: 1,45,500"
+    await document_service._analyze_with_ai(content)
+
+OPERATIONS = {
+    "insight": _insight,
+    "chat": _chat,
+    "document": _document,
+}
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return sorted(values)[index]
+
+async def run(requests: int, concurrency: int, users: int) -> None:
+    """
+    Fire requests at a fixed concurrency and print latency percentiles
+    
+    Args:
+        requests: Total number of requests
+        concurrency: Maximum number of requests in flight
+        users: Number of distinct user IDs to spread requests over
+    """
+    init_db()
+    db = SessionLocal()
+    user_ids = []
+    for i in range(users):
+        user = User(username=f"load_test_{i}", password="x")
+        db.add(user)
+        db.commit()
+        user_ids.append(user.id)
+    db.close()
+    chat_history_service.start()
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: Dict[str, List[float]] = {name: [] for name in OPERATIONS}
+    overloaded = 0
+    
+    async def one(i: int) -> None:
+        nonlocal overloaded
+        name = random.choice(list(OPERATIONS))
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await OPERATIONS[name](user_ids[i % users])
+            except LLMOverloadedError:
+                overloaded += 1
+                return
+            latencies[name].append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    await chat_history_service.stop()
+    
+    print(f"{requests} requests in {elapsed:.2f}s ({requests / elapsed:.1f} req/s), {overloaded} overloaded")
+    print(f"{'operation':<10} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, values in latencies.items():
+        print(
+            f"{name:<10} {len(values):>6} "
+            f"{_percentile(values, 0.50) * 1000:>9.1f} "
+            f"{_percentile(values, 0.95) * 1000:>9.1f} "
+            f"{_percentile(values, 0.99) * 1000:>9.1f}"
+        )
+    
+    gateway = llm_gateway.stats()
+    print(f"gateway: admitted={gateway['admitted']} rejected={gateway['rejected']} wait_ms={gateway['wait_ms']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the LLM request path with the stub backend")
+    parser.add_argument("--requests", type=int, default=200, help="Total number of requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+    parser.add_argument("--users", type=int, default=20, help="Distinct user IDs")
+    args = parser.parse_args()
+    
+    asyncio.run(run(args.requests, args.concurrency, args.users))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Event-loop lag during concurrent PDF extraction, inline versus process pool
+
+Generates a text-heavy PDF (or uses one given on the command line), then
+extracts it concurrently the old way (pypdf called directly inside the
+coroutine) and through the process-pool extractor. A ticker task measures how
+late the event loop wakes it up while the extractions run.
+
+Usage:
+    python benchmarks/pdf_event_loop_lag.py --pages 60 --concurrency 4
+    python benchmarks/pdf_event_loop_lag.py --file statement.pdf
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.pdf_extraction import PDFExtractor, extract_pdf_text
+
+TICK_SECONDS = 0.01
+
+def write_sample_pdf(path: str, pages: int, lines_per_page: int = 60) -> None:
+    """Write a minimal multi-page PDF with a statement-like text layer"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_numbers = []
+    for page in range(pages):
+        lines = [
+            f"({page + 1:03d}/{line:02d}  UPI/NEFT TRANSFER REF {page * 1000 + line:08d}  "
+            f"DEBIT {line * 137 % 9000 + 100}.00  BALANCE {page * 5000 + line * 91}.50) Tj 0 -12 Td"
+            for line in range(lines_per_page)
+        ]
+        stream = ("BT /F1 9 Tf 36 770 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_number = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_number
+        )
+        page_numbers.append(len(objects))
+    
+    kids = b" ".join(b"%d 0 R" % number for number in page_numbers)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+    
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    
+    with open(path, "wb") as f:
+        f.write(output)
+
+async def measure_lag(work) -> List[float]:
+    """Run work while a ticker records how late each wake-up is"""
+    lags: List[float] = []
+    done = False
+    
+    async def ticker():
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(time.perf_counter() - started - TICK_SECONDS)
+    
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK_SECONDS)
+    try:
+        await work()
+    finally:
+        done = True
+        await task
+    
+    return lags
+
+def report(label: str, lags: List[float], elapsed: float) -> None:
+    lags = sorted(lags)
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0
+    worst = lags[-1] if lags else 0.0
+    print(f"{label:<14} elapsed {elapsed:6.2f}s  loop lag p99 {p99 * 1000:8.1f} ms  max {worst * 1000:8.1f} ms")
+
+async def run(file_path: str, concurrency: int) -> None:
+    async def inline_extraction():
+        # What _extract_pdf_content used to do: parse on the event loop
+        async def one():
+            extract_pdf_text(file_path, 0)
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+    
+    extractor = PDFExtractor(max_workers=concurrency, timeout=300, max_pages=0)
+    
+    async def pooled_extraction():
+        await asyncio.gather(*(extractor.extract(file_path) for _ in range(concurrency)))
+    
+    # Warm the pool so process start-up is not counted
+    await extractor.extract(file_path)
+    
+    for label, work in (("inline", inline_extraction), ("process pool", pooled_extraction)):
+        started = time.perf_counter()
+        lags = await measure_lag(work)
+        report(label, lags, time.perf_counter() - started)
+    
+    extractor.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event-loop lag during PDF extraction")
+    parser.add_argument("--file", help="PDF to extract (a sample is generated if omitted)")
+    parser.add_argument("--pages", type=int, default=60, help="Pages in the generated sample")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent extractions")
+    args = parser.parse_args()
+    
+    file_path = args.file
+    if file_path is None:
+        file_path = os.path.join(tempfile.mkdtemp(prefix="pdf_lag_"), "sample.pdf")
+        write_sample_pdf(file_path, args.pages)
+    
+    asyncio.run(run(file_path, args.concurrency))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
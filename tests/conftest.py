@@ -0,0 +1,84 @@
+"""
+Shared fixtures: a throwaway database and data directories, the stub LLM backend and an authenticated client
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+# Settings are read at import time, so the environment is set before any backend module loads
+_DATA = tempfile.mkdtemp(prefix="latest-ai-fin-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_DATA}/test.db",
+    UPLOAD_DIR=os.path.join(_DATA, "uploads"),
+    DATA_DIR=os.path.join(_DATA, "data"),
+    LLM_BACKEND="stub",
+    LLM_STUB_LATENCY="fixed",
+    LLM_STUB_LATENCY_MS="1",
+    LLM_STUB_TOKENS_PER_SECOND="100000",
+    MAX_UPLOAD_SIZE=str(256 * 1024),
+    ADMIN_USERNAMES="tester"
+)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from fastapi.testclient import TestClient
+
+from api.dependencies import get_current_user
+from api.main import app
+from backend.database import SessionLocal, init_db
+from backend.models.user import User
+
+@pytest.fixture(scope="session")
+def data_dir() -> str:
+    return _DATA
+
+@pytest.fixture(scope="session")
+def user_id() -> int:
+    init_db()
+    db = SessionLocal()
+    try:
+        user = User(username="tester", password="x")
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+@pytest.fixture(scope="session")
+def client(user_id: int):
+    def current_user():
+        db = SessionLocal()
+        try:
+            user = db.get(User, user_id)
+            db.expunge(user)
+            return user
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_current_user] = current_user
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+def wait_for_analysis(client: TestClient, document_id: int, timeout: float = 10) -> dict:
+    """Poll a document until its analysis is no longer pending"""
+    deadline = time.monotonic() + timeout
+    while True:
+        document = client.get(f"/api/documents/{document_id}").json()
+        if document["analysis_status"] != "pending" or time.monotonic() > deadline:
+            return document
+        time.sleep(0.05)
+
+def wait_for_jobs(timeout: float = 10) -> None:
+    """Wait until the background job queue has nothing queued or running"""
+    from backend.services.job_queue import JOB_QUEUED, JOB_RUNNING, job_queue
+    
+    deadline = time.monotonic() + timeout
+    while True:
+        jobs = job_queue.stats()["jobs"]
+        if not jobs.get(JOB_QUEUED) and not jobs.get(JOB_RUNNING):
+            return
+        assert time.monotonic() < deadline, f"jobs still pending: {jobs}"
+        time.sleep(0.05)
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""
+Admin statistics endpoints
+"""
+
+def test_document_extraction_stats(client):
+    stats = client.get("/api/admin/documents/extraction").json()
+    
+    assert {"extracted", "timed_out", "pages_extracted"} <= set(stats["pdf"])
+    assert {"hits", "misses", "compression_ratio"} <= set(stats["text_store"])
+
+def test_document_search_stats(client):
+    stats = client.get("/api/admin/documents/search").json()
+    
+    assert "documents" in stats["full_text"]
+    assert {"users_loaded", "chunks_loaded", "queries"} <= set(stats["vectors"])
+
+def test_ai_stats_are_admin_only(client):
+    assert client.get("/api/ai/stats").status_code == 404
+    
+    stats = client.get("/api/admin/ai").json()
+    assert {"insight_cache", "gateway", "chat_memory"} <= set(stats)
+
+def test_admin_stats_require_an_admin(client, monkeypatch):
+    monkeypatch.setattr("backend.core.config.settings.ADMIN_USERNAMES", "someone-else")
+    
+    assert client.get("/api/admin/ai").status_code == 403
\ No newline at end of file
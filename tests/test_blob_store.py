@@ -0,0 +1,82 @@
+"""
+Content-addressed upload storage: reference counting and garbage collection
+"""
+import os
+import uuid
+
+from backend.database import SessionLocal
+from backend.models.blob import Blob
+from backend.models.document import Document
+from backend.services.blob_store import blob_store
+
+def upload(client, content: bytes) -> int:
+    response = client.post("/api/documents", files={"file": ("holdings.csv", content, "text/csv")})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def blob_for(document_id: int) -> Blob:
+    db = SessionLocal()
+    try:
+        path = db.get(Document, document_id).path
+        blob = db.get(Blob, blob_store._key(path))
+        db.expunge(blob)
+        return blob
+    finally:
+        db.close()
+
+def blob_row(key: str):
+    db = SessionLocal()
+    try:
+        return db.get(Blob, key)
+    finally:
+        db.close()
+
+def test_identical_uploads_share_one_counted_blob(client, monkeypatch):
+    content = f"ticker,quantity\n{uuid.uuid4().hex},1\n".encode("utf-8")
+    first, second = upload(client, content), upload(client, content)
+    
+    blob = blob_for(first)
+    path = blob_store._path(blob.key)
+    assert blob_for(second).key == blob.key
+    assert blob.ref_count == 2
+    
+    client.delete(f"/api/documents/{first}")
+    assert blob_row(blob.key).ref_count == 1
+    assert os.path.exists(path)
+    
+    # The last reference goes, but the file is kept through the grace period
+    client.delete(f"/api/documents/{second}")
+    released = blob_row(blob.key)
+    assert released.ref_count == 0 and released.released_at is not None
+    assert os.path.exists(path)
+    
+    monkeypatch.setattr(blob_store, "grace_seconds", 0)
+    blob_store.collect(256)
+    assert blob_row(blob.key) is None
+    assert not os.path.exists(path)
+
+def test_collector_fixes_counts_and_removes_orphans(client, monkeypatch):
+    document_id = upload(client, f"ticker,quantity\n{uuid.uuid4().hex},1\n".encode("utf-8"))
+    key = blob_for(document_id).key
+    
+    # A count left wrong by a crash, a file with no row and an abandoned partial upload
+    db = SessionLocal()
+    try:
+        db.query(Blob).filter(Blob.key == key).update({Blob.ref_count: 5})
+        db.commit()
+    finally:
+        db.close()
+    orphan = blob_store.path_for(uuid.uuid4().hex * 2, ".pdf")
+    os.makedirs(os.path.dirname(orphan), exist_ok=True)
+    open(orphan, "wb").close()
+    incoming = os.path.join(blob_store.root, "incoming", uuid.uuid4().hex)
+    os.makedirs(os.path.dirname(incoming), exist_ok=True)
+    open(incoming, "wb").close()
+    
+    monkeypatch.setattr(blob_store, "grace_seconds", 0)
+    blob_store.collect(256)
+    
+    assert blob_row(key).ref_count == 1
+    assert os.path.exists(blob_store._path(key))
+    assert not os.path.exists(orphan)
+    assert not os.path.exists(incoming)
\ No newline at end of file
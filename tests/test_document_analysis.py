@@ -0,0 +1,79 @@
+"""
+Background document analysis
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from conftest import wait_for_analysis
+
+from backend.database import SessionLocal
+from backend.models.document import Document
+from backend.services.document_service import document_service
+from backend.services.llm_gateway import LLMOverloadedError, llm_gateway
+from backend.services.llm_metrics import llm_metrics
+
+def test_analysis_calls_are_charged_to_the_owner(client, user_id):
+    content = f"ticker,quantity\n{uuid.uuid4().hex},10\n".encode("utf-8")
+    response = client.post("/api/documents", files={"file": ("holdings.csv", content, "text/csv")})
+    assert response.status_code == 200, response.text
+    assert wait_for_analysis(client, response.json()["id"])["analysis_status"] == "completed"
+    
+    calls = [call for call in llm_metrics.recent_calls() if call["endpoint"].startswith("document_")]
+    assert calls
+    assert all(call["user_id"] == user_id for call in calls)
+
+def test_analysis_records_prompt_budgeting(client):
+    content = f"ticker,quantity\n{uuid.uuid4().hex},10\n".encode("utf-8")
+    document_id = client.post("/api/documents", files={"file": ("holdings.csv", content, "text/csv")}).json()["id"]
+    assert wait_for_analysis(client, document_id)["analysis_status"] == "completed"
+    
+    db = SessionLocal()
+    try:
+        budget = db.get(Document, document_id).analysis["budget"]
+    finally:
+        db.close()
+    assert budget["truncated"] is False
+    assert 0 < budget["prompt_tokens"] == budget["source_tokens"]
+
+def long_document(paragraphs: int = 200) -> str:
+    return "\n\n".join(
+        f"Statement line {n}: opening balance {n * 1000}.00, dividend credited {n * 7}.50, closing balance {n * 1001}.00."
+        for n in range(paragraphs)
+    )
+
+def test_map_reduce_cancels_other_chunks_when_one_is_overloaded(monkeypatch):
+    started = 0
+    cancelled = 0
+    
+    async def ainvoke(runnable, inputs, priority=None, endpoint="unknown", user_id=None):
+        nonlocal started, cancelled
+        started += 1
+        if inputs.get("part") == 1:
+            await asyncio.sleep(0.01)
+            raise LLMOverloadedError(retry_after=5)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled += 1
+            raise
+    
+    monkeypatch.setattr(llm_gateway, "ainvoke", ainvoke)
+    
+    async def analyze() -> int:
+        with pytest.raises(LLMOverloadedError):
+            await document_service._map_reduce(long_document())
+        # Counted before the event loop shuts down, which would cancel leftovers anyway
+        return cancelled
+    
+    assert asyncio.run(asyncio.wait_for(analyze(), 5)) == started - 1
+    assert started > 1
+
+def test_single_chunk_map_reduce_records_budget(monkeypatch):
+    monkeypatch.setattr(document_service, "mode", "map_reduce")
+    
+    analysis = asyncio.run(document_service._analyze_with_ai(long_document(3)))
+    
+    assert "map_reduce" not in analysis
+    assert analysis["budget"]["truncated"] is False
\ No newline at end of file
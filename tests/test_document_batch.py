@@ -0,0 +1,38 @@
+"""
+Batch uploads
+"""
+import uuid
+
+from conftest import wait_for_analysis, wait_for_jobs
+
+def csv_file(name: str, content: bytes):
+    return ("files", (name, content, "text/csv"))
+
+def test_batch_pairs_documents_with_their_uploads(client):
+    tickers = [uuid.uuid4().hex for _ in range(4)]
+    contents = [f"ticker,quantity\n{ticker},{n}\n".encode("utf-8") for n, ticker in enumerate(tickers)]
+    
+    # Analyze the last file first, so the batch mixes cache hits and queued analyses
+    first = client.post("/api/documents/batch", files=[csv_file("cached.csv", contents[-1])]).json()
+    assert wait_for_analysis(client, first["documents"][0]["id"])["analysis_status"] == "completed"
+    
+    names = [f"file{n}.csv" for n in range(len(contents))]
+    batch = client.post(
+        "/api/documents/batch",
+        files=[csv_file(name, content) for name, content in zip(names, contents)] + [
+            ("files", ("notes.doc", b"hello", "application/msword"))
+        ]
+    ).json()
+    
+    assert [document["name"] for document in batch["documents"]] == names
+    assert batch["documents"][-1]["analysis_status"] == "completed"
+    assert [entry["name"] for entry in batch["rejected"]] == ["notes.doc"]
+    
+    # Each document was analyzed and indexed from its own upload
+    wait_for_jobs()
+    status = client.get(f"/api/documents/batch/{batch['batch_id']}").json()
+    assert status["completed"] == len(names)
+    batch_ids = {document["id"] for document in batch["documents"]}
+    for document, ticker in zip(batch["documents"], tickers):
+        results = client.get("/api/documents/search", params={"q": ticker}).json()["results"]
+        assert {result["document_id"] for result in results} & batch_ids == {document["id"]}
\ No newline at end of file
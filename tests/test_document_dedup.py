@@ -0,0 +1,76 @@
+"""
+Uploads of content that is already stored reuse its analysis and must still be searchable
+"""
+from conftest import wait_for_analysis, wait_for_jobs
+
+from backend.database import SessionLocal
+from backend.models.document import Document
+from backend.services.document_service import PDF_EXTRACTOR_VERSION
+from backend.services.text_store import text_store
+from backend.services.vector_index import vector_index
+
+def upload(client, name: str, path: str) -> dict:
+    with open(path, "rb") as f:
+        response = client.post("/api/documents", files={"file": (name, f, "application/pdf")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_duplicate_upload_is_searchable_by_content(client, data_dir):
+    from pdf_event_loop_lag import write_sample_pdf
+    
+    path = f"{data_dir}/dedup-search.pdf"
+    write_sample_pdf(path, 2)
+    
+    first = upload(client, "first.pdf", path)
+    assert wait_for_analysis(client, first["id"])["analysis_status"] == "completed"
+    
+    # Same bytes: the stored analysis is reused and nothing is extracted for the new document
+    second = upload(client, "second.pdf", path)
+    wait_for_jobs()
+    assert second["analysis_status"] == "completed"
+    db = SessionLocal()
+    try:
+        assert db.get(Document, second["id"]).path == db.get(Document, first["id"]).path
+    finally:
+        db.close()
+    assert PDF_EXTRACTOR_VERSION in text_store.versions(second["id"])
+    
+    results = client.get("/api/documents/search", params={"q": "NEFT"}).json()["results"]
+    assert {first["id"], second["id"]} <= {result["document_id"] for result in results}
+
+def test_duplicate_upload_is_retrievable_for_chat(client, data_dir, user_id):
+    from pdf_event_loop_lag import write_sample_pdf
+    
+    path = f"{data_dir}/dedup-vectors.pdf"
+    write_sample_pdf(path, 3)
+    
+    first = upload(client, "first.pdf", path)
+    assert wait_for_analysis(client, first["id"])["analysis_status"] == "completed"
+    second = upload(client, "second.pdf", path)
+    wait_for_jobs()
+    
+    # Remove the original, so only the deduplicated upload can match
+    client.delete(f"/api/documents/{first['id']}")
+    hits = vector_index.search(user_id, "NEFT transfer debit balance", 10000)
+    document_ids = {hit["document_id"] for hit in hits}
+    assert second["id"] in document_ids
+    assert first["id"] not in document_ids
+
+def test_reupload_after_delete_is_extracted_in_the_background(client, data_dir):
+    from pdf_event_loop_lag import write_sample_pdf
+    
+    path = f"{data_dir}/dedup-reupload.pdf"
+    write_sample_pdf(path, 2)
+    
+    first = upload(client, "first.pdf", path)
+    assert wait_for_analysis(client, first["id"])["analysis_status"] == "completed"
+    client.delete(f"/api/documents/{first['id']}")
+    
+    # The analysis is still cached but no document has the text any more
+    second = upload(client, "second.pdf", path)
+    assert second["analysis_status"] == "completed"
+    wait_for_jobs()
+    
+    assert PDF_EXTRACTOR_VERSION in text_store.versions(second["id"])
+    results = client.get("/api/documents/search", params={"q": "NEFT"}).json()["results"]
+    assert second["id"] in {result["document_id"] for result in results}
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+SQLite job queue: claiming under concurrency limits, leases and retention
+"""
+import asyncio
+
+import pytest
+
+from backend.services.job_queue import JOB_DONE, JOB_QUEUED, JOB_RUNNING, JobQueue
+
+@pytest.fixture
+def queue(tmp_path) -> JobQueue:
+    return JobQueue(str(tmp_path / "jobs.db"), workers=4, poll_interval=0.05)
+
+def test_claim_respects_concurrency_limit(queue):
+    first, second = queue.enqueue_many("work", [{"n": 1}, {"n": 2}], concurrency_key="user:1", concurrency_limit=1)
+    other = queue.enqueue("work", {"n": 3}, concurrency_key="user:2", concurrency_limit=1)
+    
+    assert queue._claim()["id"] == first
+    # user:1 is at its limit, so the next claim skips its queued job
+    assert queue._claim()["id"] == other
+    assert queue._claim() is None
+    
+    queue._update(first, status=JOB_DONE)
+    assert queue._claim()["id"] == second
+
+@pytest.mark.parametrize("limit", [None, 0, -1])
+def test_claim_treats_missing_or_non_positive_limit_as_unlimited(queue, limit):
+    job_ids = queue.enqueue_many("work", [{"n": 1}, {"n": 2}], concurrency_key="user:1", concurrency_limit=limit)
+    
+    assert [queue._claim()["id"], queue._claim()["id"]] == job_ids
+
+def test_workers_never_exceed_the_limit(queue):
+    running = 0
+    peak = 0
+    
+    async def handler(payload):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+    
+    async def main():
+        queue.register("work", handler)
+        queue.start()
+        job_ids = queue.enqueue_many("work", [{"n": n} for n in range(8)], concurrency_key="user:1", concurrency_limit=2)
+        try:
+            while any(queue.get(job_id)["status"] != JOB_DONE for job_id in job_ids):
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+    
+    asyncio.run(asyncio.wait_for(main(), 10))
+    assert peak == 2
+
+def test_only_expired_leases_are_requeued(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    crashed = JobQueue(path, lease_seconds=30)
+    alive = JobQueue(path, lease_seconds=30)
+    restarted = JobQueue(path, lease_seconds=30)
+    
+    stale, fresh = crashed.enqueue_many("work", [{"n": 1}, {"n": 2}])
+    assert crashed._claim()["id"] == stale
+    assert alive._claim()["id"] == fresh
+    # The crashed process stopped renewing its lease a while ago
+    crashed.backdate(stale, 60)
+    
+    restarted.maintain()
+    
+    assert restarted.get(stale)["status"] == JOB_QUEUED
+    assert restarted.get(fresh)["status"] == JOB_RUNNING
+    assert restarted.requeued == 1
+
+def test_heartbeat_renews_own_leases(queue):
+    job_id = queue.enqueue("work", {})
+    queue._claim()
+    queue.backdate(job_id, queue.lease_seconds * 2)
+    
+    queue.maintain()
+    JobQueue(queue.db_path, lease_seconds=queue.lease_seconds).maintain()
+    
+    assert queue.get(job_id)["status"] == JOB_RUNNING
+
+def test_finished_jobs_are_purged_after_retention(queue):
+    old, recent = queue.enqueue_many("work", [{"n": 1}, {"n": 2}])
+    queue._update(old, status=JOB_DONE)
+    queue._update(recent, status=JOB_DONE)
+    queue.backdate(old, queue.retention_seconds + 1)
+    
+    queue.maintain()
+    
+    assert queue.get(old) is None
+    assert queue.get(recent)["status"] == JOB_DONE
\ No newline at end of file
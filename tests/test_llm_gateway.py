@@ -0,0 +1,251 @@
+"""
+LLM gateway admission, circuit breaking, hedged retries, request coalescing and the response cache
+"""
+import asyncio
+import time
+
+import pytest
+
+from backend.services.llm_cache import LLMResponseCache, insight_cache
+from backend.services.llm_gateway import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    LLMGateway,
+    LLMOverloadedError,
+    llm_gateway,
+)
+from backend.services.llm_resilience import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+)
+from backend.services.single_flight import SingleFlight
+
+class FailingRunnable:
+    """Stands in for a prompt | llm runnable whose provider is down"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        raise ConnectionError("provider unavailable")
+
+def test_interactive_calls_are_admitted_before_background_calls():
+    gateway = LLMGateway(max_in_flight=1)
+    admitted = []
+    
+    async def call(name, priority):
+        async with gateway.slot(priority):
+            admitted.append(name)
+    
+    async def main():
+        async with gateway.slot():
+            # Both wait for the held slot; the background call queued first
+            background = asyncio.create_task(call("background", PRIORITY_BACKGROUND))
+            await asyncio.sleep(0)
+            interactive = asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE))
+            await asyncio.sleep(0)
+        await asyncio.gather(background, interactive)
+    
+    asyncio.run(main())
+    assert admitted == ["interactive", "background"]
+
+def test_full_queue_is_rejected_with_a_retry_after():
+    gateway = LLMGateway(max_in_flight=1, max_queue=0)
+    
+    async def main():
+        async with gateway.slot():
+            with pytest.raises(LLMOverloadedError) as error:
+                async with gateway.slot():
+                    pass
+        return error.value
+    
+    assert asyncio.run(main()).retry_after >= 1
+    assert gateway.stats()["rejected"] == 1
+
+def test_overloaded_gateway_returns_429_with_retry_after(client, monkeypatch):
+    async def overloaded(*args, **kwargs):
+        raise LLMOverloadedError(7)
+    
+    monkeypatch.setattr(llm_gateway, "ainvoke", overloaded)
+    monkeypatch.setattr(insight_cache, "get", lambda key: None)
+    
+    response = client.get("/api/ai/insights")
+    
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(error_threshold=0.5, min_calls=4, cooldown_seconds=0.05)
+    for _ in range(2):
+        breaker.record_success()
+        breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    
+    # After the cooldown a single probe goes through; a failed probe reopens
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == STATE_HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.stats()["times_opened"] == 2
+
+def test_breaker_stays_closed_below_min_calls():
+    breaker = CircuitBreaker(error_threshold=0.5, min_calls=4)
+    for _ in range(3):
+        breaker.record_failure()
+    
+    assert breaker.state == STATE_CLOSED
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = CircuitBreaker(min_calls=1, cooldown_seconds=0)
+    breaker.record_failure()
+    
+    breaker.before_call()
+    # The probe was rejected by the gateway queue before reaching the provider
+    breaker.release_probe()
+    breaker.before_call()
+    
+    assert breaker.state == STATE_HALF_OPEN
+
+def test_gateway_short_circuits_once_the_breaker_opens():
+    gateway = LLMGateway(
+        retry_policy=RetryPolicy(max_retries=0),
+        breaker=CircuitBreaker(min_calls=2, cooldown_seconds=60)
+    )
+    runnable = FailingRunnable()
+    
+    async def main():
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await gateway.ainvoke(runnable, {})
+        with pytest.raises(CircuitOpenError):
+            await gateway.ainvoke(runnable, {})
+    
+    asyncio.run(main())
+    assert runnable.calls == 2
+    assert gateway.stats()["in_flight"] == 0
+
+def test_gateway_retries_failed_calls():
+    gateway = LLMGateway(retry_policy=RetryPolicy(max_retries=2, backoff=0), breaker=CircuitBreaker(min_calls=10))
+    runnable = FailingRunnable()
+    
+    with pytest.raises(ConnectionError):
+        asyncio.run(gateway.ainvoke(runnable, {}))
+    
+    assert runnable.calls == 3
+    assert gateway.retry_policy.retries == 2
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    policy = RetryPolicy(hedge_after=0.01)
+    cancelled = []
+    released = []
+    calls = 0
+    
+    async def call():
+        nonlocal calls
+        calls += 1
+        name = "primary" if calls == 1 else "hedge"
+        try:
+            await asyncio.sleep(1.0 if name == "primary" else 0.0)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        return name
+    
+    async def main():
+        result = await policy.attempt(call, can_hedge=lambda: lambda: released.append(True))
+        # Let the cancelled primary unwind before the loop closes
+        await asyncio.sleep(0)
+        return result
+    
+    assert asyncio.run(main()) == "hedge"
+    assert cancelled == ["primary"]
+    assert released == [True]
+    assert policy.stats()["hedges"] == 1
+    assert policy.stats()["hedge_wins"] == 1
+
+def test_call_is_not_hedged_without_spare_capacity():
+    policy = RetryPolicy(hedge_after=0.01)
+    calls = 0
+    
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.03)
+        return "primary"
+    
+    assert asyncio.run(policy.attempt(call, can_hedge=lambda: None)) == "primary"
+    assert calls == 1
+    assert policy.hedges == 0
+
+def test_concurrent_identical_calls_share_one_request():
+    flight = SingleFlight()
+    calls = 0
+    
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"message": "shared"}
+    
+    async def main():
+        return await asyncio.gather(*(flight.do("key", call) for _ in range(3)))
+    
+    results = asyncio.run(main())
+    assert calls == 1
+    assert results == [{"message": "shared"}] * 3
+    # Followers get copies, so one caller's edits do not leak to another
+    assert results[1] is not results[2]
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 2, "coalesced_rate": 0.6667}
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+    
+    async def call():
+        await asyncio.sleep(0.02)
+        return "done"
+    
+    async def main():
+        leader = asyncio.create_task(flight.do("key", call))
+        follower = asyncio.create_task(flight.do("key", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+    
+    assert asyncio.run(main()) == "done"
+
+def test_cache_entries_expire_after_their_ttl():
+    cache = LLMResponseCache(ttl_seconds=0.05)
+    key = cache.make_key("prompt", model="test")
+    cache.set(key, {"message": "cached"})
+    
+    assert cache.get(key) == {"message": "cached"}
+    time.sleep(0.06)
+    assert cache.get(key) is None
+    assert cache.stats()["size"] == 0
+
+def test_cache_evicts_least_recently_used():
+    cache = LLMResponseCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Upload size limits
+"""
+import hashlib
+import io
+import os
+
+import pytest
+
+from backend.core.config import settings
+from backend.services.upload_storage import UploadTooLargeError, write_stream
+
+def test_oversized_upload_is_rejected_with_cors_headers(client):
+    content = b"x" * (settings.MAX_UPLOAD_SIZE + settings.UPLOAD_FORM_OVERHEAD + 1)
+    response = client.post(
+        "/api/documents",
+        files={"file": ("big.csv", content, "text/csv")},
+        headers={"Origin": "https://app.example.com"}
+    )
+    
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"]
+
+def test_write_stream_hashes_and_renames_into_place(tmp_path):
+    data = os.urandom(10_000)
+    destination = str(tmp_path / "upload.bin")
+    
+    saved = write_stream(io.BytesIO(data), destination, max_bytes=len(data), chunk_size=1024)
+    
+    assert (saved.size, saved.content_hash) == (len(data), hashlib.sha256(data).hexdigest())
+    assert os.listdir(tmp_path) == ["upload.bin"]
+
+def test_write_stream_overflow_leaves_nothing_on_disk(tmp_path):
+    destination = str(tmp_path / "upload.bin")
+    
+    with pytest.raises(UploadTooLargeError):
+        write_stream(io.BytesIO(b"x" * 5000), destination, max_bytes=4096, chunk_size=1024)
+    
+    assert os.listdir(tmp_path) == []
+
+def test_write_stream_read_error_leaves_nothing_on_disk(tmp_path):
+    class BrokenStream(io.BytesIO):
+        def read(self, size=-1):
+            if self.tell() >= 2048:
+                raise OSError("connection reset")
+            return super().read(size)
+    
+    with pytest.raises(OSError):
+        write_stream(BrokenStream(b"x" * 5000), str(tmp_path / "upload.bin"), chunk_size=1024)
+    
+    assert os.listdir(tmp_path) == []
\ No newline at end of file